@@ -0,0 +1,12 @@
+from .models import CompanySettings
+
+
+def company(request):
+    """Branding, currency and tax settings for every template (no queries once cached)"""
+    settings = CompanySettings.get_cached()
+    return {
+        'company': settings,
+        'company_name': settings.company_name,
+        'currency_symbol': settings.currency_symbol,
+        'tax_rate': settings.tax_rate,
+    }
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:33
+
+import inventory_pos.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_companysettings_currency_symbol'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, storage=inventory_pos.storage.get_content_storage, upload_to='profiles/'),
+        ),
+    ]
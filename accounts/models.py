@@ -1,7 +1,27 @@
+import time
+
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from inventory_pos.storage import content_storage, get_content_storage
+
+
+# Roles allowed into each area (superusers are always allowed)
+ADMIN_ROLES = ('ADMIN', 'MANAGER')
+INVENTORY_ROLES = ('ADMIN', 'MANAGER', 'INVENTORY_MANAGER')
+SALES_ROLES = ('ADMIN', 'MANAGER', 'CASHIER')
+
+# Shared-cache key bumped when a user's role may have changed
+ROLE_VERSION_KEY = 'accounts:role_version:{}'
+
+
+def new_cache_version():
+    # Versions start from the clock rather than 0 or 1, so a counter lost to
+    # a flush or eviction can't restart at a number old copies stored
+    return time.time_ns() // 1000
 
 
 class UserProfile(models.Model):
@@ -22,7 +42,7 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='STAFF')
     phone = models.CharField(max_length=20, blank=True)
     address = models.TextField(blank=True)
-    profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profiles/', storage=get_content_storage, blank=True, null=True)
     employee_id = models.CharField(max_length=20, unique=True, blank=True)
     hire_date = models.DateField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
@@ -64,13 +84,13 @@ class UserProfile(models.Model):
         return '/static/images/default-avatar.png'
 
     def can_access_admin(self):
-        return self.role in ['ADMIN', 'MANAGER']
+        return self.role in ADMIN_ROLES
 
     def can_manage_inventory(self):
-        return self.role in ['ADMIN', 'MANAGER', 'INVENTORY_MANAGER']
+        return self.role in INVENTORY_ROLES
 
     def can_process_sales(self):
-        return self.role in ['ADMIN', 'MANAGER', 'CASHIER']
+        return self.role in SALES_ROLES
 
 
 @receiver(post_save, sender=User)
@@ -87,6 +107,36 @@ def save_user_profile(sender, instance, **kwargs):
         instance.profile.save()
 
 
+@receiver(post_save, sender=UserProfile)
+def invalidate_cached_role(sender, instance, **kwargs):
+    """Sessions re-read the role on their next request"""
+    key = ROLE_VERSION_KEY.format(instance.user_id)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, new_cache_version(), timeout=None)
+
+    # After commit, so a request can't re-cache the old role under the new version
+    transaction.on_commit(bump)
+
+
+@receiver(post_delete, sender=UserProfile)
+def release_profile_picture(sender, instance, **kwargs):
+    """Release the picture; the sweep keeps it while another profile shares it"""
+    if instance.profile_picture:
+        name = instance.profile_picture.name
+        transaction.on_commit(lambda: content_storage.release(name))
+
+
+# Shared-cache key bumped whenever CompanySettings is saved
+SETTINGS_VERSION_KEY = 'company_settings:version'
+
+# Per-process copy of the singleton: {'settings': (version, instance)}
+_settings_cache = {}
+
+
 class CompanySettings(models.Model):
     """Singleton model for company-wide settings"""
     company_name = models.CharField(max_length=200, default='Inventory POS')
@@ -134,3 +184,38 @@ class CompanySettings(models.Model):
             }
         )
         return settings
+
+    @classmethod
+    def get_cached(cls):
+        """
+        The settings singleton from a per-process cache.
+
+        Each process keeps its own copy and checks it against a version
+        number held in the shared cache, so a save in one worker refreshes
+        every worker without any of them querying the database per request.
+        """
+        version = cache.get(SETTINGS_VERSION_KEY)
+        if version is None:
+            version = new_cache_version()
+            # Another process may have started one first
+            if not cache.add(SETTINGS_VERSION_KEY, version, timeout=None):
+                version = cache.get(SETTINGS_VERSION_KEY, version)
+        cached_version, settings = _settings_cache.get('settings', (None, None))
+        if cached_version != version:
+            settings = cls.get_settings()
+            _settings_cache['settings'] = (version, settings)
+        return settings
+
+    @classmethod
+    def invalidate_cache(cls):
+        _settings_cache.clear()
+        try:
+            cache.incr(SETTINGS_VERSION_KEY)
+        except ValueError:
+            cache.add(SETTINGS_VERSION_KEY, new_cache_version(), timeout=None)
+
+
+@receiver(post_save, sender=CompanySettings)
+def invalidate_company_settings(sender, instance, **kwargs):
+    """Every process reloads the settings after an edit"""
+    transaction.on_commit(CompanySettings.invalidate_cache)
@@ -0,0 +1,165 @@
+"""
+Role checks.
+
+RoleMiddleware gives every request a lazy request.role. The role is cached
+in the session next to a per-user version number kept in the shared
+cache, and the version is bumped whenever a profile save commits, so role
+checks normally cost no query at all. On a miss the role is read from
+request.user.profile, which ProfileModelBackend loads in the same query
+as the user. A version missing from the cache restarts from the clock,
+so roles cached in sessions before a flush are read again.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from .models import ROLE_VERSION_KEY, UserProfile, new_cache_version
+
+
+SESSION_KEY = '_auth_role'
+
+DENIED_MESSAGE = 'You do not have permission to access this page.'
+
+
+def role_version(user_id):
+    """The user's role version, starting a fresh one if the cache lost it"""
+    key = ROLE_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = new_cache_version()
+        # Another request may have started one first
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+async def arole_version(user_id):
+    key = ROLE_VERSION_KEY.format(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = new_cache_version()
+        if not await cache.aadd(key, version, timeout=None):
+            version = await cache.aget(key, version)
+    return version
+
+
+def get_role(request):
+    """The current user's role ('ADMIN' for superusers, None for anonymous users)"""
+    if hasattr(request, '_cached_role'):
+        return request._cached_role
+    user = request.user
+    if not user.is_authenticated:
+        role = None
+    elif user.is_superuser:
+        role = 'ADMIN'
+    else:
+        version = role_version(user.pk)
+        cached = request.session.get(SESSION_KEY)
+        if cached and cached[0] == user.pk and cached[2] == version:
+            role = cached[1]
+        else:
+            try:
+                role = user.profile.role
+            except ObjectDoesNotExist:
+                role = None
+            request.session[SESSION_KEY] = [user.pk, role, version]
+    request._cached_role = role
+    return role
+
+
+def has_role(request, roles):
+    return request.user.is_superuser or get_role(request) in roles
+
+
+async def aget_role(request):
+    """get_role for async views, which can't touch the lazy request.user"""
+    if hasattr(request, '_cached_role'):
+        return request._cached_role
+    user = await request.auser()
+    if not user.is_authenticated:
+        role = None
+    elif user.is_superuser:
+        role = 'ADMIN'
+    else:
+        version = await arole_version(user.pk)
+        cached = await request.session.aget(SESSION_KEY)
+        if cached and cached[0] == user.pk and cached[2] == version:
+            role = cached[1]
+        else:
+            role = await UserProfile.objects.filter(user_id=user.pk).values_list('role', flat=True).afirst()
+            await request.session.aset(SESSION_KEY, [user.pk, role, version])
+    request._cached_role = role
+    return role
+
+
+async def ahas_role(request, roles):
+    user = await request.auser()
+    return user.is_superuser or await aget_role(request) in roles
+
+
+class RoleMiddleware:
+    """Attach a lazily evaluated request.role; must come after AuthenticationMiddleware"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.role = SimpleLazyObject(lambda: get_role(request))
+        # Under ASGI this returns the view's coroutine for the handler to await
+        return self.get_response(request)
+
+
+def _wants_json(request):
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or request.content_type == 'application/json'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+
+def permission_denied(request):
+    """JSON 403 for AJAX calls, otherwise back to the dashboard with a message"""
+    if _wants_json(request):
+        return JsonResponse({'success': False, 'error': DENIED_MESSAGE}, status=403)
+    messages.error(request, DENIED_MESSAGE)
+    return redirect('inventory:dashboard')
+
+
+def role_required(*roles):
+    """
+    Decorator for function views; use below @login_required, e.g.
+
+        @login_required
+        @role_required(*INVENTORY_ROLES)
+        def view(request): ...
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not has_role(request, roles):
+                return permission_denied(request)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RoleRequiredMixin:
+    """Class-based view counterpart of role_required; list it after LoginRequiredMixin"""
+
+    allowed_roles = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and not has_role(request, self.allowed_roles):
+            return permission_denied(request)
+        return super().dispatch(request, *args, **kwargs)
@@ -1,3 +1,55 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from .models import ROLE_VERSION_KEY, SETTINGS_VERSION_KEY, CompanySettings
+from .roles import get_role, role_version
+
+
+class RoleCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cashier')
+        cls.user.profile.role = 'CASHIER'
+        cls.user.profile.save()
+
+    def setUp(self):
+        self.session = SessionStore()
+
+    def role(self):
+        request = RequestFactory().get('/')
+        request.user, request.session = self.user, self.session
+        return get_role(request)
+
+    def change_role(self, role):
+        version = role_version(self.user.pk)
+        self.user.profile.role = role
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.save()
+            # Until commit, another request could still read the old role
+            self.assertEqual(role_version(self.user.pk), version)
+        self.assertNotEqual(role_version(self.user.pk), version)
+
+    def test_version_is_bumped_after_commit(self):
+        self.assertEqual(self.role(), 'CASHIER')
+        self.change_role('STAFF')
+        self.assertEqual(self.role(), 'STAFF')
+
+    def test_revoked_role_stays_revoked_when_the_version_is_evicted(self):
+        self.assertEqual(self.role(), 'CASHIER')
+        self.change_role('STAFF')
+        # The session still holds CASHIER when the version is lost
+        cache.delete(ROLE_VERSION_KEY.format(self.user.pk))
+        self.assertEqual(self.role(), 'STAFF')
+
+
+class CompanySettingsCacheTests(TestCase):
+    def test_copy_is_reloaded_when_the_version_is_evicted(self):
+        # The copy would outlive this test's transaction
+        self.addCleanup(CompanySettings.invalidate_cache)
+        self.assertEqual(CompanySettings.get_cached().company_name, 'Inventory POS')
+        # Changed without the save signal, then the version is lost
+        CompanySettings.objects.update(company_name='Corner Store')
+        cache.delete(SETTINGS_VERSION_KEY)
+        self.assertEqual(CompanySettings.get_cached().company_name, 'Corner Store')
@@ -6,7 +6,8 @@ from django.views.generic import (
     TemplateView, UpdateView, ListView, CreateView, DeleteView
 )
 from django.urls import reverse_lazy
-from .models import UserProfile, CompanySettings
+from .models import ADMIN_ROLES, UserProfile, CompanySettings
+from .roles import RoleRequiredMixin
 
 
 class ProfileView(LoginRequiredMixin, TemplateView):
@@ -27,30 +28,20 @@ class ProfileEditView(LoginRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
-class UserListView(LoginRequiredMixin, ListView):
+class UserListView(LoginRequiredMixin, RoleRequiredMixin, ListView):
+    allowed_roles = ADMIN_ROLES
     model = User
     template_name = 'accounts/user_list.html'
     context_object_name = 'users'
-    
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.profile.can_access_admin():
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('inventory:dashboard')
-        return super().dispatch(request, *args, **kwargs)
 
 
-class UserCreateView(LoginRequiredMixin, CreateView):
+class UserCreateView(LoginRequiredMixin, RoleRequiredMixin, CreateView):
+    allowed_roles = ADMIN_ROLES
     model = User
     fields = ['username', 'first_name', 'last_name', 'email', 'is_active']
     template_name = 'accounts/user_form.html'
     success_url = reverse_lazy('accounts:user_list')
     
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.profile.can_access_admin():
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('inventory:dashboard')
-        return super().dispatch(request, *args, **kwargs)
-    
     def form_valid(self, form):
         user = form.save(commit=False)
         user.set_password('defaultpassword123')  # Set default password
@@ -59,51 +50,36 @@ class UserCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class UserEditView(LoginRequiredMixin, UpdateView):
+class UserEditView(LoginRequiredMixin, RoleRequiredMixin, UpdateView):
+    allowed_roles = ADMIN_ROLES
     model = User
     fields = ['username', 'first_name', 'last_name', 'email', 'is_active']
     template_name = 'accounts/user_form.html'
     success_url = reverse_lazy('accounts:user_list')
     
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.profile.can_access_admin():
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('inventory:dashboard')
-        return super().dispatch(request, *args, **kwargs)
-    
     def form_valid(self, form):
         messages.success(self.request, 'User updated successfully!')
         return super().form_valid(form)
 
 
-class UserDeleteView(LoginRequiredMixin, DeleteView):
+class UserDeleteView(LoginRequiredMixin, RoleRequiredMixin, DeleteView):
+    allowed_roles = ADMIN_ROLES
     model = User
     template_name = 'accounts/user_confirm_delete.html'
     success_url = reverse_lazy('accounts:user_list')
     
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.profile.can_access_admin():
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('inventory:dashboard')
-        return super().dispatch(request, *args, **kwargs)
-    
     def delete(self, request, *args, **kwargs):
         messages.success(request, 'User deleted successfully!')
         return super().delete(request, *args, **kwargs)
 
 
-class CompanySettingsView(LoginRequiredMixin, UpdateView):
+class CompanySettingsView(LoginRequiredMixin, RoleRequiredMixin, UpdateView):
+    allowed_roles = ADMIN_ROLES
     model = CompanySettings
     fields = ['company_name', 'logo', 'address', 'phone', 'email', 'website', 'tax_rate', 'currency_symbol', 'receipt_footer', 'primary_color', 'secondary_color']
     template_name = 'accounts/company_settings.html'
     success_url = reverse_lazy('accounts:company_settings')
     
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.profile.can_access_admin():
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('inventory:dashboard')
-        return super().dispatch(request, *args, **kwargs)
-    
     def get_object(self):
         return CompanySettings.get_settings()
     
@@ -1,5 +1,13 @@
-from django.contrib import admin
-from .models import Category, Supplier, Product, StockMovement
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .forms import ProductImportForm
+from .imports import import_products, iter_catalog_rows
+from .models import (
+    Category, SkuSequence, Supplier, Location, Product, StockLevel, PriceChange, ProductAuditLog,
+    StockMovement, StockCount, StockCountScan,
+)
 
 
 @admin.register(Category)
@@ -9,6 +17,13 @@ class CategoryAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
 
 
+@admin.register(SkuSequence)
+class SkuSequenceAdmin(admin.ModelAdmin):
+    list_display = ['code', 'last_number', 'updated_at']
+    search_fields = ['code']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
     list_display = ['name', 'contact_person', 'email', 'phone', 'created_at']
@@ -16,12 +31,33 @@ class SupplierAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
 
 
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'is_default', 'is_active', 'created_at']
+    list_filter = ['is_default', 'is_active']
+    search_fields = ['name', 'code']
+
+
+class StockLevelInline(admin.TabularInline):
+    model = StockLevel
+    extra = 0
+    fields = ['location', 'quantity', 'updated_at']
+    # Levels change through stock movements only
+    readonly_fields = ['location', 'quantity', 'updated_at']
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'sku', 'category', 'selling_price', 'stock_quantity', 'is_low_stock', 'is_active']
-    list_filter = ['category', 'supplier', 'is_active', 'created_at']
+    list_filter = ['category', 'supplier', 'is_active', 'is_deleted', 'created_at']
     search_fields = ['name', 'sku', 'barcode']
     readonly_fields = ['created_at', 'updated_at']
+    actions = ['archive_products', 'restore_products']
+    inlines = [StockLevelInline]
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'description', 'category', 'supplier', 'sku', 'barcode', 'image', 'is_active')
@@ -43,11 +79,115 @@ class ProductAdmin(admin.ModelAdmin):
     is_low_stock.boolean = True
     is_low_stock.short_description = 'Low Stock'
 
+    def get_readonly_fields(self, request, obj=None):
+        # The total is maintained from per-location levels once a product exists
+        if obj is not None:
+            return self.readonly_fields + ['stock_quantity']
+        return self.readonly_fields
+
+    def get_queryset(self, request):
+        # Include archived products so they can be restored from the admin
+        return Product.all_objects.select_related('category')
+
+    def delete_queryset(self, request, queryset):
+        queryset.hard_delete(user=request.user)
+
+    @admin.action(description='Archive selected products')
+    def archive_products(self, request, queryset):
+        count = queryset.soft_delete(user=request.user)
+        self.message_user(request, f'Archived {count} product(s).', messages.SUCCESS)
+
+    @admin.action(description='Restore selected products')
+    def restore_products(self, request, queryset):
+        count = queryset.restore(user=request.user)
+        self.message_user(request, f'Restored {count} product(s).', messages.SUCCESS)
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='inventory_product_import',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Bulk catalog import from CSV/XLSX"""
+        if not self.has_add_permission(request):
+            messages.error(request, 'You do not have permission to import products.')
+            return redirect('admin:inventory_product_changelist')
+
+        report = None
+        form = ProductImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = import_products(iter_catalog_rows(upload.file, upload.name))
+            except ValueError as e:
+                form.add_error('file', str(e))
+            else:
+                if report.succeeded:
+                    self.message_user(request, f'Imported {report.succeeded} product(s).', messages.SUCCESS)
+                if report.failed:
+                    self.message_user(request, f'{report.failed} row(s) could not be imported.', messages.ERROR)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import products',
+            'form': form,
+            'report': report,
+        }
+        return TemplateResponse(request, 'admin/inventory/product/import.html', context)
+
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
-    list_display = ['product', 'movement_type', 'quantity', 'reason', 'user', 'created_at']
-    list_filter = ['movement_type', 'created_at', 'user']
+    list_display = ['product', 'location', 'movement_type', 'quantity', 'reason', 'user', 'created_at']
+    list_filter = ['movement_type', 'location', 'created_at', 'user']
     search_fields = ['product__name', 'reason', 'reference']
     readonly_fields = ['created_at']
     date_hierarchy = 'created_at'
+
+    def get_readonly_fields(self, request, obj=None):
+        # Stock is applied once when a movement is recorded, so editing the
+        # quantity or type afterwards would silently desync product stock
+        if obj is not None:
+            return self.readonly_fields + ['product', 'location', 'movement_type', 'quantity']
+        return self.readonly_fields
+
+
+@admin.register(ProductAuditLog)
+class ProductAuditLogAdmin(admin.ModelAdmin):
+    list_display = ['product_name', 'product_id', 'action', 'user', 'created_at']
+    list_filter = ['action', 'created_at', 'user']
+    search_fields = ['product_name']
+    readonly_fields = ['product_id', 'product_name', 'action', 'user', 'created_at']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(PriceChange)
+class PriceChangeAdmin(admin.ModelAdmin):
+    list_display = ['product', 'old_price', 'new_price', 'source', 'reason', 'user', 'created_at']
+    list_filter = ['source', 'created_at', 'user']
+    search_fields = ['product__name', 'product__sku', 'reason']
+    readonly_fields = ['created_at']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(StockCount)
+class StockCountAdmin(admin.ModelAdmin):
+    list_display = ['name', 'location', 'category', 'shelf', 'status', 'created_by', 'created_at', 'posted_at']
+    list_filter = ['status', 'location', 'category', 'created_at']
+    search_fields = ['name', 'shelf']
+    readonly_fields = ['created_at', 'posted_by', 'posted_at']
+
+
+@admin.register(StockCountScan)
+class StockCountScanAdmin(admin.ModelAdmin):
+    list_display = ['count', 'product', 'quantity', 'user', 'scanned_at']
+    list_filter = ['count', 'scanned_at']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product']
+    readonly_fields = ['scanned_at']
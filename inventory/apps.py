@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from inventory_pos.sqlite import apply_pragmas
+        connection_created.connect(apply_pragmas, dispatch_uid='inventory_pos.sqlite.apply_pragmas')
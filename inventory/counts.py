@@ -0,0 +1,102 @@
+"""
+Cycle counting.
+
+Handhelds append scans to an open StockCount without touching product
+rows, so scanning is a single INSERT. Variances are computed for the
+whole session in one query, and posting writes every adjustment in one
+transaction with set-based stock updates.
+"""
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Location, Product, StockCount, StockCountScan, StockLevel, StockMovement
+from .services import apply_movements
+
+
+class CountClosedError(ValueError):
+    """Raised when scanning into or posting a count that is no longer open"""
+
+
+def record_scans(count, items, user=None):
+    """
+    Append scans to an open count.
+
+    items is an iterable of (code, quantity) where code is a SKU or barcode.
+    Returns (accepted, unknown_codes).
+    """
+    if not count.is_open:
+        raise CountClosedError(f'Count "{count.name}" is {count.get_status_display().lower()}')
+
+    items = [(str(code).strip(), int(quantity)) for code, quantity in items if str(code).strip()]
+    codes = {code for code, _ in items}
+    by_code = {}
+    for pk, sku, barcode in Product.all_objects.filter(
+        Q(sku__in=codes) | Q(barcode__in=codes)
+    ).values_list('pk', 'sku', 'barcode'):
+        by_code[sku] = pk
+        if barcode:
+            by_code[barcode] = pk
+
+    scans = []
+    unknown = []
+    for code, quantity in items:
+        if code in by_code:
+            scans.append(StockCountScan(count=count, product_id=by_code[code], quantity=quantity, user=user))
+        else:
+            unknown.append(code)
+    StockCountScan.objects.bulk_create(scans)
+    return len(scans), unknown
+
+
+def variances(count, location=None):
+    """
+    Products in the count's scope annotated with counted, system (stock at
+    the count's location) and variance (counted - system), in a single query.
+    """
+    location = location or count.location or Location.get_default()
+    counted = StockCountScan.objects.filter(
+        count=count, product=OuterRef('pk')
+    ).values('product').annotate(total=Sum('quantity')).values('total')
+    system = StockLevel.objects.filter(
+        product=OuterRef('pk'), location=location
+    ).values('quantity')[:1]
+    return count.scope().annotate(
+        counted=Coalesce(Subquery(counted, output_field=IntegerField()), Value(0)),
+        system=Coalesce(Subquery(system, output_field=IntegerField()), Value(0)),
+        variance=F('counted') - F('system'),
+    ).order_by('pk')
+
+
+@transaction.atomic
+def post_count(count, user):
+    """
+    Turn every non-zero variance into an ADJUSTMENT movement and close the
+    count. Returns the number of products adjusted.
+    """
+    count = StockCount.objects.select_for_update().get(pk=count.pk)
+    if not count.is_open:
+        raise CountClosedError(f'Count "{count.name}" is {count.get_status_display().lower()}')
+
+    location = count.location or Location.get_default()
+    movements = [
+        StockMovement(
+            product_id=pk,
+            location=location,
+            movement_type='ADJUSTMENT',
+            # Negative totals can only come from over-corrected scans
+            quantity=max(counted, 0),
+            reason=f'Cycle count: {count.name}'[:200],
+            reference=f'COUNT-{count.pk}',
+            user=user,
+        )
+        for pk, counted in variances(count, location).exclude(variance=0).values_list('pk', 'counted')
+    ]
+    apply_movements(movements)
+
+    count.status = 'POSTED'
+    count.posted_by = user
+    count.posted_at = timezone.now()
+    count.save(update_fields=['status', 'posted_by', 'posted_at'])
+    return len(movements)
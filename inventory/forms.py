@@ -1,8 +1,9 @@
 from django import forms
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserChangeForm
 from accounts.models import UserProfile
-from .models import Product, Category, Supplier, StockMovement
+from .models import Product, Category, Supplier, StockMovement, StockCount, Location
 
 class UserProfileForm(forms.ModelForm):
     """Form for editing user profile information"""
@@ -209,4 +210,166 @@ class StockMovementForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Enter reference number (optional)'
             })
-        }
\ No newline at end of file
+        }
+
+class StockReceiptImportForm(forms.Form):
+    """Upload form for bulk stock receipts"""
+    
+    file = forms.FileField(
+        help_text="CSV with columns: sku or barcode, quantity, reference (optional)",
+        widget=forms.FileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv'
+        })
+    )
+    reference = forms.CharField(
+        max_length=100,
+        required=False,
+        help_text="Default reference (delivery note, PO) for rows without one",
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'e.g., PO-2025-001'
+        })
+    )
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        required=False,
+        empty_label='Default location',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+class ProductImportForm(forms.Form):
+    """Upload form for bulk catalog import"""
+    
+    file = forms.FileField(
+        help_text="CSV or XLSX with columns: name, category, sku, barcode, description, "
+                  "cost_price, selling_price, stock_quantity, minimum_stock"
+    )
+
+class BulkRepriceForm(forms.Form):
+    """Bulk repricing by rule or from a supplier price list"""
+    
+    category = forms.ModelChoiceField(
+        queryset=Category.objects.all(),
+        required=False,
+        empty_label='All categories',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    search = forms.CharField(
+        required=False,
+        help_text="Only products whose name, SKU or barcode contains this text",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Optional filter'})
+    )
+    mode = forms.ChoiceField(
+        choices=[],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    value = forms.DecimalField(
+        required=False,
+        max_digits=10,
+        decimal_places=2,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
+    )
+    price_list = forms.FileField(
+        required=False,
+        help_text="Supplier price list CSV with columns: sku, price. Overrides the rule above.",
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'})
+    )
+    reason = forms.CharField(
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., Supplier increase March'})
+    )
+    allow_below_cost = forms.BooleanField(
+        required=False,
+        label='Allow prices below cost',
+        help_text="Needed when the new prices would cut any product below its cost price"
+    )
+    
+    def __init__(self, *args, **kwargs):
+        from .pricing import REPRICE_MODES
+        super().__init__(*args, **kwargs)
+        self.fields['mode'].choices = REPRICE_MODES
+    
+    def clean(self):
+        from .pricing import validate_reprice_value
+        cleaned_data = super().clean()
+        if cleaned_data.get('price_list'):
+            return cleaned_data
+        if cleaned_data.get('value') is None:
+            raise forms.ValidationError('Enter a value or upload a supplier price list.')
+        if cleaned_data.get('mode'):
+            try:
+                validate_reprice_value(cleaned_data['mode'], cleaned_data['value'])
+            except forms.ValidationError as e:
+                self.add_error('value', e)
+        return cleaned_data
+
+
+class StockCountForm(forms.ModelForm):
+    """Open a cycle-count session"""
+    
+    class Meta:
+        model = StockCount
+        fields = ['name', 'location', 'category', 'shelf']
+        widgets = {
+            'name': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'e.g., March full count'
+            }),
+            'location': forms.Select(attrs={
+                'class': 'form-control'
+            }),
+            'category': forms.Select(attrs={
+                'class': 'form-control'
+            }),
+            'shelf': forms.TextInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'e.g., A-03'
+            }),
+        }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['location'].queryset = Location.objects.filter(is_active=True)
+
+
+class StockTransferForm(forms.Form):
+    """Move stock from one location to another"""
+    
+    product_code = forms.CharField(
+        max_length=100,
+        label='SKU / Barcode',
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Scan or type a SKU or barcode'})
+    )
+    from_location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    to_location = forms.ModelChoiceField(
+        queryset=Location.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    quantity = forms.IntegerField(
+        min_value=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    reference = forms.CharField(
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., TRF-0001'})
+    )
+    
+    def clean_product_code(self):
+        code = self.cleaned_data['product_code'].strip()
+        product = Product.objects.filter(Q(sku=code) | Q(barcode=code)).first()
+        if product is None:
+            raise forms.ValidationError('No product with this SKU or barcode.')
+        self.cleaned_data['product'] = product
+        return code
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('from_location') and cleaned_data.get('from_location') == cleaned_data.get('to_location'):
+            raise forms.ValidationError('Choose two different locations.')
+        return cleaned_data
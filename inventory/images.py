@@ -0,0 +1,269 @@
+"""
+Product image renditions.
+
+Uploads are stored as-is; a background worker then renders each product
+image as square WebP and JPEG files at a few sizes and records their URLs
+on the product. Until that finishes, templates show the placeholder, so a
+product save never waits on Pillow. All files live in the content-addressed
+storage, so an image shared by several products is rendered once.
+
+Jobs live in process memory and are retried a few times, but a restart
+drops whatever is queued; the generate_image_renditions command (run in
+the release phase) renders whatever is still missing. Replaced and deleted
+images are only marked; the sweep_media command removes them later.
+"""
+import logging
+import posixpath
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.templatetags.static import static
+from django.utils import timezone
+from PIL import Image
+
+from inventory_pos.storage import ORPHAN_GRACE, content_storage
+
+from .models import Product
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_SIZES = getattr(settings, 'IMAGE_RENDITION_SIZES', (64, 150, 300))
+RENDITION_DIR = 'products/renditions'
+MASTER_DIR = 'products/masters'
+# Longest side of a normalised master, twice the largest rendition
+MASTER_MAX_SIZE = 600
+PLACEHOLDER = 'images/product-placeholder.png'
+
+# Pillow format, file extension and save options per rendition format
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# Attempts per background job, waiting RETRY_DELAY seconds, doubling each time
+RENDITION_ATTEMPTS = 3
+RETRY_DELAY = 2
+
+_executor = None
+
+
+@lru_cache(maxsize=None)
+def placeholder_url():
+    return static(PLACEHOLDER)
+
+
+def _to_rgb(img):
+    """Flatten transparency onto white; renditions are always RGB"""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _square(img, size):
+    """Fit img inside a size x size white square, keeping its aspect ratio"""
+    fitted = img.copy()
+    fitted.thumbnail((size, size), Image.Resampling.LANCZOS)
+    canvas = Image.new('RGB', (size, size), (255, 255, 255))
+    canvas.paste(fitted, ((size - fitted.width) // 2, (size - fitted.height) // 2))
+    return canvas
+
+
+def render(source, sizes=RENDITION_SIZES):
+    """
+    Render an open image file into {size: {fmt: bytes}}.
+
+    The largest size is rendered first and each smaller one is reduced from
+    the previous result, so the full-size upload is only resampled once.
+    """
+    img = Image.open(source)
+    img.draft('RGB', (max(sizes), max(sizes)))
+    img = _to_rgb(img)
+    output = {}
+    for size in sorted(sizes, reverse=True):
+        img = _square(img, size)
+        output[size] = {}
+        for key, (pil_format, _, options) in FORMATS.items():
+            buffer = BytesIO()
+            img.save(buffer, format=pil_format, **options)
+            output[size][key] = buffer.getvalue()
+    return output
+
+
+def save_renditions(image_name, storage=content_storage):
+    """Render image_name and store its renditions. Returns {size: {fmt: url}}."""
+    with storage.open(image_name, 'rb') as source:
+        rendered = render(source)
+
+    urls = {}
+    for size, files in rendered.items():
+        urls[str(size)] = {}
+        for key, data in files.items():
+            name = storage.save(f'{RENDITION_DIR}/{size}.{FORMATS[key][1]}', ContentFile(data))
+            urls[str(size)][key] = storage.url(name)
+    return urls
+
+
+def rendition_names(renditions, storage=content_storage):
+    """Storage names of the files behind a product's rendition URLs"""
+    base_url = storage.base_url
+    return [
+        unquote(url[len(base_url):])
+        for formats in (renditions or {}).values()
+        for url in formats.values()
+        if url.startswith(base_url)
+    ]
+
+
+def release_image(image_name, renditions=None, keep=()):
+    """
+    Mark an image and its renditions (except names in keep) for the next
+    sweep; files another product still uses are left alone then.
+    """
+    if image_name:
+        content_storage.release(image_name, *(set(rendition_names(renditions)) - set(keep)))
+
+
+def rendition_in_use(name):
+    """Whether any product's image_renditions still points at the file"""
+    return Product.all_objects.filter(image_renditions__icontains=content_storage.url(name)).exists()
+
+
+def sweep_released_files(grace=ORPHAN_GRACE):
+    """Delete released images and renditions nothing uses any more. Returns their names."""
+    return content_storage.sweep(grace, in_use=rendition_in_use)
+
+
+def is_normalised(image_name):
+    """
+    Masters live in MASTER_DIR. Every upload is named after its content
+    hash as well, so the name alone doesn't mark a master.
+    """
+    return posixpath.dirname(image_name) == MASTER_DIR
+
+
+def normalise_image(product_id, image_name, max_size=MASTER_MAX_SIZE, has_renditions=False):
+    """
+    Shrink an upload to a JPEG master no larger than max_size px and
+    (optionally) render it. Safe to run in a worker process: it only uses
+    storage, never the database.
+
+    Masters are stored as products/masters/<content hash>.jpg, so an image
+    that was already processed is recognised by its directory and skipped
+    (or only rendered, if it has no renditions yet). Returns
+    (product_id, new_name or None when skipped, rendition urls or None).
+    """
+    if is_normalised(image_name):
+        if has_renditions:
+            return product_id, None, None
+        return product_id, image_name, save_renditions(image_name)
+
+    with content_storage.open(image_name, 'rb') as source:
+        data = source.read()
+    img = _to_rgb(Image.open(BytesIO(data)))
+    img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', **FORMATS['jpg'][2])
+    master = buffer.getvalue()
+
+    name = content_storage.save(f'{MASTER_DIR}/master.jpg', ContentFile(master))
+    return product_id, name, save_renditions(name)
+
+
+def generate_renditions(product_id):
+    """
+    Build renditions for a product's current image and record their URLs.
+
+    The URLs are only written if the product still has the same image, so a
+    slow job can't overwrite the renditions of a newer upload.
+    """
+    product = Product.all_objects.filter(pk=product_id).values('image').first()
+    if not product or not product['image']:
+        return None
+    image_name = product['image']
+    # Identical uploads share a name; reuse renditions already made for it
+    shared = Product.all_objects.filter(image=image_name).exclude(
+        image_renditions={}
+    ).values_list('image_renditions', flat=True).first()
+    if shared:
+        Product.all_objects.filter(pk=product_id, image=image_name).update(
+            image_renditions=shared, updated_at=timezone.now()
+        )
+        return shared
+    try:
+        urls = save_renditions(image_name)
+    except Exception:
+        logger.exception(
+            f"Rendering images failed for product {product_id}",
+            extra={'event': 'product.image_failed', 'product_id': product_id, 'image': image_name},
+        )
+        return None
+    Product.all_objects.filter(pk=product_id, image=image_name).update(
+        image_renditions=urls, updated_at=timezone.now()
+    )
+    logger.info(
+        f"Rendered images for product {product_id}",
+        extra={'event': 'product.image_rendered', 'product_id': product_id, 'image': image_name},
+    )
+    return urls
+
+
+def missing_renditions(older_than=None):
+    """Products with an image but no renditions, optionally only those saved more than older_than ago"""
+    products = Product.all_objects.exclude(image='').exclude(image__isnull=True).filter(image_renditions={})
+    if older_than is not None:
+        products = products.filter(updated_at__lt=timezone.now() - older_than)
+    return products
+
+
+def _run(product_id):
+    for attempt in range(1, RENDITION_ATTEMPTS + 1):
+        # Worker threads get their own DB connection; don't leak it
+        close_old_connections()
+        try:
+            generate_renditions(product_id)
+            return
+        except Exception:
+            # Nothing waits on the future, so this log is the only trace
+            logger.exception(
+                f"Rendition job failed for product {product_id} (attempt {attempt}/{RENDITION_ATTEMPTS})",
+                extra={'event': 'product.image_job_failed', 'product_id': product_id, 'attempt': attempt},
+            )
+        finally:
+            close_old_connections()
+        if attempt < RENDITION_ATTEMPTS:
+            time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2),
+            thread_name_prefix='renditions',
+        )
+    return _executor
+
+
+def schedule_renditions(product_id):
+    """
+    Queue rendition generation once the current transaction commits.
+
+    With IMAGE_RENDITIONS_ASYNC = False the work runs inline after commit,
+    which is handy for management commands and debugging.
+    """
+    if getattr(settings, 'IMAGE_RENDITIONS_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run, product_id))
+    else:
+        transaction.on_commit(lambda: generate_renditions(product_id))
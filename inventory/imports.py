@@ -0,0 +1,374 @@
+"""
+Bulk import helpers for inventory data.
+
+Files are read as a stream and processed in fixed-size batches so memory
+use stays flat and each batch costs a handful of queries instead of a few
+queries per line.
+"""
+import csv
+import io
+import os
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from .models import (
+    Product, Category, Location, SkuSequence, StockLevel, StockMovement,
+    validate_product_name, validate_category_name, validate_reasonable_price,
+    validate_reasonable_quantity, validate_safe_text,
+)
+from .services import apply_movements
+
+try:
+    import openpyxl
+except ImportError:
+    # Listed in requirements.txt; without it only CSV can be imported
+    openpyxl = None
+
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class ImportReport:
+    """Per-line outcome of an import"""
+
+    def __init__(self):
+        self.lines = []
+        self.processed = 0
+        self.succeeded = 0
+
+    def ok(self, line_number, code, message=''):
+        self.processed += 1
+        self.succeeded += 1
+        self.lines.append({'line': line_number, 'code': code, 'status': 'ok', 'message': message})
+
+    def error(self, line_number, code, message):
+        self.processed += 1
+        self.lines.append({'line': line_number, 'code': code, 'status': 'error', 'message': message})
+
+    @property
+    def failed(self):
+        return self.processed - self.succeeded
+
+    @property
+    def errors(self):
+        return [line for line in self.lines if line['status'] == 'error']
+
+
+def open_text_stream(fileobj, encoding='utf-8-sig'):
+    """Wrap a binary upload (or path) so csv can iterate it line by line"""
+    if isinstance(fileobj, str):
+        return open(fileobj, newline='', encoding=encoding)
+    return io.TextIOWrapper(fileobj, encoding=encoding, newline='')
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _normalise_row(row):
+    return {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+
+
+def import_stock_receipts(stream, user, reference='', batch_size=DEFAULT_BATCH_SIZE, location=None):
+    """
+    Receive stock from a CSV with columns sku or barcode, quantity and an
+    optional reference. Each batch resolves products with one query, writes
+    IN movements with bulk_create and increments stock with one UPDATE.
+    Stock is received at location, or the default location.
+    """
+    report = ImportReport()
+    reader = csv.DictReader(stream)
+    # Header is line 1, so data starts on line 2
+    numbered_rows = enumerate((_normalise_row(row) for row in reader), start=2)
+
+    for batch in batched(numbered_rows, batch_size):
+        codes = set()
+        for _, row in batch:
+            codes.update(code for code in (row.get('sku'), row.get('barcode')) if code)
+
+        by_code = {}
+        for product in Product.objects.filter(
+            Q(sku__in=codes) | Q(barcode__in=codes)
+        ).only('id', 'sku', 'barcode'):
+            by_code[product.sku] = product
+            if product.barcode:
+                by_code[product.barcode] = product
+
+        movements = []
+        accepted = []
+        for line_number, row in batch:
+            code = row.get('sku') or row.get('barcode') or ''
+            if not code:
+                report.error(line_number, code, 'Missing SKU or barcode')
+                continue
+            product = by_code.get(row.get('sku')) or by_code.get(row.get('barcode'))
+            if product is None:
+                report.error(line_number, code, 'Unknown SKU or barcode')
+                continue
+            try:
+                quantity = int(row.get('quantity', ''))
+            except ValueError:
+                report.error(line_number, code, f"Invalid quantity '{row.get('quantity', '')}'")
+                continue
+            if quantity <= 0:
+                report.error(line_number, code, 'Quantity must be greater than zero')
+                continue
+
+            movements.append(StockMovement(
+                product_id=product.id,
+                location=location,
+                movement_type='IN',
+                quantity=quantity,
+                reason='Stock receipt import',
+                reference=(row.get('reference') or reference)[:100],
+                user=user,
+            ))
+            accepted.append((line_number, code, quantity))
+
+        try:
+            apply_movements(movements)
+        except Exception as e:
+            for line_number, code, _ in accepted:
+                report.error(line_number, code, f'Batch failed: {e}')
+            continue
+
+        for line_number, code, quantity in accepted:
+            report.ok(line_number, code, f'+{quantity}')
+
+    return report
+
+
+# Catalog import
+
+PRODUCT_COLUMNS = (
+    'name', 'category', 'sku', 'barcode', 'description',
+    'cost_price', 'selling_price', 'stock_quantity', 'minimum_stock',
+)
+
+
+def iter_catalog_rows(fileobj, filename):
+    """
+    Yield (line_number, row_dict) from a CSV or XLSX file without loading
+    the whole sheet into memory.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        if openpyxl is None:
+            raise ValueError('XLSX import requires openpyxl (pip install openpyxl)')
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(cell or '').strip().lower() for cell in next(rows, ())]
+            for line_number, values in enumerate(rows, start=2):
+                if not any(value not in (None, '') for value in values):
+                    continue
+                yield line_number, {
+                    key: '' if value is None else str(value).strip()
+                    for key, value in zip(header, values)
+                }
+        finally:
+            workbook.close()
+    elif extension == '.csv':
+        stream = fileobj if isinstance(fileobj, io.TextIOBase) else open_text_stream(fileobj)
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_number, _normalise_row(row)
+    else:
+        raise ValueError('Unsupported file type. Upload a .csv or .xlsx file')
+
+
+class SkuAllocator:
+    """
+    Hands out SKUs in the same CATEGORY-0001 format as Product.save, taking
+    numbers from SkuSequence in one block per category per batch.
+    """
+
+    def allocate(self, category, count, taken=()):
+        """Return count unused SKUs for category, skipping any in taken"""
+        code = category.name[:3].upper()
+        skus = []
+        while len(skus) < count:
+            block = [
+                SkuSequence.format_sku(code, number)
+                for number in SkuSequence.reserve(code, count - len(skus))
+            ]
+            # Hand-entered SKUs can sit above the sequence; skip those
+            existing = set(Product.all_objects.filter(sku__in=block).values_list('sku', flat=True))
+            skus.extend(sku for sku in block if sku not in taken and sku not in existing)
+        return skus
+
+
+def _parse_decimal(value, field, default=None):
+    if value in ('', None):
+        if default is not None:
+            return default
+        raise ValidationError(f'{field} is required')
+    try:
+        parsed = Decimal(str(value).replace(',', ''))
+    except InvalidOperation:
+        raise ValidationError(f"Invalid {field} '{value}'")
+    validate_reasonable_price(parsed)
+    return parsed.quantize(Decimal('0.01'))
+
+
+def _parse_int(value, field, default):
+    if value in ('', None):
+        return default
+    try:
+        parsed = int(Decimal(str(value)))
+    except (InvalidOperation, ValueError):
+        raise ValidationError(f"Invalid {field} '{value}'")
+    validate_reasonable_quantity(parsed)
+    return parsed
+
+
+def _clean_product_row(row):
+    """Field-level validation for one row; uniqueness is checked per batch"""
+    name = row.get('name', '')
+    validate_product_name(name)
+    category_name = row.get('category', '')
+    validate_category_name(category_name)
+    description = row.get('description', '')
+    if description:
+        validate_safe_text(description)
+    selling_price = _parse_decimal(row.get('selling_price'), 'selling_price')
+    return {
+        'name': name[:200],
+        'category': category_name[:100],
+        'sku': row.get('sku', '')[:50],
+        'barcode': row.get('barcode', '')[:100] or None,
+        'description': description,
+        'selling_price': selling_price,
+        'cost_price': _parse_decimal(row.get('cost_price'), 'cost_price', default=selling_price),
+        'stock_quantity': _parse_int(row.get('stock_quantity'), 'stock_quantity', 0),
+        'minimum_stock': _parse_int(row.get('minimum_stock'), 'minimum_stock', 5),
+    }
+
+
+def _message(error):
+    return '; '.join(str(message) for message in getattr(error, 'messages', [error]))
+
+
+def import_products(rows, batch_size=DEFAULT_BATCH_SIZE, allocator=None):
+    """
+    Create products from (line_number, row) pairs, batch_size rows at a time.
+
+    Each batch validates rows in memory, checks SKU/barcode uniqueness with
+    one query, creates any missing categories once, allocates SKUs in a
+    block per category and inserts with bulk_create. Product.save (and its
+    image processing) is deliberately bypassed.
+    """
+    report = ImportReport()
+    allocator = allocator or SkuAllocator()
+    categories = {}
+    seen_skus = set()
+    seen_barcodes = set()
+
+    for batch in batched(rows, batch_size):
+        cleaned = []
+        for line_number, row in batch:
+            code = row.get('sku') or row.get('name', '')
+            try:
+                cleaned.append((line_number, _clean_product_row(row)))
+            except ValidationError as e:
+                report.error(line_number, code, _message(e))
+
+        # Uniqueness against the database and earlier rows, in one query
+        skus = {data['sku'] for _, data in cleaned if data['sku']}
+        barcodes = {data['barcode'] for _, data in cleaned if data['barcode']}
+        existing = Product.all_objects.filter(Q(sku__in=skus) | Q(barcode__in=barcodes))
+        taken_skus = set(seen_skus)
+        taken_barcodes = set(seen_barcodes)
+        for sku, barcode in existing.values_list('sku', 'barcode'):
+            taken_skus.add(sku)
+            if barcode:
+                taken_barcodes.add(barcode)
+
+        valid = []
+        for line_number, data in cleaned:
+            code = data['sku'] or data['name']
+            if data['sku'] and data['sku'] in taken_skus:
+                report.error(line_number, code, f"SKU '{data['sku']}' already exists")
+                continue
+            if data['barcode'] and data['barcode'] in taken_barcodes:
+                report.error(line_number, code, f"Barcode '{data['barcode']}' already exists")
+                continue
+            if data['sku']:
+                taken_skus.add(data['sku'])
+            if data['barcode']:
+                taken_barcodes.add(data['barcode'])
+            valid.append((line_number, data))
+
+        if not valid:
+            continue
+
+        names = {data['category'] for _, data in valid} - set(categories)
+        try:
+            with transaction.atomic():
+                # Create missing categories once
+                for category in Category.objects.filter(name__in=names):
+                    categories[category.name] = category
+                missing = [Category(name=name) for name in names if name not in categories]
+                for category in Category.objects.bulk_create(missing):
+                    categories[category.name] = category
+                if any(category.pk is None for category in categories.values()):
+                    # Backends that don't return ids from bulk_create
+                    for category in Category.objects.filter(name__in=names):
+                        categories[category.name] = category
+
+                # Allocate SKUs in one block per category
+                needs_sku = {}
+                for _, data in valid:
+                    if not data['sku']:
+                        needs_sku.setdefault(data['category'], []).append(data)
+                for category_name, items in needs_sku.items():
+                    block = allocator.allocate(categories[category_name], len(items), taken=taken_skus)
+                    for data, sku in zip(items, block):
+                        data['sku'] = sku
+                        taken_skus.add(sku)
+
+                created = Product.objects.bulk_create([
+                    Product(
+                        name=data['name'],
+                        description=data['description'],
+                        category=categories[data['category']],
+                        sku=data['sku'],
+                        barcode=data['barcode'],
+                        cost_price=data['cost_price'],
+                        selling_price=data['selling_price'],
+                        stock_quantity=data['stock_quantity'],
+                        minimum_stock=data['minimum_stock'],
+                    )
+                    for _, data in valid
+                ])
+                # bulk_create skips post_save, so opening stock is placed here
+                if any(product.pk is None for product in created):
+                    created = Product.all_objects.filter(sku__in=[product.sku for product in created])
+                default_location = Location.get_default()
+                StockLevel.objects.bulk_create([
+                    StockLevel(product_id=product.pk, location=default_location, quantity=product.stock_quantity)
+                    for product in created
+                ])
+        except Exception as e:
+            # Categories created in the rolled-back batch no longer exist
+            for name in names:
+                categories.pop(name, None)
+            for line_number, data in valid:
+                report.error(line_number, data['sku'] or data['name'], f'Batch failed: {e}')
+            continue
+
+        seen_skus = taken_skus
+        seen_barcodes = taken_barcodes
+        for line_number, data in valid:
+            report.ok(line_number, data['sku'], data['name'])
+
+    report.lines.sort(key=lambda line: line['line'])
+    return report
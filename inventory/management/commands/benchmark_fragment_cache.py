@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.test.utils import override_settings
+
+from accounts.models import CompanySettings
+from inventory.models import Location, Product
+
+
+PAGES = {
+    'product cards': "{% for product in products %}{% include 'inventory/partials/product_card.html' %}{% endfor %}",
+    'product rows': "{% for product in products %}{% include 'inventory/partials/product_row.html' %}{% endfor %}",
+    'pos tiles': "{% for product in products %}{% include 'pos/partials/product_tile.html' %}{% endfor %}",
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare full and fragment-cached render times for product cards, table rows and POS tiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=24,
+            help='Products on a normal page (default: 24)',
+        )
+        parser.add_argument(
+            '--listing-size',
+            type=int,
+            default=500,
+            help='Products in the large admin-style listing (default: 500)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Renders per measurement; the median is reported (default: 20)',
+        )
+
+    def measure(self, template, context, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            template.render(context)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        location = Location.get_default()
+        company = CompanySettings.get_cached()
+        sizes = [options['page_size'], options['listing_size']]
+        engine = engines['django']
+
+        # With a DummyCache every fragment is rendered in full
+        uncached = dict(settings.CACHES, template_fragments={
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        })
+
+        self.stdout.write(f"{'fragment':<15}{'size':>8}{'full ms':>12}{'cached ms':>12}{'speedup':>10}")
+        for label, source in PAGES.items():
+            template = engine.from_string(source)
+            for size in sizes:
+                if label == 'pos tiles':
+                    products = Product.objects.with_stock_at(location).select_related('category').order_by('name')
+                else:
+                    products = Product.objects.with_valuation().select_related('category').order_by('name')
+                products = list(products[:size])
+                context = {
+                    'products': products,
+                    'currency_symbol': company.currency_symbol,
+                    'can_manage_products': True,
+                }
+
+                with override_settings(CACHES=uncached):
+                    full = self.measure(template, context, repeat)
+                # One render to fill the cache, then measure warm renders
+                template.render(context)
+                cached = self.measure(template, context, repeat)
+
+                speedup = full / cached if cached else 0
+                self.stdout.write(f'{label:<15}{len(products):>8}{full:>12.2f}{cached:>12.2f}{speedup:>9.1f}x')
+
+        self.stdout.write(self.style.SUCCESS('Completed! Benchmark finished'))
@@ -0,0 +1,261 @@
+import http.client
+import importlib.util
+import json
+import os
+import shlex
+import shutil
+import socket
+import sqlite3
+import statistics
+import string
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import UserProfile
+from inventory.models import Product, StockLevel
+from inventory.services import refresh_stock_totals
+
+
+# Procfile process types compared, by server profile
+PROFILES = {
+    'wsgi': 'web',
+    'asgi': 'asgi',
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_cashier(port, session_cookie, skus, product_ids, deadline):
+    """Search, add to cart and check out until the deadline; returns (requests, checkouts, errors, latencies)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Cookie': session_cookie, 'Content-Type': 'application/json'}
+    search_url, add_url, checkout_url = (
+        reverse('pos:product_search_api'), reverse('pos:add_to_cart'), reverse('pos:checkout')
+    )
+
+    requests = checkouts = errors = 0
+    latencies = []
+
+    def call(method, url, body=None):
+        nonlocal requests, errors
+        start = time.perf_counter()
+        try:
+            # Sync workers close the connection after each response; http.client reopens it
+            conn.request(method, url, body=json.dumps(body) if body else None, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            ok = response.status == 200 and json.loads(payload).get('status', 'success') == 'success'
+        except (OSError, http.client.HTTPException, ValueError):
+            conn.close()
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        requests += 1
+        errors += not ok
+        return ok
+
+    n = 0
+    while time.monotonic() < deadline:
+        call('GET', f'{search_url}?q={skus[n % len(skus)]}')
+        if call('POST', add_url, {'product_id': product_ids[n % len(product_ids)], 'quantity': 1}):
+            checkouts += call('POST', checkout_url, {'payment_method': 'card', 'amount_paid': 0})
+        n += 1
+    conn.close()
+    return requests, checkouts, errors, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the POS search, cart and checkout endpoints under the Procfile servers: '
+        'gunicorn sync workers (web) against gunicorn with uvicorn workers (asgi). '
+        'Runs on a copy of the SQLite database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles',
+            nargs='+',
+            choices=sorted(PROFILES),
+            default=['wsgi', 'asgi'],
+            help='Server profiles to run (default: wsgi asgi)',
+        )
+        parser.add_argument(
+            '--cashiers',
+            type=int,
+            default=32,
+            help='Concurrent simulated cashiers (default: 32)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=int,
+            default=30,
+            help='Seconds of load per profile (default: 30)',
+        )
+        parser.add_argument(
+            '--server-workers',
+            type=int,
+            default=2,
+            help='Worker processes per server, passed as WEB_CONCURRENCY (default: 2)',
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=50,
+            help='Distinct products rung up (default: 50)',
+        )
+
+    def check_server(self, profile):
+        if not shutil.which('gunicorn'):
+            raise CommandError('gunicorn is not installed; pip install -r requirements.txt')
+        if profile == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('uvicorn is not installed; pip install -r requirements.txt')
+
+    def procfile(self):
+        with open(os.path.join(settings.BASE_DIR, 'Procfile')) as f:
+            return dict(
+                (part.strip() for part in line.split(':', 1))
+                for line in f if ':' in line
+            )
+
+    def prepare(self, cashiers, products):
+        """Cashier sessions and ample stock in the copy; returns (session cookies, skus, product ids)"""
+        # Profiles are created with a blank employee_id, which is unique
+        for profile in UserProfile.objects.filter(employee_id=''):
+            profile.employee_id = f'EMP{profile.pk}'
+            profile.save()
+        cookies = []
+        for index in range(cashiers):
+            user, created = User.objects.get_or_create(username=f'load-{index}')
+            if created:
+                user.profile.employee_id = f'LOAD{index}'
+            user.profile.role = 'CASHIER'
+            user.profile.save()
+            # Sessions are stored in the database the servers will open
+            client = Client()
+            client.force_login(user)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            cookies.append(f'{settings.SESSION_COOKIE_NAME}={session}')
+        StockLevel.objects.update(quantity=1_000_000)
+        refresh_stock_totals(Product.all_objects.values_list('pk', flat=True))
+        rows = list(
+            Product.objects.filter(is_active=True).order_by('pk').values_list('pk', 'sku')[:products]
+        )
+        if not rows:
+            raise CommandError('No active products to sell')
+        return cookies, [sku for _, sku in rows], [pk for pk, _ in rows]
+
+    def start_server(self, profile, path, options, log):
+        port = free_port()
+        command = string.Template(self.procfile()[PROFILES[profile]]).safe_substitute(PORT=port)
+        env = dict(
+            os.environ,
+            PORT=str(port),
+            WEB_CONCURRENCY=str(options['server_workers']),
+            DATABASE_URL=f'sqlite:///{path}',
+            POS_ASYNC_VIEWS=str(profile == 'asgi'),
+        )
+        process = subprocess.Popen(
+            shlex.split(command), cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            try:
+                conn.request('GET', settings.LOGIN_URL)
+                if conn.getresponse().status == 200:
+                    return process, port
+            except (OSError, http.client.HTTPException):
+                pass
+            finally:
+                conn.close()
+            time.sleep(0.2)
+        self.stop_server(process)
+        log.seek(0)
+        raise CommandError(f'{profile} server did not start:\n{log.read().decode(errors="replace")[-2000:]}')
+
+    def stop_server(self, process):
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def run(self, profile, source, options):
+        cashiers = options['cashiers']
+        settings_dict = connection.settings_dict
+        original = settings_dict['NAME']
+        workdir = tempfile.mkdtemp(prefix='pos-load-')
+        path = os.path.join(workdir, 'load.sqlite3')
+        try:
+            with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+                src.backup(dst)
+            connections.close_all()
+            settings_dict['NAME'] = path
+            cookies, skus, product_ids = self.prepare(cashiers, options['products'])
+            connections.close_all()
+
+            with open(os.path.join(workdir, 'server.log'), 'w+b') as log:
+                process, port = self.start_server(profile, path, options, log)
+                try:
+                    deadline = time.monotonic() + options['duration']
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(cashiers) as pool:
+                        results = list(pool.map(
+                            lambda cookie: run_cashier(port, cookie, skus, product_ids, deadline), cookies
+                        ))
+                    elapsed = time.perf_counter() - start
+                finally:
+                    self.stop_server(process)
+        finally:
+            connections.close_all()
+            settings_dict['NAME'] = original
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        requests = sum(result[0] for result in results)
+        checkouts = sum(result[1] for result in results)
+        errors = sum(result[2] for result in results)
+        latencies = sorted(latency for result in results for latency in result[3])
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        p50 = statistics.median(latencies) if latencies else 0
+        self.stdout.write(
+            f'{profile:<6}{requests:>10}{requests / elapsed:>9.1f}{checkouts / elapsed:>13.1f}'
+            f'{errors:>8}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}'
+        )
+        return requests / elapsed
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+        for profile in options['profiles']:
+            self.check_server(profile)
+        source = str(connection.settings_dict['NAME'])
+
+        self.stdout.write(
+            f"{options['cashiers']} cashiers for {options['duration']}s against "
+            f"{options['server_workers']} server workers, on a copy of {source}"
+        )
+        self.stdout.write(
+            f"{'server':<6}{'requests':>10}{'req/s':>9}{'checkouts/s':>13}{'errors':>8}"
+            f"{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        rates = {profile: self.run(profile, source, options) for profile in options['profiles']}
+        if len(rates) == 2 and rates['wsgi']:
+            self.stdout.write(f"asgi / wsgi throughput: {rates['asgi'] / rates['wsgi']:.2f}x")
+        self.stdout.write(self.style.SUCCESS('Completed! Load test finished'))
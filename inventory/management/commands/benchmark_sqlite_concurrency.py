@@ -0,0 +1,164 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import UserProfile
+from inventory.models import Product, StockLevel
+from inventory.services import refresh_stock_totals
+
+
+def run_worker(args):
+    """Ring up checkouts as one cashier; runs in a forked process"""
+    index, checkouts, product_ids = args
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(User.objects.get(username=f'bench-{index}'))
+    add_url, checkout_url = reverse('pos:add_to_cart'), reverse('pos:checkout')
+
+    completed = locked = failed = 0
+    latencies = []
+    for n in range(checkouts):
+        product_id = product_ids[(index + n) % len(product_ids)]
+        start = time.perf_counter()
+        try:
+            added = client.post(
+                add_url, json.dumps({'product_id': product_id, 'quantity': 1}),
+                content_type='application/json',
+            ).json()
+            if added.get('status') != 'success':
+                raise OperationalError(added.get('message', 'add to cart failed'))
+            result = client.post(
+                checkout_url, json.dumps({'payment_method': 'card', 'amount_paid': 0}),
+                content_type='application/json',
+            ).json()
+            if result.get('status') != 'success':
+                raise OperationalError(result.get('message', 'checkout failed'))
+            completed += 1
+        except OperationalError as e:
+            if 'database is locked' in str(e):
+                locked += 1
+            else:
+                failed += 1
+        latencies.append(time.perf_counter() - start)
+    return completed, locked, failed, latencies
+
+
+class Command(BaseCommand):
+    help = (
+        'Run concurrent POS checkouts against a copy of the SQLite database with the '
+        'SQLITE_PRAGMAS profile off and on; reports throughput and "database is locked" errors'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Concurrent cashier processes (default: 8)',
+        )
+        parser.add_argument(
+            '--checkouts',
+            type=int,
+            default=25,
+            help='Checkouts per worker (default: 25)',
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=50,
+            help='Distinct products rung up (default: 50)',
+        )
+
+    def prepare(self, workers, products):
+        """Cashier accounts and ample stock in the copy; returns the product ids to sell"""
+        # Profiles are created with a blank employee_id, which is unique
+        for profile in UserProfile.objects.filter(employee_id=''):
+            profile.employee_id = f'EMP{profile.pk}'
+            profile.save()
+        for index in range(workers):
+            user, created = User.objects.get_or_create(
+                username=f'bench-{index}', defaults={'is_superuser': True, 'is_staff': True}
+            )
+            if created:
+                user.profile.employee_id = f'BENCH{index}'
+                user.profile.save()
+        StockLevel.objects.update(quantity=1_000_000)
+        refresh_stock_totals(Product.all_objects.values_list('pk', flat=True))
+        product_ids = list(
+            Product.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)[:products]
+        )
+        if not product_ids:
+            raise CommandError('No active products to sell')
+        return product_ids
+
+    def run(self, label, source, pragmas, transaction_mode, options):
+        workers, checkouts = options['workers'], options['checkouts']
+        settings_dict = connection.settings_dict
+        original = settings_dict['NAME'], settings.SQLITE_PRAGMAS, settings.SQLITE_TRANSACTION_MODE
+        workdir = tempfile.mkdtemp(prefix='sqlite-bench-')
+        path = os.path.join(workdir, 'bench.sqlite3')
+        try:
+            with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+                src.backup(dst)
+            if not pragmas:
+                # WAL is persistent, so the copy is switched back explicitly
+                with sqlite3.connect(path) as db:
+                    db.execute('PRAGMA journal_mode = DELETE')
+
+            connections.close_all()
+            settings_dict['NAME'] = path
+            settings.SQLITE_PRAGMAS = pragmas
+            settings.SQLITE_TRANSACTION_MODE = transaction_mode
+            product_ids = self.prepare(workers, options['products'])
+            # Children must open their own connections
+            connections.close_all()
+
+            jobs = [(index, checkouts, product_ids) for index in range(workers)]
+            start = time.perf_counter()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                results = pool.map(run_worker, jobs)
+            elapsed = time.perf_counter() - start
+        finally:
+            connections.close_all()
+            settings_dict['NAME'], settings.SQLITE_PRAGMAS, settings.SQLITE_TRANSACTION_MODE = original
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        completed = sum(result[0] for result in results)
+        locked = sum(result[1] for result in results)
+        failed = sum(result[2] for result in results)
+        latencies = sorted(latency for result in results for latency in result[3])
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(
+            f'{label:<6}{completed:>10}{locked:>9}{failed:>9}{completed / elapsed:>14.1f}'
+            f'{statistics.median(latencies) * 1000:>12.1f}{p95 * 1000:>10.1f}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+        source = str(connection.settings_dict['NAME'])
+        profile = settings.SQLITE_PRAGMAS or None
+        if profile is None:
+            raise CommandError('SQLITE_PRAGMAS is empty; enable SQLITE_PERFORMANCE_PROFILE to compare')
+
+        self.stdout.write(
+            f"{options['workers']} workers x {options['checkouts']} checkouts on a copy of {source}"
+        )
+        self.stdout.write(
+            f"{'mode':<6}{'completed':>10}{'locked':>9}{'failed':>9}{'checkouts/s':>14}"
+            f"{'p50 ms':>12}{'p95 ms':>10}"
+        )
+        self.run('off', source, {}, None, options)
+        self.run('on', source, profile, settings.SQLITE_TRANSACTION_MODE, options)
+        self.stdout.write(self.style.SUCCESS('Completed! Benchmark finished'))
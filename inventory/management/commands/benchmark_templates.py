@@ -0,0 +1,103 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.messages.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.functional import SimpleLazyObject
+
+from accounts.roles import get_role
+from pos.models import Sale
+
+
+class Command(BaseCommand):
+    help = (
+        'Time template rendering of the dashboard, product list, POS and receipt pages; '
+        'with --max-ms, fail when a page renders slower than the budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Renders per page; the median is reported (default: 20)',
+        )
+        parser.add_argument(
+            '--username',
+            help='User to render as (default: first superuser)',
+        )
+        parser.add_argument(
+            '--max-ms',
+            type=float,
+            help='Fail if any page\'s median render time exceeds this many milliseconds',
+        )
+
+    def pages(self):
+        pages = [
+            ('dashboard', reverse('inventory:dashboard')),
+            ('product list', reverse('inventory:product_list')),
+            ('pos', reverse('pos:pos')),
+        ]
+        sale = Sale.objects.order_by('-pk').first()
+        if sale:
+            pages.append(('receipt', reverse('pos:receipt', args=[sale.pk])))
+        else:
+            self.stdout.write(self.style.WARNING('No sales yet; skipping the receipt'))
+        return pages
+
+    def build_request(self, path, user):
+        request = RequestFactory().get(path)
+        request.user = user
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        request._messages = default_storage(request)
+        request.role = SimpleLazyObject(lambda: get_role(request))
+        request.resolver_match = resolve(path)
+        return request
+
+    def handle(self, *args, **options):
+        repeat = max(options['repeat'], 1)
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to render as; create a superuser or pass --username')
+
+        self.stdout.write(f"{'page':<15}{'view ms':>10}{'render ms':>12}{'queries':>10}")
+        slow = []
+        for label, path in self.pages():
+            request = self.build_request(path, user)
+            match = request.resolver_match
+
+            start = time.perf_counter()
+            response = match.func(request, *match.args, **match.kwargs)
+            view_ms = (time.perf_counter() - start) * 1000
+            if not hasattr(response, 'resolve_template'):
+                raise CommandError(f'{path} did not return a template response ({response.status_code})')
+            template = response.resolve_template(response.template_name)
+            context = response.resolve_context(response.context_data)
+
+            # First render evaluates lazy querysets; the rest measure the template itself
+            with CaptureQueriesContext(connection) as queries:
+                template.render(context, request)
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                template.render(context, request)
+                timings.append(time.perf_counter() - start)
+            render_ms = statistics.median(timings) * 1000
+
+            self.stdout.write(f'{label:<15}{view_ms:>10.2f}{render_ms:>12.2f}{len(queries):>10}')
+            if options['max_ms'] is not None and render_ms > options['max_ms']:
+                slow.append(f'{label} ({render_ms:.2f} ms)')
+
+        if slow:
+            raise CommandError(f"Over the {options['max_ms']} ms budget: {', '.join(slow)}")
+        self.stdout.write(self.style.SUCCESS('Completed! Benchmark finished'))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from inventory.images import generate_renditions, missing_renditions
+from inventory.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate WebP/JPEG renditions for product images that don\'t have them yet, '
+        'e.g. because a restart dropped their background job'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate renditions for every product image, not just missing ones',
+        )
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=0,
+            help='Only products saved at least this many minutes ago, so jobs still queued '
+                 'in running servers are left to them (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            products = Product.all_objects.exclude(image='').exclude(image__isnull=True)
+        else:
+            products = missing_renditions(timedelta(minutes=options['older_than']))
+
+        processed = 0
+        errors = 0
+        for product_id, name in products.values_list('pk', 'name'):
+            if generate_renditions(product_id) is None:
+                errors += 1
+                self.stdout.write(self.style.ERROR(f'✗ Error processing {name}'))
+            else:
+                processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Completed! Processed: {processed}, Errors: {errors}'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from inventory.imports import import_products, iter_catalog_rows, DEFAULT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a CSV or XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            help='CSV or XLSX with columns: name, category, sku, barcode, description, '
+                 'cost_price, selling_price, stock_quantity, minimum_stock',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        path = options['file']
+        try:
+            with open(path, 'rb') as fileobj:
+                report = import_products(
+                    iter_catalog_rows(fileobj, path),
+                    batch_size=options['batch_size'],
+                )
+        except OSError as e:
+            raise CommandError(f'Could not open {path}: {e}')
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for line in report.errors:
+            self.stdout.write(
+                self.style.ERROR(f"✗ Line {line['line']} ({line['code'] or '-'}): {line['message']}")
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Completed! Imported: {report.succeeded}, Errors: {report.failed}'
+            )
+        )
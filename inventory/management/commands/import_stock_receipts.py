@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from inventory.imports import import_stock_receipts, open_text_stream, DEFAULT_BATCH_SIZE
+from inventory.models import Location
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Receive stock from a CSV of sku/barcode, quantity and reference'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV file')
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Username recorded on the stock movements',
+        )
+        parser.add_argument(
+            '--reference',
+            default='',
+            help='Default reference for rows without one',
+        )
+        parser.add_argument(
+            '--location',
+            help='Code of the location receiving the stock (default location if omitted)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Lines per batch (default: {DEFAULT_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist")
+
+        location = None
+        if options['location']:
+            try:
+                location = Location.objects.get(code=options['location'])
+            except Location.DoesNotExist:
+                raise CommandError(f"Location '{options['location']}' does not exist")
+
+        try:
+            stream = open_text_stream(options['csv_file'])
+        except OSError as e:
+            raise CommandError(f'Could not open {options["csv_file"]}: {e}')
+
+        with stream:
+            report = import_stock_receipts(
+                stream,
+                user=user,
+                reference=options['reference'],
+                batch_size=options['batch_size'],
+                location=location,
+            )
+
+        for line in report.errors:
+            self.stdout.write(
+                self.style.ERROR(f"✗ Line {line['line']} ({line['code'] or '-'}): {line['message']}")
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Completed! Received: {report.succeeded}, Errors: {report.failed}'
+            )
+        )
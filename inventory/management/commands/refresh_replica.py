@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from inventory_pos.replica import REPLICA_ALIAS, refresh_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite database to the read replica with the online backup API. '
+        'Run it from cron, or keep it running with --interval'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Refresh every N seconds until interrupted (default: refresh once)',
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.settings:
+            raise CommandError("No 'replica' database is configured")
+        for alias in (DEFAULT_DB_ALIAS, REPLICA_ALIAS):
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"'{alias}' is not SQLite; refresh non-SQLite replicas with their own replication")
+
+        while True:
+            path, seconds = refresh_replica()
+            self.stdout.write(f'Refreshed {path} in {seconds:.2f}s')
+            if options['interval'] <= 0:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Completed! Replica refreshed'))
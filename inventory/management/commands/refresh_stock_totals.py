@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from inventory.models import Product
+from inventory.services import refresh_stock_totals
+
+
+class Command(BaseCommand):
+    help = 'Recompute each product\'s total stock from its per-location stock levels'
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.all_objects.values_list('pk', flat=True))
+        refresh_stock_totals(product_ids)
+        self.stdout.write(self.style.SUCCESS(f'Completed! Refreshed: {len(product_ids)} product(s)'))
@@ -0,0 +1,96 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from inventory.imports import open_text_stream
+from inventory.models import Product, Category
+from inventory.pricing import BelowCostError, REPRICE_MODES, read_price_list, reprice, reprice_from_list
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Reprice products by rule or from a supplier price list, recording price history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category',
+            help='Only reprice products in this category (by name)',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=[mode for mode, _ in REPRICE_MODES],
+            help='percent, absolute or margin',
+        )
+        parser.add_argument(
+            '--value',
+            help='Percentage, amount or target margin for --mode',
+        )
+        parser.add_argument(
+            '--from-file',
+            help='Supplier price list CSV with sku and price columns',
+        )
+        parser.add_argument(
+            '--reason',
+            default='',
+            help='Reason recorded in the price history',
+        )
+        parser.add_argument(
+            '--user',
+            help='Username recorded in the price history',
+        )
+        parser.add_argument(
+            '--allow-below-cost',
+            action='store_true',
+            help='Apply even if some prices would be cut below cost',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        if options['from_file']:
+            try:
+                with open_text_stream(options['from_file']) as stream:
+                    prices = read_price_list(stream)
+            except OSError as e:
+                raise CommandError(f'Could not open {options["from_file"]}: {e}')
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            try:
+                changed, unknown = reprice_from_list(
+                    prices, user=user, reason=options['reason'], allow_below_cost=options['allow_below_cost']
+                )
+            except BelowCostError as e:
+                raise CommandError(f'{e}; nothing was changed. Use --allow-below-cost to apply anyway')
+            for sku in unknown:
+                self.stdout.write(self.style.ERROR(f'✗ Unknown SKU: {sku}'))
+        else:
+            if not options['mode'] or options['value'] is None:
+                raise CommandError('Provide --mode and --value, or --from-file')
+
+            queryset = Product.objects.all()
+            if options['category']:
+                try:
+                    category = Category.objects.get(name=options['category'])
+                except Category.DoesNotExist:
+                    raise CommandError(f"Category '{options['category']}' does not exist")
+                queryset = queryset.filter(category=category)
+
+            try:
+                changed = reprice(
+                    queryset, options['mode'], options['value'], user=user, reason=options['reason'],
+                    allow_below_cost=options['allow_below_cost'],
+                )
+            except ArithmeticError:
+                raise CommandError(f"Invalid value '{options['value']}'")
+            except ValidationError as e:
+                raise CommandError('; '.join(e.messages))
+            except BelowCostError as e:
+                raise CommandError(f'{e}; nothing was changed. Use --allow-below-cost to apply anyway')
+
+        self.stdout.write(self.style.SUCCESS(f'Completed! Repriced: {changed} product(s)'))
@@ -1,13 +1,17 @@
-from django.core.management.base import BaseCommand
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time as day_start
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from inventory.images import MASTER_MAX_SIZE, normalise_image, release_image, rendition_names
 from inventory.models import Product
-from django.core.files.base import ContentFile
-from PIL import Image
-import os
-from io import BytesIO
 
 
 class Command(BaseCommand):
-    help = 'Resize existing product images to 300x300 pixels'
+    help = 'Shrink product images to content-hashed JPEG masters and regenerate their renditions'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -15,112 +19,139 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be resized without actually doing it',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes (default: 1, i.e. no pool)',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only products updated on or after this date/datetime (ISO format)',
+        )
+        parser.add_argument(
+            '--max-size',
+            type=int,
+            default=MASTER_MAX_SIZE,
+            help=f'Longest side of the stored master in px (default: {MASTER_MAX_SIZE})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Products written per bulk_update (default: 200)',
+        )
+
+    def parse_since(self, value):
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f"Invalid --since value '{value}'")
+            since = datetime.combine(day, day_start.min)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        
+        workers = max(options['workers'], 1)
+
         if dry_run:
             self.stdout.write('DRY RUN - No files will be modified')
-        
-        products_with_images = Product.objects.filter(image__isnull=False).exclude(image='')
-        total_products = products_with_images.count()
-        
-        if total_products == 0:
+
+        products = Product.objects.exclude(image__isnull=True).exclude(image='')
+        if options['since']:
+            products = products.filter(updated_at__gte=self.parse_since(options['since']))
+        current = list(products.order_by('pk').values_list('pk', 'image', 'image_renditions'))
+        jobs = [(pk, image, bool(renditions)) for pk, image, renditions in current]
+        total = len(jobs)
+
+        if total == 0:
             self.stdout.write('No products with images found.')
             return
-        
-        self.stdout.write(f'Found {total_products} products with images.')
-        
-        processed = 0
-        errors = 0
-        
-        for product in products_with_images:
-            try:
-                if dry_run:
-                    self.stdout.write(f'Would resize: {product.name} - {product.image.name}')
-                else:
-                    # Get current image
-                    current_image = product.image
-                    
-                    # Resize using the same method as in the model
-                    resized_image = self.resize_image(current_image)
-                    
-                    if resized_image != current_image:
-                        # Save the resized image
-                        product.image.save(
-                            resized_image.name,
-                            resized_image,
-                            save=False  # Don't trigger save() again
-                        )
-                        product.save(update_fields=['image'])
-                        
-                        self.stdout.write(f'✓ Resized: {product.name}')
-                    else:
-                        self.stdout.write(f'- Skipped: {product.name} (resize failed)')
-                
-                processed += 1
-                
-            except Exception as e:
+
+        self.stdout.write(f'Found {total} products with images.')
+        if dry_run:
+            for pk, image, _ in jobs:
+                self.stdout.write(f'Would resize: {pk} - {image}')
+            self.stdout.write(f'DRY RUN completed. Would process {total} images.')
+            return
+
+        names = {pk: image for pk, image, _ in jobs}
+        old_renditions = {pk: renditions for pk, _, renditions in current}
+        pending = []
+        resized = skipped = errors = done = 0
+        started = time.monotonic()
+
+        for product_id, result in self.run_jobs(jobs, workers, options['max_size']):
+            done += 1
+            if isinstance(result, Exception):
                 errors += 1
-                self.stdout.write(
-                    self.style.ERROR(f'✗ Error processing {product.name}: {e}')
-                )
-        
-        if not dry_run:
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Completed! Processed: {processed}, Errors: {errors}'
-                )
+                self.stdout.write(self.style.ERROR(f'✗ Error processing {names[product_id]}: {result}'))
+            else:
+                _, new_name, urls = result
+                if new_name is None:
+                    skipped += 1
+                else:
+                    resized += 1
+                    pending.append(Product(pk=product_id, image=new_name, image_renditions=urls))
+            if len(pending) >= options['batch_size']:
+                self.write_back(pending, names, old_renditions)
+                pending = []
+            if done % 50 == 0 or done == total:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'[{done}/{total}] {done / elapsed if elapsed else 0:.1f} images/s')
+        self.write_back(pending, names, old_renditions)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Completed! Resized: {resized}, Skipped: {skipped}, Errors: {errors} '
+                f'in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} images/s)'
             )
-        else:
-            self.stdout.write(f'DRY RUN completed. Would process {processed} images.')
-
-    def resize_image(self, image):
-        """
-        Resize image to 300x300 with white background
-        """
-        try:
-            # Open the image
-            img = Image.open(image)
-            
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'P', 'LA'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize to 300x300 with high quality
-            img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-            
-            # Create a new square image with white background
-            new_img = Image.new('RGB', (300, 300), (255, 255, 255))
-            
-            # Calculate position to center the image
-            x = (300 - img.width) // 2
-            y = (300 - img.height) // 2
-            
-            # Paste the resized image onto the white background
-            new_img.paste(img, (x, y))
-            
-            # Save to BytesIO
-            output = BytesIO()
-            new_img.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            
-            # Create new ContentFile
-            resized_image = ContentFile(output.read())
-            
-            # Keep original filename but ensure .jpg extension
-            original_name = image.name
-            name_without_ext = os.path.splitext(os.path.basename(original_name))[0]
-            resized_image.name = f"{name_without_ext}_resized.jpg"
-            
-            return resized_image
-            
-        except Exception as e:
-            print(f"Image resizing failed: {e}")
-            return image
\ No newline at end of file
+        )
+
+    def run_jobs(self, jobs, workers, max_size):
+        """Yield (product_id, result or exception) as images finish"""
+        if workers == 1:
+            for pk, image, has_renditions in jobs:
+                try:
+                    yield pk, normalise_image(pk, image, max_size, has_renditions)
+                except Exception as e:
+                    yield pk, e
+            return
+
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(normalise_image, pk, image, max_size, has_renditions): pk
+                for pk, image, has_renditions in jobs
+            }
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+
+    def write_back(self, products, names, old_renditions):
+        """Store new image names and renditions; products whose image changed meanwhile are left alone"""
+        if not products:
+            return
+        current = dict(
+            Product.all_objects.filter(pk__in=[p.pk for p in products]).values_list('pk', 'image')
+        )
+        products = [p for p in products if current.get(p.pk) == names[p.pk]]
+        # bulk_update skips auto_now; cached cards are keyed on updated_at
+        now = timezone.now()
+        for product in products:
+            product.updated_at = now
+        Product.all_objects.bulk_update(products, ['image', 'image_renditions', 'updated_at'])
+        # Originals replaced by a master are swept later unless another product still uses them
+        for product in products:
+            if product.image.name != names[product.pk]:
+                release_image(
+                    names[product.pk], old_renditions[product.pk],
+                    keep=rendition_names(product.image_renditions),
+                )
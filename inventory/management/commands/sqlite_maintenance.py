@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from inventory_pos.sqlite import current_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        'Run PRAGMA optimize and checkpoint the WAL of a SQLite database. '
+        'Schedule it (e.g. hourly from cron) so the planner statistics stay '
+        'current and the -wal file doesn\'t keep growing'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Database alias (default: "default")',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+            default='TRUNCATE',
+            help='wal_checkpoint mode; TRUNCATE also shrinks the -wal file (default: TRUNCATE)',
+        )
+        parser.add_argument(
+            '--skip-optimize',
+            action='store_true',
+            help='Only checkpoint, without PRAGMA optimize',
+        )
+
+    def wal_size(self, path):
+        try:
+            return os.path.getsize(f'{path}-wal')
+        except OSError:
+            return 0
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"Database '{options['database']}' is not SQLite")
+        path = str(connection.settings_dict['NAME'])
+
+        pragmas = current_pragmas(connection, ['journal_mode', 'synchronous', 'busy_timeout'])
+        self.stdout.write(', '.join(f'{name}={value}' for name, value in pragmas.items()))
+
+        with connection.cursor() as cursor:
+            if not options['skip_optimize']:
+                cursor.execute('PRAGMA optimize')
+                self.stdout.write('Ran PRAGMA optimize')
+
+            if pragmas['journal_mode'] != 'wal':
+                self.stdout.write(self.style.WARNING('Not in WAL mode; nothing to checkpoint'))
+            else:
+                wal_before = self.wal_size(path)
+                cursor.execute(f"PRAGMA wal_checkpoint({options['checkpoint']})")
+                busy, log_frames, checkpointed = cursor.fetchone()
+                self.stdout.write(
+                    f"Checkpoint {options['checkpoint']}: {checkpointed}/{log_frames} frames, "
+                    f'WAL {wal_before} -> {self.wal_size(path)} bytes'
+                )
+                if busy:
+                    self.stdout.write(self.style.WARNING(
+                        'Checkpoint was blocked by readers or writers; run it again later'
+                    ))
+
+        self.stdout.write(self.style.SUCCESS('Completed! SQLite maintenance finished'))
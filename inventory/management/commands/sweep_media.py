@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from inventory.images import sweep_released_files
+from inventory_pos.storage import ORPHAN_GRACE
+
+
+class Command(BaseCommand):
+    help = 'Delete released images and renditions that nothing references any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=ORPHAN_GRACE // 3600,
+            help=f'Keep files saved within this many hours (default: {ORPHAN_GRACE // 3600})',
+        )
+
+    def handle(self, *args, **options):
+        deleted = sweep_released_files(grace=options['grace'] * 3600)
+        self.stdout.write(self.style.SUCCESS(f'Completed! Deleted: {len(deleted)} file(s)'))
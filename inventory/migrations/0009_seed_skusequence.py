@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:30
+
+from django.db import migrations
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each category code's sequence at the highest SKU number in use"""
+    Product = apps.get_model('inventory', 'Product')
+    SkuSequence = apps.get_model('inventory', 'SkuSequence')
+
+    highest = {}
+    for sku in Product.objects.values_list('sku', flat=True).iterator():
+        code, _, number = (sku or '').rpartition('-')
+        if code and number.isdigit():
+            highest[code] = max(highest.get(code, 0), int(number))
+
+    SkuSequence.objects.bulk_create(
+        [SkuSequence(code=code, last_number=number) for code, number in highest.items() if len(code) <= 10]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_skusequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:40
+
+from django.db import migrations
+
+
+def seed_stock_levels(apps, schema_editor):
+    """Put all existing stock at a default location"""
+    Location = apps.get_model('inventory', 'Location')
+    Product = apps.get_model('inventory', 'Product')
+    StockLevel = apps.get_model('inventory', 'StockLevel')
+
+    location = Location.objects.filter(is_default=True).first()
+    if location is None:
+        location = Location.objects.create(name='Main Store', code='MAIN', is_default=True)
+
+    StockLevel.objects.bulk_create(
+        (
+            StockLevel(product_id=pk, location=location, quantity=quantity)
+            for pk, quantity in Product.objects.values_list('pk', 'stock_quantity').iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_location_stocklevel'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_stock_levels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:29
+
+import pos.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_seed_stocklevels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Product image (Max: 5MB, smaller copies are generated automatically)', null=True, upload_to='products/', validators=[pos.validators.validate_image_file]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:33
+
+import inventory_pos.storage
+import pos.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_product_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Product image (Max: 5MB, smaller copies are generated automatically)', null=True, storage=inventory_pos.storage.get_content_storage, upload_to='products/', validators=[pos.validators.validate_image_file]),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:26
+
+from django.core.management.color import no_style
+from django.db import migrations
+
+
+def carry_over_version(apps, schema_editor):
+    """Keep the counter's value as the newest row, so versions never go backwards"""
+    CatalogSequence = apps.get_model('inventory', 'CatalogSequence')
+    Product = apps.get_model('inventory', 'Product')
+
+    current = CatalogSequence.objects.filter(pk=1).values_list('last_number', flat=True).first() or 0
+    highest = Product.objects.order_by('-catalog_version').values_list('catalog_version', flat=True).first() or 0
+    CatalogSequence.objects.all().delete()
+    if max(current, highest):
+        CatalogSequence.objects.create(pk=max(current, highest))
+        # Explicit ids don't move the sequence on every database
+        connection = schema_editor.connection
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [CatalogSequence]):
+                cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_catalog_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(carry_over_version, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='catalogsequence',
+            name='last_number',
+        ),
+    ]
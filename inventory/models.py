@@ -1,13 +1,12 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from django.utils import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from PIL import Image
-import os
-from io import BytesIO
-from django.core.files.base import ContentFile
+from django.db.models.functions import Cast, Coalesce
+from inventory_pos.query_cache import GenerationQuerySet, bump_on_write
+from inventory_pos.storage import get_content_storage
 
 # Import custom validators for security
 try:
@@ -48,6 +47,8 @@ class Category(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = GenerationQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Categories"
         ordering = ['name']
@@ -56,6 +57,75 @@ class Category(models.Model):
         return self.name
 
 
+class SkuSequence(models.Model):
+    """Per-category-code counter used to hand out SKU numbers atomically"""
+    code = models.CharField(max_length=10, unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return f"{self.code} ({self.last_number})"
+
+    @classmethod
+    def reserve(cls, code, count=1):
+        """
+        Reserve count consecutive numbers for code and return them as a range.
+        The increment is a single UPDATE, so concurrent callers never share
+        a number.
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(code=code).update(
+                last_number=models.F('last_number') + count
+            ):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(code=code, last_number=count)
+                except IntegrityError:
+                    # Another request created the row first
+                    cls.objects.filter(code=code).update(
+                        last_number=models.F('last_number') + count
+                    )
+            last = cls.objects.filter(code=code).values_list('last_number', flat=True).get()
+        return range(last - count + 1, last + 1)
+
+    @staticmethod
+    def format_sku(code, number):
+        return f"{code}-{number:04d}"
+
+
+class CatalogSequence(models.Model):
+    """
+    Insert-only sequence behind Product.catalog_version and
+    StockLevel.catalog_version. Every product, category or stock write
+    inserts a row and stamps its id, so POS terminals can sync by version
+    without writers queueing on one counter row.
+
+    Ids are handed out in insert order but become visible in commit order,
+    so readers of a delta re-read a window of recent versions
+    (pos.catalog.DELTA_OVERLAP) to pick up slow transactions.
+    """
+    # Rows more than this many versions old are pruned; the newest always stays
+    KEEP = 1000
+
+    def __str__(self):
+        return f"Catalog version {self.pk}"
+
+    @classmethod
+    def advance(cls):
+        """Return a new catalog version"""
+        version = cls.objects.create().pk
+        if version % cls.KEEP == 0:
+            cls.objects.filter(pk__lt=version - cls.KEEP).delete()
+        return version
+
+    @classmethod
+    def current(cls):
+        return cls.objects.aggregate(version=models.Max('pk'))['version'] or 0
+
+
 class Supplier(models.Model):
     name = models.CharField(max_length=200)
     contact_person = models.CharField(max_length=100, blank=True)
@@ -72,7 +142,147 @@ class Supplier(models.Model):
         return self.name
 
 
-class ProductManager(models.Manager):
+
+class Location(models.Model):
+    """A store or stockroom that holds its own stock"""
+    name = models.CharField(max_length=100, unique=True)
+    code = models.CharField(max_length=20, unique=True)
+    is_default = models.BooleanField(
+        default=False,
+        help_text="Receives stock movements that don't name a location"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def get_default(cls):
+        location = cls.objects.filter(is_default=True).first()
+        if location is None:
+            location = cls.objects.order_by('pk').first()
+        if location is None:
+            location = cls.objects.create(name='Main Store', code='MAIN', is_default=True)
+        return location
+
+    @classmethod
+    async def aget_default(cls):
+        location = await cls.objects.filter(is_default=True).afirst()
+        if location is None:
+            location = await cls.objects.order_by('pk').afirst()
+        if location is None:
+            location = await cls.objects.acreate(name='Main Store', code='MAIN', is_default=True)
+        return location
+
+class ProductQuerySet(GenerationQuerySet):
+    """QuerySet with database-side valuation and bulk lifecycle helpers"""
+
+    DELETE_CHUNK_SIZE = 500
+
+    # Writes stamp a new catalog version unless the caller passes one
+    def update(self, **kwargs):
+        if 'catalog_version' not in kwargs:
+            kwargs['catalog_version'] = CatalogSequence.advance()
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        version = CatalogSequence.advance()
+        for obj in objs:
+            obj.catalog_version = version
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        version = CatalogSequence.advance()
+        for obj in objs:
+            obj.catalog_version = version
+        return super().bulk_update(objs, {*fields, 'catalog_version'}, batch_size=batch_size)
+
+    def delete(self):
+        CatalogSequence.advance()
+        return super().delete()
+
+    def soft_delete(self, user=None):
+        """Archive every product in the queryset with one UPDATE"""
+        products = list(self.filter(is_deleted=False).values_list('id', 'name'))
+        if not products:
+            return 0
+        now = timezone.now()
+        with transaction.atomic():
+            count = self.model.all_objects.filter(
+                pk__in=[pk for pk, _ in products]
+            ).update(is_deleted=True, deleted_at=now, deleted_by=user, updated_at=now)
+            ProductAuditLog.record(products, 'ARCHIVE', user)
+        return count
+
+    def restore(self, user=None):
+        """Restore every archived product in the queryset with one UPDATE"""
+        products = list(self.filter(is_deleted=True).values_list('id', 'name'))
+        if not products:
+            return 0
+        with transaction.atomic():
+            count = self.model.all_objects.filter(
+                pk__in=[pk for pk, _ in products]
+            ).update(is_deleted=False, deleted_at=None, deleted_by=None, updated_at=timezone.now())
+            ProductAuditLog.record(products, 'RESTORE', user)
+        return count
+
+    def hard_delete(self, user=None, chunk_size=None):
+        """Permanently delete the queryset in chunks to keep each cascade small"""
+        chunk_size = chunk_size or self.DELETE_CHUNK_SIZE
+        products = list(self.values_list('id', 'name'))
+        deleted = 0
+        for start in range(0, len(products), chunk_size):
+            chunk = products[start:start + chunk_size]
+            with transaction.atomic():
+                ProductAuditLog.record(chunk, 'DELETE', user)
+                self.model.all_objects.filter(pk__in=[pk for pk, _ in chunk]).delete()
+            deleted += len(chunk)
+        return deleted
+
+    def with_valuation(self):
+        """
+        Annotate margin_percent, stock_value and potential_revenue in SQL
+        so listings and exports can sort/filter on them without Python loops
+        """
+        money = models.DecimalField(max_digits=20, decimal_places=2)
+        # Cast to float so SQLite doesn't fall back to integer division
+        cost = Cast('cost_price', models.FloatField())
+        price = Cast('selling_price', models.FloatField())
+        return self.annotate(
+            margin_percent=models.Case(
+                models.When(cost_price__gt=0, then=(price - cost) * 100.0 / cost),
+                default=models.Value(0.0),
+                output_field=models.FloatField(),
+            ),
+            stock_value=models.ExpressionWrapper(
+                models.F('stock_quantity') * models.F('cost_price'),
+                output_field=money,
+            ),
+            potential_revenue=models.ExpressionWrapper(
+                models.F('stock_quantity') * models.F('selling_price'),
+                output_field=money,
+            ),
+        )
+
+    def with_stock_at(self, location):
+        """Annotate location_stock, the quantity held at location"""
+        level = StockLevel.objects.filter(
+            product=models.OuterRef('pk'), location=location
+        ).values('quantity')[:1]
+        return self.annotate(
+            location_stock=Coalesce(
+                models.Subquery(level, output_field=models.IntegerField()), models.Value(0)
+            )
+        )
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
     """Custom manager for Product model to handle soft deletes"""
     
     def get_queryset(self):
@@ -114,7 +324,7 @@ class Product(models.Model):
         validators=[MinValueValidator(0), validate_reasonable_price]
     )
     
-    # Stock management
+    # Stock management; the total across locations, refreshed from StockLevel by inventory.services
     stock_quantity = models.PositiveIntegerField(
         default=0,
         validators=[validate_reasonable_quantity]
@@ -128,11 +338,14 @@ class Product(models.Model):
     # Product details
     image = models.ImageField(
         upload_to='products/', 
+        storage=get_content_storage,
         blank=True, 
         null=True,
         validators=[validate_image_file],
-        help_text="Product image (Max: 5MB, will be automatically resized to 300x300px)"
+        help_text="Product image (Max: 5MB, smaller copies are generated automatically)"
     )
+    # {size: {'webp': url, 'jpg': url}}, filled in by inventory.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     
     # Soft delete functionality
@@ -149,10 +362,12 @@ class Product(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # CatalogSequence value of the last write, used as the POS sync cursor
+    catalog_version = models.PositiveBigIntegerField(default=0, db_index=True, editable=False)
 
     # Custom manager
     objects = ProductManager()
-    all_objects = models.Manager()  # Access to all objects including deleted
+    all_objects = ProductQuerySet.as_manager()  # Access to all objects including deleted
 
     class Meta:
         ordering = ['name']
@@ -160,6 +375,14 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can release a replaced image
+        instance._loaded_image = instance.__dict__.get('image')
+        instance._loaded_renditions = instance.__dict__.get('image_renditions')
+        return instance
+
     @property
     def profit_margin(self):
         """Calculate profit margin percentage"""
@@ -174,114 +397,205 @@ class Product(models.Model):
 
     def soft_delete(self, user=None):
         """Soft delete the product"""
+        Product.all_objects.filter(pk=self.pk).soft_delete(user=user)
         self.is_deleted = True
         self.deleted_at = timezone.now()
         self.deleted_by = user
-        self.save()
 
-    def restore(self):
+    def restore(self, user=None):
         """Restore a soft-deleted product"""
+        Product.all_objects.filter(pk=self.pk).restore(user=user)
         self.is_deleted = False
         self.deleted_at = None
         self.deleted_by = None
-        self.save()
 
-    def hard_delete(self):
+    def hard_delete(self, user=None):
         """Permanently delete the product"""
-        super().delete()
+        Product.all_objects.filter(pk=self.pk).hard_delete(user=user)
 
     def save(self, *args, **kwargs):
         # Auto-generate SKU if not provided
         if not self.sku:
-            # Generate SKU based on category and product count
+            # Next number from the per-category sequence
             category_code = self.category.name[:3].upper()
-            product_count = Product.objects.filter(category=self.category).count() + 1
-            self.sku = f"{category_code}-{product_count:04d}"
+            self.sku = SkuSequence.format_sku(category_code, SkuSequence.reserve(category_code)[0])
             
-            # Ensure uniqueness
-            while Product.objects.filter(sku=self.sku).exists():
-                product_count += 1
-                self.sku = f"{category_code}-{product_count:04d}"
-        
-        # Resize image if provided and it's a new upload
-        if self.image and hasattr(self.image, 'file'):
-            try:
-                self.image = self.resize_image(self.image)
-            except Exception as e:
-                print(f"Error during image processing: {e}")
-                # Continue saving without image resizing if error occurs
+            # Only loops if someone typed a matching SKU by hand
+            while Product.all_objects.filter(sku=self.sku).exists():
+                self.sku = SkuSequence.format_sku(category_code, SkuSequence.reserve(category_code)[0])
         
+        # New images are rendered in the background; placeholder until then
+        track_image = 'image' not in self.get_deferred_fields()
+        old_image = getattr(self, '_loaded_image', None) or None
+        new_upload = track_image and bool(self.image) and not self.image._committed
+        if new_upload or (track_image and (self.image.name or None) != old_image):
+            self.image_renditions = {}
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'image' in update_fields:
+                kwargs['update_fields'] = set(update_fields) | {'image_renditions'}
+
+        # The stock service moves the total with F(); a stale copy mustn't overwrite it
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = {
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name != 'stock_quantity'
+            }
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'catalog_version'}
+        self.catalog_version = CatalogSequence.advance()
         super().save(*args, **kwargs)
 
-    def resize_image(self, image):
-        """
-        Resize uploaded image to 300x300 with better error handling
-        """
-        try:
-            # Reset file pointer to beginning
-            image.seek(0)
-            
-            # Open the image
-            img = Image.open(image)
-            
-            # Load the image data to avoid lazy loading issues
-            img.load()
-            
-            # Convert to RGB if necessary (handles RGBA, P mode images)
-            if img.mode in ('RGBA', 'P', 'LA'):
-                # Create a white background
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                if img.mode == 'RGBA':
-                    background.paste(img, mask=img.split()[-1])
-                else:
-                    background.paste(img)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Resize to 300x300 with high quality (maintaining aspect ratio)
-            img.thumbnail((300, 300), Image.Resampling.LANCZOS)
-            
-            # Create a new square image with white background
-            new_img = Image.new('RGB', (300, 300), (255, 255, 255))
-            
-            # Calculate position to center the image
-            x = (300 - img.width) // 2
-            y = (300 - img.height) // 2
-            
-            # Paste the resized image onto the white background
-            new_img.paste(img, (x, y))
-            
-            # Save to BytesIO
-            output = BytesIO()
-            new_img.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
-            
-            # Create new ContentFile
-            resized_image = ContentFile(output.read())
-            
-            # Keep original filename but ensure .jpg extension
-            original_name = image.name
-            name_without_ext = os.path.splitext(original_name)[0]
-            resized_image.name = f"{name_without_ext}_resized.jpg"
-            
-            print(f"Successfully resized image: {original_name} -> {resized_image.name}")
-            return resized_image
-            
-        except Exception as e:
-            # If resizing fails, return original image
-            print(f"Image resizing failed for {image.name}: {e}")
-            image.seek(0)  # Reset pointer
-            return image
-        
-        # Resize image if it exists
-        if self.image:
-            img = Image.open(self.image.path)
-            if img.height > 300 or img.width > 300:
-                img.thumbnail((300, 300))
-                img.save(self.image.path)
+        if not track_image:
+            return
+        from .images import release_image, schedule_renditions
+        image_name = self.image.name or None
+        if image_name and (new_upload or image_name != old_image):
+            schedule_renditions(self.pk)
+        # The previous file goes once nothing else references it
+        if old_image and old_image != image_name:
+            old_renditions = self._loaded_renditions
+            transaction.on_commit(lambda: release_image(old_image, old_renditions))
+        self._loaded_image = image_name
+        self._loaded_renditions = self.image_renditions
+
+    def rendition_url(self, size, fmt='jpg'):
+        """URL of the smallest rendition at least size px, or the placeholder"""
+        sizes = sorted(int(key) for key in self.image_renditions or {})
+        for candidate in sizes:
+            if candidate >= size:
+                return self.image_renditions[str(candidate)][fmt]
+        if sizes:
+            return self.image_renditions[str(sizes[-1])][fmt]
+        from .images import placeholder_url
+        return placeholder_url()
+
+
+
+class StockLevel(models.Model):
+    """
+    Stock of one product at one location. Movements lock and change only
+    their location's row; Product.stock_quantity is recomputed from the
+    levels after commit (see inventory.services).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_levels')
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='stock_levels')
+    quantity = models.PositiveIntegerField(default=0)
+    # CatalogSequence value of the last movement, so POS deltas carry stock changes
+    catalog_version = models.PositiveBigIntegerField(default=0, db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'location'], name='inventory_stocklevel_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.location.code}: {self.quantity}"
+
+
+@receiver(post_save, sender=Product)
+def create_default_stock_level(sender, instance, created, raw=False, **kwargs):
+    """New products start with their stock at the default location"""
+    if created and not raw:
+        StockLevel.objects.get_or_create(
+            product=instance,
+            location=Location.get_default(),
+            defaults={'quantity': instance.stock_quantity},
+        )
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_product_queries(sender, **kwargs):
+    """Cached product listings are keyed on the Product and Category generations"""
+    bump_on_write(sender, **kwargs)
+
+
+@receiver(post_delete, sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+def advance_catalog_version(sender, raw=False, origin=None, **kwargs):
+    """Product saves stamp their own version; deletes and category changes advance it here"""
+    # Product queryset deletes advance once in ProductQuerySet.delete
+    if not raw and not isinstance(origin, ProductQuerySet):
+        CatalogSequence.advance()
+
+
+@receiver(post_delete, sender=Product)
+def release_product_image(sender, instance, **kwargs):
+    """Hard deletes release the image files; the sweep keeps them while another product shares them"""
+    if instance.image:
+        from .images import release_image
+        name, renditions = instance.image.name, instance.image_renditions
+        transaction.on_commit(lambda: release_image(name, renditions))
+
+class PriceChange(models.Model):
+    """History of selling price changes"""
+    SOURCES = [
+        ('EDIT', 'Product Edit'),
+        ('QUICK_EDIT', 'Quick Edit'),
+        ('BULK', 'Bulk Reprice'),
+        ('SUPPLIER_LIST', 'Supplier Price List'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_changes')
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2)
+    source = models.CharField(max_length=20, choices=SOURCES, default='EDIT')
+    reason = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='inventory_pricechange_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name}: {self.old_price} -> {self.new_price}"
+
+    @classmethod
+    def price_at(cls, product, when):
+        """Selling price of product at the given datetime"""
+        change = cls.objects.filter(product=product, created_at__lte=when).order_by('-created_at').first()
+        if change:
+            return change.new_price
+        # Before the first recorded change the price was that change's old price
+        first_after = cls.objects.filter(product=product, created_at__gt=when).order_by('created_at').first()
+        return first_after.old_price if first_after else product.selling_price
+
+
+class ProductAuditLog(models.Model):
+    """Audit trail for archive, restore and permanent delete operations"""
+    ACTIONS = [
+        ('ARCHIVE', 'Archived'),
+        ('RESTORE', 'Restored'),
+        ('DELETE', 'Permanently Deleted'),
+    ]
+
+    # Plain id/name rather than a foreign key so rows survive hard deletes
+    product_id = models.BigIntegerField(db_index=True)
+    product_name = models.CharField(max_length=200)
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.product_name} - {self.action}"
+
+    @classmethod
+    def record(cls, products, action, user=None):
+        """Write one row per (id, name) pair with a single bulk insert"""
+        if user is not None and not getattr(user, 'is_authenticated', False):
+            user = None
+        return cls.objects.bulk_create([
+            cls(product_id=pk, product_name=name, action=action, user=user)
+            for pk, name in products
+        ])
 
 
 class StockMovement(models.Model):
@@ -291,9 +605,19 @@ class StockMovement(models.Model):
         ('ADJUSTMENT', 'Adjustment'),
         ('SALE', 'Sale'),
         ('RETURN', 'Return'),
+        ('TRANSFER_OUT', 'Transfer Out'),
+        ('TRANSFER_IN', 'Transfer In'),
     ]
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        help_text="Where the stock moved; the default location if empty"
+    )
     movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
     quantity = models.IntegerField()
     reason = models.CharField(max_length=200, blank=True)
@@ -308,20 +632,89 @@ class StockMovement(models.Model):
         return f"{self.product.name} - {self.movement_type} - {self.quantity}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        
-        # Only auto-update stock for non-SALE movements
-        # SALE movements are handled manually in the POS checkout
-        if self.movement_type != 'SALE':
-            # Update product stock based on movement type
-            if self.movement_type in ['IN', 'RETURN']:
-                self.product.stock_quantity += abs(self.quantity)
-            elif self.movement_type == 'OUT':
-                self.product.stock_quantity -= abs(self.quantity)
-            elif self.movement_type == 'ADJUSTMENT':
-                self.product.stock_quantity = abs(self.quantity)
-            
-            self.product.save()
+        # Apply the stock change only when the movement is first recorded;
+        # the service updates the product with F() and locks the row
+        if self._state.adding:
+            from .services import update_stock
+            with transaction.atomic():
+                update_stock([self])
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
+
+
+class StockCount(models.Model):
+    """
+    A cycle-count session. Scans are appended while it is open; posting
+    turns the variances into ADJUSTMENT movements in one transaction.
+
+    Scope: a category counts every product in it (unscanned ones as zero),
+    a shelf-only session counts just what was scanned, and a session with
+    neither is a full count of all products.
+    """
+    STATUS_CHOICES = [
+        ('OPEN', 'Open'),
+        ('POSTED', 'Posted'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    name = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        help_text="Location being counted; the default location if empty"
+    )
+    shelf = models.CharField(max_length=50, blank=True, help_text="Shelf or bin being counted")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def is_open(self):
+        return self.status == 'OPEN'
 
+    @property
+    def counts_unscanned(self):
+        """Whether products in scope that were never scanned count as zero"""
+        return self.category_id is not None or not self.shelf
+
+    def scope(self):
+        """Products whose stock this count sets"""
+        scanned = self.scans.values('product_id')
+        if self.category_id is not None:
+            return Product.objects.filter(models.Q(category_id=self.category_id) | models.Q(pk__in=scanned))
+        if self.shelf:
+            return Product.all_objects.filter(pk__in=scanned)
+        return Product.objects.all()
+
+
+class StockCountScan(models.Model):
+    """One scan from a handheld; append-only, corrections are negative quantities"""
+    count = models.ForeignKey(StockCount, on_delete=models.CASCADE, related_name='scans')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='count_scans')
+    quantity = models.IntegerField(default=1)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    scanned_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-scanned_at']
+        indexes = [
+            models.Index(fields=['count', 'product'], name='inventory_countscan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} - {self.product_id} x {self.quantity}"
 
 # Removed Customer model as this is a walk-in POS system
@@ -0,0 +1,186 @@
+"""
+Selling price changes.
+
+Every price change goes through here so it is recorded in PriceChange.
+Bulk repricing runs as set-based UPDATEs and writes history with
+bulk_create, so repricing thousands of products is a handful of queries.
+"""
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from .imports import _normalise_row
+from .models import CatalogSequence, Product, PriceChange, validate_reasonable_price
+
+
+REPRICE_MODES = [
+    ('percent', 'Change by percentage'),
+    ('absolute', 'Change by amount'),
+    ('margin', 'Set margin on cost (%)'),
+]
+
+# Allowed rule values, so a slipped digit can't reprice the whole catalog
+REPRICE_LIMITS = {
+    'percent': (Decimal('-90'), Decimal('100')),
+    'absolute': (Decimal('-10000'), Decimal('10000')),
+    'margin': (Decimal('0'), Decimal('500')),
+}
+
+CHUNK_SIZE = 500
+
+
+class BelowCostError(ValueError):
+    """Raised when repricing would take prices below cost without allow_below_cost"""
+
+    def __init__(self, count):
+        self.count = count
+        super().__init__(f'{count} product(s) would be priced below cost')
+
+
+def change_price(product, new_price, user=None, source='EDIT', reason=''):
+    """Set a single product's selling price and record the change"""
+    new_price = Decimal(new_price).quantize(Decimal('0.01'))
+    validate_reasonable_price(new_price)
+    old_price = Product.all_objects.filter(pk=product.pk).values_list('selling_price', flat=True).get()
+    with transaction.atomic():
+        Product.all_objects.filter(pk=product.pk).update(selling_price=new_price, updated_at=timezone.now())
+        if old_price != new_price:
+            PriceChange.objects.create(
+                product=product, old_price=old_price, new_price=new_price,
+                source=source, reason=reason, user=user,
+            )
+    product.selling_price = new_price
+    return old_price != new_price
+
+
+def record_price_change(product, old_price, user=None, source='EDIT', reason=''):
+    """Record a change already saved on product (e.g. by a model form)"""
+    if old_price is not None and Decimal(old_price) != product.selling_price:
+        PriceChange.objects.create(
+            product=product, old_price=old_price, new_price=product.selling_price,
+            source=source, reason=reason, user=user,
+        )
+
+
+def validate_reprice_value(mode, value):
+    """Raise ValidationError unless value is within REPRICE_LIMITS for mode"""
+    if mode not in REPRICE_LIMITS:
+        raise ValidationError(f'Unknown reprice mode: {mode}')
+    low, high = REPRICE_LIMITS[mode]
+    if not low <= Decimal(value) <= high:
+        raise ValidationError(f'Value must be between {low} and {high} for this rule')
+
+
+def reprice_expression(mode, value):
+    """SQL expression for the new selling price"""
+    value = Decimal(value)
+    money = DecimalField(max_digits=10, decimal_places=2)
+    # Factors keep their precision; only the resulting price is rounded
+    factor = DecimalField(max_digits=12, decimal_places=6)
+    if mode == 'percent':
+        expression = F('selling_price') * Value(1 + value / 100, output_field=factor)
+    elif mode == 'absolute':
+        expression = F('selling_price') + Value(value, output_field=money)
+    elif mode == 'margin':
+        expression = F('cost_price') * Value(1 + value / 100, output_field=factor)
+    else:
+        raise ValueError(f'Unknown reprice mode: {mode}')
+    return Greatest(Round(expression, 2, output_field=money), Value(Decimal('0'), output_field=money))
+
+
+def _apply(product_ids, new_price, user, source, reason):
+    """Run one UPDATE per chunk and bulk-insert history for changed rows"""
+    changed = 0
+    now = timezone.now()
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        chunk = product_ids[start:start + CHUNK_SIZE]
+        version = CatalogSequence.advance()
+        with transaction.atomic():
+            queryset = Product.all_objects.select_for_update().filter(pk__in=chunk)
+            old_prices = dict(queryset.values_list('pk', 'selling_price'))
+            Product.all_objects.filter(pk__in=chunk).update(
+                selling_price=new_price(chunk), updated_at=now, catalog_version=version
+            )
+            new_prices = dict(Product.all_objects.filter(pk__in=chunk).values_list('pk', 'selling_price'))
+            history = [
+                PriceChange(
+                    product_id=pk, old_price=old_prices[pk], new_price=new_prices[pk],
+                    source=source, reason=reason, user=user,
+                )
+                for pk in chunk
+                if pk in old_prices and old_prices[pk] != new_prices[pk]
+            ]
+            PriceChange.objects.bulk_create(history)
+            changed += len(history)
+    return changed
+
+
+def reprice(queryset, mode, value, user=None, reason='', allow_below_cost=False):
+    """
+    Reprice every product in queryset by percentage, absolute amount or a
+    target margin on cost. Returns the number of products whose price changed.
+
+    Raises ValidationError for values outside REPRICE_LIMITS, and
+    BelowCostError if any price would be cut below cost, unless
+    allow_below_cost is set.
+    """
+    validate_reprice_value(mode, value)
+    expression = reprice_expression(mode, value)
+    if mode == 'margin':
+        # No cost on record would reprice to zero
+        queryset = queryset.filter(cost_price__gt=0)
+    if not allow_below_cost:
+        # Only cuts count; prices already under cost may still be raised
+        below = queryset.annotate(new_price=expression).filter(
+            new_price__lt=F('cost_price')
+        ).filter(new_price__lt=F('selling_price')).count()
+        if below:
+            raise BelowCostError(below)
+    product_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    return _apply(product_ids, lambda chunk: expression, user, 'BULK', reason)
+
+
+def read_price_list(stream):
+    """Read a supplier CSV with sku and price columns into {sku: price}"""
+    prices = {}
+    for line_number, row in enumerate((_normalise_row(row) for row in csv.DictReader(stream)), start=2):
+        if not row.get('sku'):
+            continue
+        try:
+            price = Decimal(row.get('price', '').replace(',', ''))
+        except InvalidOperation:
+            raise ValueError(f"Line {line_number}: invalid price '{row.get('price', '')}'")
+        validate_reasonable_price(price)
+        prices[row['sku']] = price
+    return prices
+
+
+def reprice_from_list(prices, user=None, reason='', allow_below_cost=False):
+    """
+    Apply a supplier price list of {sku: price}. Returns (changed, unknown_skus).
+    Raises BelowCostError like reprice().
+    """
+    prices = {sku: Decimal(price).quantize(Decimal('0.01')) for sku, price in prices.items()}
+    rows = list(Product.all_objects.filter(sku__in=prices).values_list('sku', 'pk', 'cost_price', 'selling_price'))
+    price_by_id = {}
+    below = 0
+    for sku, pk, cost_price, selling_price in rows:
+        price_by_id[pk] = prices[sku]
+        below += prices[sku] < cost_price and prices[sku] < selling_price
+    if below and not allow_below_cost:
+        raise BelowCostError(below)
+    unknown = sorted(set(prices) - {sku for sku, *_ in rows})
+
+    def case(chunk):
+        return Case(
+            *[When(pk=pk, then=Value(price_by_id[pk])) for pk in chunk],
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    changed = _apply(sorted(price_by_id), case, user, 'SUPPLIER_LIST', reason)
+    return changed, unknown
@@ -0,0 +1,283 @@
+"""
+Stock adjustment service.
+
+All stock changes go through here. Movements change the StockLevel row of
+their location only, using F() expressions (no lost updates between
+concurrent requests) and locking rows in (product, location) order to
+avoid deadlocks. A checkout at one till never waits on another store's
+rows.
+
+Product.stock_quantity, the catalog-wide total, is recomputed as the sum
+of the product's levels once the movement commits, in its own short
+transaction. That write leaves updated_at and the Product query-cache
+generation alone, so cached product listings and fragments survive a
+sale; listings that filter or sort on stock are keyed on the StockLevel
+generation instead. The refresh_stock_totals command repairs totals left
+stale by a crash between the two.
+"""
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from inventory_pos.query_cache import bump_generation
+
+from .models import CatalogSequence, Location, Product, StockLevel, StockMovement
+
+
+INCREASING_TYPES = ('IN', 'RETURN', 'TRANSFER_IN')
+DECREASING_TYPES = ('OUT', 'SALE', 'TRANSFER_OUT')
+
+# Keeps CASE updates well inside SQLite's bound-parameter limit
+INCREMENT_CHUNK_SIZE = 250
+
+# Rows locked per SELECT ... FOR UPDATE
+LOCK_CHUNK_SIZE = 1000
+
+
+class InsufficientStockError(ValueError):
+    """Raised when a movement would take a product's stock below zero"""
+
+    def __init__(self, product_id, message=None):
+        self.product_id = product_id
+        super().__init__(message or f'Insufficient stock for product {product_id}')
+
+
+def _stock_changes(movements):
+    """
+    Collapse movements into one change per product and location, preserving order.
+
+    Returns {(product_id, location_id): (absolute, delta)} where absolute is
+    the value set by the last ADJUSTMENT (or None) and delta is the net
+    change after it.
+    """
+    changes = OrderedDict()
+    for movement in movements:
+        key = (movement.product_id, movement.location_id)
+        absolute, delta = changes.get(key, (None, 0))
+        quantity = abs(movement.quantity)
+        if movement.movement_type in INCREASING_TYPES:
+            delta += quantity
+        elif movement.movement_type in DECREASING_TYPES:
+            delta -= quantity
+        elif movement.movement_type == 'ADJUSTMENT':
+            absolute, delta = quantity, 0
+        changes[key] = (absolute, delta)
+    return changes
+
+
+def lock_levels(keys):
+    """
+    Lock the StockLevel rows for (product_id, location_id) keys in
+    (product, location) order, creating missing rows first. Returns
+    {key: level_id}.
+    """
+    product_ids = sorted({product_id for product_id, _ in keys})
+    location_ids = {location_id for _, location_id in keys}
+    existing = set(
+        StockLevel.objects.filter(
+            product_id__in=product_ids, location_id__in=location_ids
+        ).values_list('product_id', 'location_id')
+    )
+    missing = [
+        StockLevel(product_id=product_id, location_id=location_id)
+        for product_id, location_id in keys
+        if (product_id, location_id) not in existing
+    ]
+    StockLevel.objects.bulk_create(missing, ignore_conflicts=True)
+
+    level_ids = {}
+    for start in range(0, len(product_ids), LOCK_CHUNK_SIZE):
+        levels = StockLevel.objects.select_for_update().filter(
+            product_id__in=product_ids[start:start + LOCK_CHUNK_SIZE],
+            location_id__in=location_ids,
+        ).order_by('product_id', 'location_id').values_list('pk', 'product_id', 'location_id')
+        for pk, product_id, location_id in levels:
+            level_ids[(product_id, location_id)] = pk
+    return level_ids
+
+
+def _case_update(values, expression, version, now, chunk_size):
+    """UPDATE StockLevel with a CASE over {level_id: value}, one statement per chunk"""
+    level_ids = sorted(values)
+    for start in range(0, len(level_ids), chunk_size):
+        chunk = level_ids[start:start + chunk_size]
+        StockLevel.objects.filter(pk__in=chunk).update(
+            quantity=expression(Case(
+                *[When(pk=pk, then=Value(values[pk])) for pk in chunk],
+                default=Value(0),
+                output_field=IntegerField(),
+            )),
+            catalog_version=version,
+            updated_at=now,
+        )
+
+
+def increment_levels(deltas, version, now=None, chunk_size=INCREMENT_CHUNK_SIZE):
+    """
+    Add {level_id: quantity} to stock levels using one CASE-based UPDATE
+    per chunk, stamping the catalog version. Callers are expected to hold
+    the row locks (see lock_levels).
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    _case_update(deltas, lambda case: F('quantity') + case, version, now or timezone.now(), chunk_size)
+
+
+def set_levels(quantities, version, now=None, chunk_size=INCREMENT_CHUNK_SIZE):
+    """
+    Set {level_id: quantity} using one CASE-based UPDATE per chunk, stamping
+    the catalog version. Callers are expected to hold the row locks (see
+    lock_levels).
+    """
+    _case_update(quantities, lambda case: case, version, now or timezone.now(), chunk_size)
+
+
+def refresh_stock_totals(product_ids, chunk_size=LOCK_CHUNK_SIZE):
+    """Recompute Product.stock_quantity as the sum of each product's levels"""
+    product_ids = sorted(set(product_ids))
+    total = StockLevel.objects.filter(
+        product=OuterRef('pk')
+    ).values('product').annotate(total=Sum('quantity')).values('total')
+    for start in range(0, len(product_ids), chunk_size):
+        with transaction.atomic():
+            Product.all_objects.filter(pk__in=product_ids[start:start + chunk_size]).update_untracked(
+                stock_quantity=Coalesce(Subquery(total, output_field=IntegerField()), Value(0)),
+            )
+            # Listings sorted or filtered on the total are keyed on StockLevel
+            bump_generation(StockLevel)
+
+
+def _refresh_totals(movements):
+    """Recompute the moved products' totals and copy them onto instances the caller holds"""
+    refresh_stock_totals({movement.product_id for movement in movements})
+    cached = [movement for movement in movements if StockMovement.product.is_cached(movement)]
+    if cached:
+        current = dict(
+            Product.all_objects.filter(
+                pk__in={movement.product_id for movement in cached}
+            ).values_list('pk', 'stock_quantity')
+        )
+        for movement in cached:
+            movement.product.stock_quantity = current[movement.product_id]
+
+
+def update_stock(movements):
+    """
+    Apply the stock effect of movements without saving the movements.
+
+    Must be called inside a transaction. Movements without a location are
+    assigned the default one. Raises InsufficientStockError if a decrement
+    would take a location's stock below zero. Product totals are refreshed
+    after commit.
+    """
+    default_location = None
+    for movement in movements:
+        if movement.location_id is None:
+            default_location = default_location or Location.get_default()
+            movement.location = default_location
+
+    changes = _stock_changes(movements)
+    if not changes:
+        return
+    version = CatalogSequence.advance()
+    level_ids = lock_levels(list(changes))
+    now = timezone.now()
+
+    # Pure increments can't fail, so they are applied as one set-based UPDATE
+    increments = {
+        key: delta
+        for key, (absolute, delta) in changes.items()
+        if absolute is None and delta >= 0
+    }
+    increment_levels({level_ids[key]: delta for key, delta in increments.items()}, version, now=now)
+
+    # Adjustments set a known value, so they are batched the same way
+    absolutes = {}
+    for key, (absolute, delta) in changes.items():
+        if absolute is not None:
+            if absolute + delta < 0:
+                raise InsufficientStockError(key[0])
+            absolutes[key] = absolute + delta
+    set_levels({level_ids[key]: quantity for key, quantity in absolutes.items()}, version, now=now)
+
+    # Decrements are conditional so stock can never go negative
+    for key in sorted(changes):
+        if key in increments or key in absolutes:
+            continue
+        _, delta = changes[key]
+        updated = StockLevel.objects.filter(
+            pk=level_ids[key], quantity__gte=-delta
+        ).update(quantity=F('quantity') + delta, catalog_version=version, updated_at=now)
+        if not updated:
+            raise InsufficientStockError(key[0])
+
+    bump_generation(StockLevel)
+    transaction.on_commit(lambda: _refresh_totals(movements))
+
+
+def apply_movements(movements):
+    """
+    Save a list of unsaved StockMovement instances and apply their stock
+    changes atomically. Returns the created movements.
+    """
+    movements = list(movements)
+    if not movements:
+        return []
+    with transaction.atomic():
+        update_stock(movements)
+        return StockMovement.objects.bulk_create(movements)
+
+
+def apply_movement(product, movement_type, quantity, user, reason='', reference='', location=None):
+    """Convenience wrapper for a single stock movement"""
+    movement = StockMovement(
+        product=product,
+        location=location,
+        movement_type=movement_type,
+        quantity=quantity,
+        reason=reason,
+        reference=reference,
+        user=user,
+    )
+    return apply_movements([movement])[0]
+
+
+def set_total_stock(product, quantity, user, reason='', reference=''):
+    """
+    Make a product's total stock equal quantity by adjusting its level at
+    the default location; stock held at other locations is left alone.
+    """
+    default_location = Location.get_default()
+    elsewhere = StockLevel.objects.filter(product=product).exclude(
+        location=default_location
+    ).aggregate(total=Sum('quantity'))['total'] or 0
+    return apply_movement(
+        product, 'ADJUSTMENT', max(quantity - elsewhere, 0), user,
+        reason=reason, reference=reference, location=default_location,
+    )
+
+
+def transfer_stock(product, from_location, to_location, quantity, user, reason='', reference=''):
+    """
+    Move stock between locations as a TRANSFER_OUT / TRANSFER_IN pair.
+    The product total doesn't change.
+    """
+    if from_location == to_location:
+        raise ValueError('Choose two different locations')
+    if quantity <= 0:
+        raise ValueError('Quantity must be greater than zero')
+    reference = reference or f'TRF-{from_location.code}-{to_location.code}'
+    return apply_movements([
+        StockMovement(
+            product=product, location=from_location, movement_type='TRANSFER_OUT',
+            quantity=quantity, reason=reason or f'Transfer to {to_location.name}',
+            reference=reference, user=user,
+        ),
+        StockMovement(
+            product=product, location=to_location, movement_type='TRANSFER_IN',
+            quantity=quantity, reason=reason or f'Transfer from {from_location.name}',
+            reference=reference, user=user,
+        ),
+    ])
@@ -1,133 +1,104 @@
+from functools import lru_cache
+
 from django import template
-from django.urls import reverse
+from django.urls import NoReverseMatch, get_script_prefix, reverse
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 
 register = template.Library()
 
+DASHBOARD = ('Dashboard', 'inventory:dashboard')
+PRODUCTS = ('Products', 'inventory:product_list')
+CATEGORIES = ('Categories', 'inventory:category_list')
+STOCK_COUNTS = ('Stock Counts', 'inventory:stock_count_list')
+PROFILE = ('Profile', 'inventory:profile_view')
+
+# Crumbs per url_name as (label, url name or None); the last one is the current page
+TRAILS = {
+    # Dashboard
+    'dashboard': [DASHBOARD],
+
+    # Product URLs
+    'product_list': [DASHBOARD, PRODUCTS],
+    'product_create': [DASHBOARD, PRODUCTS, ('Add Product', None)],
+    'product_detail': [DASHBOARD, PRODUCTS, ('Product Details', None)],
+    'product_edit': [DASHBOARD, PRODUCTS, ('Edit Product', None)],
+    'bulk_reprice': [DASHBOARD, PRODUCTS, ('Bulk Reprice', None)],
+    'stock_receipt_import': [DASHBOARD, PRODUCTS, ('Import Stock Receipts', None)],
+    'stock_transfer': [DASHBOARD, ('Stock Transfer', 'inventory:stock_transfer')],
+    'stock_count_list': [DASHBOARD, STOCK_COUNTS],
+    'stock_count_detail': [DASHBOARD, STOCK_COUNTS, ('Count', None)],
+    'archived_products': [DASHBOARD, ('Archived Products', 'inventory:archived_products')],
+
+    # Category URLs
+    'category_list': [DASHBOARD, CATEGORIES],
+    'category_create': [DASHBOARD, CATEGORIES, ('Add Category', None)],
+    'category_edit': [DASHBOARD, CATEGORIES, ('Edit Category', None)],
+    'category_delete': [DASHBOARD, CATEGORIES, ('Delete Category', None)],
+
+    # Profile URLs
+    'profile_view': [DASHBOARD, PROFILE],
+    'profile_edit': [DASHBOARD, PROFILE, ('Edit Profile', None)],
+}
+
+HOME_ICON = mark_safe('<i class="fas fa-home mr-2"></i>')
+SEPARATOR = mark_safe('<i class="fas fa-chevron-right text-gray-400 text-xs mx-2"></i>')
+
+
+def _href(url_name):
+    try:
+        return reverse(url_name)
+    except NoReverseMatch:
+        return None
+
+
+def _crumb(name, href, icon=''):
+    if href is None:
+        return format_html('<span class="text-gray-500 text-sm font-medium">{}{}</span>', icon, name)
+    return format_html(
+        '<a href="{}" class="text-gray-700 hover:text-blue-600 text-sm font-medium">{}{}</a>', href, icon, name
+    )
+
+
+@lru_cache(maxsize=None)
+def render_trail(url_name, script_prefix):
+    """
+    Breadcrumb HTML for a url_name, built once per process. URLs depend on
+    the script prefix, so it is part of the cache key.
+    """
+    trail = TRAILS.get(url_name, [DASHBOARD])
+    last = len(trail) - 1
+    items = []
+    for i, (name, target) in enumerate(trail):
+        href = None if i == last or target is None else _href(target)
+        if i == 0:
+            items.append(format_html(
+                '<li class="inline-flex items-center">{}</li>', _crumb(name, href, HOME_ICON)
+            ))
+        else:
+            items.append(format_html(
+                '<li><div class="flex items-center">{}{}</div></li>', SEPARATOR, _crumb(name, href)
+            ))
+    return format_html(
+        '<nav class="flex mb-4" aria-label="Breadcrumb">'
+        '<ol class="inline-flex items-center space-x-1 md:space-x-3">{}</ol>'
+        '</nav>',
+        format_html_join('', '{}', ((item,) for item in items)),
+    )
+
+
+def precompile():
+    """Render every known trail for the current script prefix"""
+    prefix = get_script_prefix()
+    for url_name in TRAILS:
+        render_trail(url_name, prefix)
+
+
 @register.simple_tag(takes_context=True)
 def breadcrumbs(context):
     """Generate breadcrumb navigation based on current URL"""
     request = context['request']
-    
-    try:
-        url_name = request.resolver_match.url_name
-        app_name = request.resolver_match.app_name
-    except:
-        # Fallback if no resolver match
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
         return mark_safe('')
-    
-    breadcrumb_map = {
-        # Dashboard
-        'dashboard': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': True}
-        ],
-        
-        # Product URLs
-        'product_list': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Products', 'url': 'inventory:product_list', 'active': True}
-        ],
-        'product_create': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Products', 'url': 'inventory:product_list', 'active': False},
-            {'name': 'Add Product', 'url': '#', 'active': True}
-        ],
-        'product_detail': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Products', 'url': 'inventory:product_list', 'active': False},
-            {'name': 'Product Details', 'url': '#', 'active': True}
-        ],
-        'product_edit': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Products', 'url': 'inventory:product_list', 'active': False},
-            {'name': 'Edit Product', 'url': '#', 'active': True}
-        ],
-        'archived_products': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Archived Products', 'url': 'inventory:archived_products', 'active': True}
-        ],
-        
-        # Category URLs
-        'category_list': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Categories', 'url': 'inventory:category_list', 'active': True}
-        ],
-        'category_create': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Categories', 'url': 'inventory:category_list', 'active': False},
-            {'name': 'Add Category', 'url': '#', 'active': True}
-        ],
-        'category_edit': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Categories', 'url': 'inventory:category_list', 'active': False},
-            {'name': 'Edit Category', 'url': '#', 'active': True}
-        ],
-        'category_delete': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Categories', 'url': 'inventory:category_list', 'active': False},
-            {'name': 'Delete Category', 'url': '#', 'active': True}
-        ],
-        
-        # Profile URLs
-        'profile_view': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Profile', 'url': 'inventory:profile_view', 'active': True}
-        ],
-        'profile_edit': [
-            {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': False},
-            {'name': 'Profile', 'url': 'inventory:profile_view', 'active': False},
-            {'name': 'Edit Profile', 'url': '#', 'active': True}
-        ],
-    }
-    
-    # Get breadcrumbs for current URL
-    breadcrumbs_list = breadcrumb_map.get(url_name, [
-        {'name': 'Dashboard', 'url': 'inventory:dashboard', 'active': True}
-    ])
-    
-    # Generate HTML
-    html = '<nav class="flex mb-4" aria-label="Breadcrumb">'
-    html += '<ol class="inline-flex items-center space-x-1 md:space-x-3">'
-    
-    for i, breadcrumb in enumerate(breadcrumbs_list):
-        if i == 0:
-            # First item (home icon)
-            html += '<li class="inline-flex items-center">'
-            if breadcrumb['active']:
-                html += f'<span class="text-gray-500 text-sm font-medium">'
-                html += '<i class="fas fa-home mr-2"></i>'
-                html += f'{breadcrumb["name"]}</span>'
-            else:
-                try:
-                    url = reverse(breadcrumb["url"])
-                    html += f'<a href="{url}" class="text-gray-700 hover:text-blue-600 text-sm font-medium">'
-                    html += '<i class="fas fa-home mr-2"></i>'
-                    html += f'{breadcrumb["name"]}</a>'
-                except:
-                    html += f'<span class="text-gray-500 text-sm font-medium">'
-                    html += '<i class="fas fa-home mr-2"></i>'
-                    html += f'{breadcrumb["name"]}</span>'
-            html += '</li>'
-        else:
-            # Other items
-            html += '<li>'
-            html += '<div class="flex items-center">'
-            html += '<i class="fas fa-chevron-right text-gray-400 text-xs mx-2"></i>'
-            if breadcrumb['active']:
-                html += f'<span class="text-gray-500 text-sm font-medium">{breadcrumb["name"]}</span>'
-            else:
-                if breadcrumb['url'] != '#':
-                    try:
-                        url = reverse(breadcrumb["url"])
-                        html += f'<a href="{url}" class="text-gray-700 hover:text-blue-600 text-sm font-medium">{breadcrumb["name"]}</a>'
-                    except:
-                        html += f'<span class="text-gray-500 text-sm font-medium">{breadcrumb["name"]}</span>'
-                else:
-                    html += f'<span class="text-gray-500 text-sm font-medium">{breadcrumb["name"]}</span>'
-            html += '</div>'
-            html += '</li>'
-    
-    html += '</ol>'
-    html += '</nav>'
-    
-    return mark_safe(html)
\ No newline at end of file
+    return render_trail(resolver_match.url_name, get_script_prefix())
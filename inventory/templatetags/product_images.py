@@ -0,0 +1,41 @@
+from django import template
+from django.utils.html import format_html
+
+from inventory.images import placeholder_url
+
+register = template.Library()
+
+
+def _srcset(renditions, fmt):
+    return ', '.join(
+        f'{formats[fmt]} {size}w'
+        for size, formats in sorted(renditions.items(), key=lambda item: int(item[0]))
+        if fmt in formats
+    )
+
+
+@register.simple_tag
+def product_image(product, size, css_class='', alt=None):
+    """
+    Responsive, lazily loaded product image displayed at size x size CSS px.
+
+    Uses the recorded renditions (WebP with a JPEG fallback) so the browser
+    picks the smallest file for the slot, and the static placeholder while
+    renditions are pending. Never builds URLs through the storage backend.
+    """
+    alt = product.name if alt is None else alt
+    renditions = product.image_renditions
+    if not renditions:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="lazy" decoding="async">',
+            placeholder_url(), alt, css_class, size, size,
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}px">'
+        '<img src="{}" srcset="{}" sizes="{}px" alt="{}" class="{}" width="{}" height="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        _srcset(renditions, 'webp'), size,
+        product.rendition_url(size), _srcset(renditions, 'jpg'), size,
+        alt, css_class, size, size,
+    )
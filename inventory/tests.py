@@ -1,3 +1,373 @@
-from django.test import TestCase
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from inventory_pos.query_cache import generations
+from inventory_pos.storage import content_storage
+
+from . import images
+from .models import Category, Location, PriceChange, Product, StockLevel, StockMovement
+from .pricing import BelowCostError, reprice, reprice_from_list
+from .services import (
+    InsufficientStockError, apply_movement, apply_movements, set_total_stock, transfer_stock,
+)
+
+
+def make_product(name='Cola', stock=0):
+    category, _ = Category.objects.get_or_create(name='Drinks')
+    # New products start with their stock at the default location
+    return Product.objects.create(
+        name=name, category=category, cost_price=Decimal('1.00'), selling_price=Decimal('2.00'),
+        stock_quantity=stock,
+    )
+
+
+def level(product, location):
+    return StockLevel.objects.get(product=product, location=location).quantity
+
+
+class StockServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clerk')
+        cls.store = Location.get_default()
+        cls.backroom = Location.objects.create(name='Backroom', code='BACK')
+
+    def test_insufficient_stock_leaves_no_partial_changes(self):
+        cola = make_product('Cola', stock=10)
+        chips = make_product('Chips', stock=2)
+        with self.assertRaises(InsufficientStockError) as raised:
+            apply_movements([
+                StockMovement(product=cola, movement_type='SALE', quantity=3, user=self.user),
+                StockMovement(product=chips, movement_type='SALE', quantity=5, user=self.user),
+            ])
+        self.assertEqual(raised.exception.product_id, chips.pk)
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertEqual(level(cola, self.store), 10)
+        self.assertEqual(level(chips, self.store), 2)
+
+    def test_adjustment_sets_the_level_and_later_movements_apply_on_top(self):
+        cola = make_product(stock=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movements([
+                StockMovement(product=cola, movement_type='SALE', quantity=4, user=self.user),
+                StockMovement(product=cola, movement_type='ADJUSTMENT', quantity=25, user=self.user),
+                StockMovement(product=cola, movement_type='SALE', quantity=5, user=self.user),
+            ])
+        self.assertEqual(level(cola, self.store), 20)
+        cola.refresh_from_db()
+        self.assertEqual(cola.stock_quantity, 20)
+
+        with self.assertRaises(InsufficientStockError):
+            apply_movements([
+                StockMovement(product=cola, movement_type='ADJUSTMENT', quantity=1, user=self.user),
+                StockMovement(product=cola, movement_type='SALE', quantity=2, user=self.user),
+            ])
+        self.assertEqual(level(cola, self.store), 20)
+
+    def test_set_total_stock_keeps_other_locations(self):
+        cola = make_product(stock=10)
+        apply_movement(cola, 'IN', 15, self.user, location=self.backroom)
+        with self.captureOnCommitCallbacks(execute=True):
+            set_total_stock(cola, 40, self.user)
+        self.assertEqual(level(cola, self.store), 25)
+        self.assertEqual(level(cola, self.backroom), 15)
+        cola.refresh_from_db()
+        self.assertEqual(cola.stock_quantity, 40)
+
+    def test_transfer_moves_stock_and_keeps_the_total(self):
+        cola = make_product(stock=10)
+        movements = transfer_stock(cola, self.store, self.backroom, 4, self.user)
+        self.assertEqual([m.movement_type for m in movements], ['TRANSFER_OUT', 'TRANSFER_IN'])
+        self.assertEqual(level(cola, self.store), 6)
+        self.assertEqual(level(cola, self.backroom), 4)
+        cola.refresh_from_db()
+        self.assertEqual(cola.stock_quantity, 10)
+
+    def test_sales_leave_updated_at_and_the_product_generation_alone(self):
+        cola = make_product(stock=10)
+        updated_at = cola.updated_at
+        product_generation, level_generation = generations(Product, StockLevel)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(cola, 'SALE', 3, self.user)
+        self.assertEqual(cola.stock_quantity, 7)
+        cola.refresh_from_db()
+        self.assertEqual((cola.stock_quantity, cola.updated_at), (7, updated_at))
+        self.assertEqual(generations(Product)[0], product_generation)
+        self.assertNotEqual(generations(StockLevel)[0], level_generation)
+
+    def test_sale_writes_only_the_stock_level_until_commit(self):
+        cola = make_product(stock=10)
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            apply_movement(cola, 'SALE', 3, self.user)
+        updated = {query['sql'].split('"')[1] for query in queries.captured_queries if query['sql'].startswith('UPDATE')}
+        self.assertEqual(updated, {'inventory_stocklevel'})
+        self.assertEqual(Product.objects.get(pk=cola.pk).stock_quantity, 10)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Product.objects.get(pk=cola.pk).stock_quantity, 7)
+
+    def test_saving_a_stale_instance_keeps_the_total(self):
+        cola = make_product(stock=10)
+        stale = Product.objects.get(pk=cola.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(cola, 'SALE', 4, self.user)
+        stale.name = 'Cola Zero'
+        stale.save()
+        cola.refresh_from_db()
+        self.assertEqual((cola.name, cola.stock_quantity), ('Cola Zero', 6))
+
+    def test_transfer_beyond_source_stock_moves_nothing(self):
+        cola = make_product(stock=3)
+        with self.assertRaises(InsufficientStockError):
+            transfer_stock(cola, self.store, self.backroom, 5, self.user)
+        self.assertEqual(level(cola, self.store), 3)
+        self.assertFalse(StockLevel.objects.filter(product=cola, location=self.backroom, quantity__gt=0).exists())
+        self.assertFalse(StockMovement.objects.exists())
+
+        with self.assertRaises(ValueError):
+            transfer_stock(cola, self.store, self.store, 1, self.user)
+
+
+class RepriceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cola = make_product('Cola')  # cost 1.00, price 2.00
+
+    def test_values_outside_the_limits_are_refused(self):
+        for mode, value in (('percent', 1000), ('percent', -95), ('absolute', 50000), ('margin', -10)):
+            with self.assertRaises(ValidationError, msg=(mode, value)):
+                reprice(Product.objects.all(), mode, value)
+        self.assertFalse(PriceChange.objects.exists())
+
+    def test_cuts_below_cost_need_confirmation(self):
+        with self.assertRaises(BelowCostError):
+            reprice(Product.objects.all(), 'percent', -60)
+        with self.assertRaises(BelowCostError):
+            reprice_from_list({self.cola.sku: '0.50'})
+        self.cola.refresh_from_db()
+        self.assertEqual(self.cola.selling_price, Decimal('2.00'))
+
+        self.assertEqual(reprice(Product.objects.all(), 'percent', -60, allow_below_cost=True), 1)
+        self.cola.refresh_from_db()
+        self.assertEqual(self.cola.selling_price, Decimal('0.80'))
+
+        # Raising a price that is still under cost is not a cut
+        self.assertEqual(reprice(Product.objects.all(), 'absolute', '0.10'), 1)
+
+
+    def test_fractional_percentages_are_not_rounded_away(self):
+        self.assertEqual(reprice(Product.objects.all(), 'percent', '12.5'), 1)
+        self.cola.refresh_from_db()
+        self.assertEqual(self.cola.selling_price, Decimal('2.25'))
+
+        # A factor rounded to 2 places would be 1.00 and change nothing
+        self.assertEqual(reprice(Product.objects.all(), 'percent', '0.333'), 1)
+        self.cola.refresh_from_db()
+        self.assertEqual(self.cola.selling_price, Decimal('2.26'))
+        self.assertEqual(reprice(Product.objects.all(), 'margin', '137.5'), 1)
+        self.cola.refresh_from_db()
+        self.assertEqual(self.cola.selling_price, Decimal('2.38'))
+
+
+class RenditionJobTests(TestCase):
+    def test_failed_jobs_are_logged_and_retried(self):
+        outcomes = [RuntimeError('database is locked'), None]
+        # _run normally owns a worker thread's connection
+        with mock.patch.object(images, 'close_old_connections'), mock.patch.object(images, 'RETRY_DELAY', 0), \
+                mock.patch.object(images, 'generate_renditions', side_effect=outcomes) as generate, \
+                self.assertLogs('inventory.images', 'ERROR') as logs:
+            images._run(1)
+        self.assertEqual(generate.call_count, 2)
+        self.assertIn('attempt 1/3', logs.output[0])
+
+    def test_sweep_finds_images_without_renditions(self):
+        cola = make_product('Cola')
+        chips = make_product('Chips')
+        Product.all_objects.filter(pk=cola.pk).update(image='products/cola.jpg')
+        Product.all_objects.filter(pk=chips.pk).update(
+            image='products/chips.jpg', image_renditions={'64': {'jpg': '/media/x.jpg'}}
+        )
+        self.assertEqual(list(images.missing_renditions().values_list('pk', flat=True)), [cola.pk])
+        self.assertFalse(images.missing_renditions(timedelta(minutes=10)).exists())
+
+
+class ResizeProductImagesTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_RENDITIONS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_oversized_upload_is_shrunk_once(self):
+        buffer = BytesIO()
+        Image.new('RGB', (3000, 2000), (200, 30, 30)).save(buffer, format='PNG')
+        product = make_product()
+        product.image = SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+        product.save()
+        self.assertFalse(images.is_normalised(product.image.name))
+
+        out = StringIO()
+        call_command('resize_product_images', stdout=out)
+        self.assertIn('Resized: 1, Skipped: 0', out.getvalue())
+        product.refresh_from_db()
+        self.assertTrue(product.image.name.startswith(f'{images.MASTER_DIR}/'))
+        with product.image.open('rb') as master:
+            self.assertEqual(max(Image.open(master).size), images.MASTER_MAX_SIZE)
+        self.assertTrue(product.image_renditions)
+
+        call_command('resize_product_images', stdout=out)
+        self.assertIn('Resized: 0, Skipped: 1', out.getvalue())
+
+
+class ReleasedImageSweepTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_RENDITIONS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_released_image_outlives_an_uncommitted_upload_of_the_same_content(self):
+        buffer = BytesIO()
+        Image.new('RGB', (200, 200), (30, 30, 200)).save(buffer, format='PNG')
+        photo = buffer.getvalue()
+        product = make_product()
+        product.image = SimpleUploadedFile('photo.png', photo, content_type='image/png')
+        product.save()
+        product.refresh_from_db()
+        name, renditions = product.image.name, images.rendition_names(product.image_renditions)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = None
+            product.save()
+        self.assertTrue(content_storage.exists(name))
+
+        # Another request stores the same bytes; its row isn't committed yet
+        self.assertEqual(content_storage.save('products/copy.png', ContentFile(photo)), name)
+        self.assertEqual(images.sweep_released_files(), [])
+        self.assertTrue(content_storage.exists(name))
+
+        # Once nothing has saved it for the grace period, it goes with its renditions
+        self.assertIn(name, images.sweep_released_files(grace=0))
+        self.assertFalse(any(content_storage.exists(n) for n in [name, *renditions]))
+
+
+class RenderBudgetMixin:
+    """Query counts and template render time per page, as in benchmark_templates"""
+
+    # Median render in milliseconds; generous so slow CI machines pass
+    RENDER_BUDGET_MS = 100
+    REPEAT = 5
+
+    def assertRenders(self, url, queries):
+        # The first request fills the caches a running server would already have
+        self.client.get(url)
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        template = response.resolve_template(response.template_name)
+        context = response.resolve_context(response.context_data)
+        timings = []
+        for _ in range(self.REPEAT):
+            start = time.perf_counter()
+            template.render(context, response.wsgi_request)
+            timings.append(time.perf_counter() - start)
+        render_ms = statistics.median(timings) * 1000
+        self.assertLess(render_ms, self.RENDER_BUDGET_MS, f'{url} rendered in {render_ms:.1f} ms')
+        return response
+
+
+class PageBudgetTests(RenderBudgetMixin, TestCase):
+    # The dashboard reads through the replica router
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        for number in range(30):
+            make_product(f'Product {number:02}', stock=number)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_dashboard(self):
+        self.assertRenders(reverse('inventory:dashboard'), 8)
+
+    def test_product_list(self):
+        response = self.assertRenders(reverse('inventory:product_list'), 5)
+        self.assertEqual(len(response.context['products']), 24)
+
+
+class ConcurrentStockTests(TransactionTestCase):
+    """Several connections decrementing the same level at once"""
+
+    WORKERS = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('needs a file-backed test database')
+        self.user = User.objects.create_user('clerk')
+        self.store = Location.get_default()
+
+    def sell_concurrently(self, product, sales_per_worker):
+        outcomes = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.WORKERS)
+
+        def worker():
+            try:
+                start.wait()
+                for _ in range(sales_per_worker):
+                    try:
+                        apply_movement(product, 'SALE', 1, self.user)
+                        result = 'sold'
+                    except InsufficientStockError:
+                        result = 'refused'
+                    with lock:
+                        outcomes.append(result)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_no_lost_updates(self):
+        cola = make_product(stock=100)
+        outcomes = self.sell_concurrently(cola, 5)
+        self.assertEqual(outcomes.count('sold'), 40)
+        self.assertEqual(level(cola, self.store), 60)
+        self.assertEqual(StockMovement.objects.filter(product=cola).count(), 40)
+
+    def test_stock_never_goes_negative(self):
+        cola = make_product(stock=10)
+        outcomes = self.sell_concurrently(cola, 3)
+        self.assertEqual(outcomes.count('sold'), 10)
+        self.assertEqual(outcomes.count('refused'), 14)
+        self.assertEqual(level(cola, self.store), 0)
+        cola.refresh_from_db()
+        self.assertEqual(cola.stock_quantity, 0)
@@ -24,8 +24,20 @@ urlpatterns = [
     path('products/bulk-archive/', views.bulk_archive_products, name='bulk_archive'),
     path('products/bulk-delete/', views.bulk_delete_products, name='bulk_delete'),
     path('products/export/', views.export_products, name='export_products'),
+    path('products/reprice/', views.BulkRepriceView.as_view(), name='bulk_reprice'),
     path('products/<int:pk>/quick-edit/', views.product_quick_edit, name='product_quick_edit'),
     
+    # Stock receiving
+    path('stock/receive/import/', views.StockReceiptImportView.as_view(), name='stock_receipt_import'),
+    path('stock/transfer/', views.StockTransferView.as_view(), name='stock_transfer'),
+    
+    # Stock counts
+    path('stock/counts/', views.StockCountListView.as_view(), name='stock_count_list'),
+    path('stock/counts/<int:pk>/', views.StockCountDetailView.as_view(), name='stock_count_detail'),
+    path('stock/counts/<int:pk>/scan/', views.stock_count_scan, name='stock_count_scan'),
+    path('stock/counts/<int:pk>/post/', views.stock_count_post, name='stock_count_post'),
+    path('stock/counts/<int:pk>/cancel/', views.stock_count_cancel, name='stock_count_cancel'),
+    
     # Categories
     path('categories/', views.CategoryListView.as_view(), name='category_list'),
     path('categories/create/', views.CategoryCreateView.as_view(), name='category_create'),
@@ -1,23 +1,42 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, FormView
 )
 from django.urls import reverse_lazy
+from django.db import transaction
+from django.core.exceptions import ValidationError
 from django.db.models import Q, Sum, Count, F
 from django.http import JsonResponse, Http404
-from .models import Product, Category, Supplier, StockMovement
-from accounts.models import UserProfile
-from .forms import UserProfileForm, UserAccountForm
+from .models import Product, Category, Supplier, StockLevel, StockMovement, StockCount
+from .counts import CountClosedError, record_scans, variances, post_count
+from .services import InsufficientStockError, set_total_stock, transfer_stock
+from .pricing import (
+    BelowCostError, change_price, record_price_change, read_price_list, reprice, reprice_from_list,
+)
+from accounts.models import CompanySettings, UserProfile
+from accounts.models import INVENTORY_ROLES
+from accounts.roles import RoleRequiredMixin, has_role, role_required
+from inventory_pos.query_cache import QueryCacheMixin
+from inventory_pos.replica import ReplicaReadMixin, use_replica
+from .forms import (
+    UserProfileForm, UserAccountForm, StockReceiptImportForm, BulkRepriceForm, StockCountForm,
+    StockTransferForm,
+)
+from .imports import import_stock_receipts, open_text_stream
+from decimal import Decimal
+import csv
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+class DashboardView(LoginRequiredMixin, ReplicaReadMixin, TemplateView):
     template_name = 'inventory/dashboard.html'
     
     def get_context_data(self, **kwargs):
@@ -49,14 +68,50 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
 
 
-class ProductListView(LoginRequiredMixin, ListView):
+class ProductListView(LoginRequiredMixin, QueryCacheMixin, ListView):
     model = Product
     template_name = 'inventory/product_list.html'
     context_object_name = 'products'
     paginate_by = 24
-    
+    query_cache_name = 'product_list'
+    query_cache_models = (Product, Category)
+    query_cache_timeout = settings.CACHE_TIMEOUT['PRODUCTS']
+
+    FILTERS = ('search', 'category', 'stock', 'price_range', 'margin')
+    VALID_SORTS = [
+        'name', '-name', 'selling_price', '-selling_price', 
+        'stock_quantity', '-stock_quantity', '-created_at', 'created_at',
+        'margin_percent', '-margin_percent', 'stock_value', '-stock_value',
+        'potential_revenue', '-potential_revenue'
+    ]
+    STOCK_SORTS = (
+        'stock_quantity', '-stock_quantity', 'stock_value', '-stock_value',
+        'potential_revenue', '-potential_revenue',
+    )
+
+    def get_base_queryset(self):
+        return Product.objects.with_valuation().select_related('category')
+
+    def get_query_cache_models(self):
+        """Stock changes don't bump the Product generation, so stock filters and sorts also key on StockLevel"""
+        params = self.get_query_cache_params()
+        if 'stock' in params or params['sort'] in self.STOCK_SORTS:
+            return (*self.query_cache_models, StockLevel)
+        return self.query_cache_models
+
+    def get_query_cache_params(self):
+        """Filters that affect the result, so equivalent URLs share an entry"""
+        params = {
+            name: self.request.GET.get(name, '').strip()
+            for name in self.FILTERS
+        }
+        params = {name: value for name, value in params.items() if value}
+        sort_by = self.request.GET.get('sort', 'name')
+        params['sort'] = sort_by if sort_by in self.VALID_SORTS else 'name'
+        return params
+
     def get_queryset(self):
-        queryset = Product.objects.select_related('category').order_by('name')
+        queryset = self.get_base_queryset().order_by('name')
         
         # Search functionality
         search = self.request.GET.get('search')
@@ -93,13 +148,20 @@ class ProductListView(LoginRequiredMixin, ListView):
         elif price_range == '100+':
             queryset = queryset.filter(selling_price__gt=100)
         
+        # Margin filter (computed in SQL by with_valuation)
+        margin = self.request.GET.get('margin')
+        if margin == 'negative':
+            queryset = queryset.filter(margin_percent__lt=0)
+        elif margin == '0-25':
+            queryset = queryset.filter(margin_percent__gte=0, margin_percent__lt=25)
+        elif margin == '25-50':
+            queryset = queryset.filter(margin_percent__gte=25, margin_percent__lt=50)
+        elif margin == '50+':
+            queryset = queryset.filter(margin_percent__gte=50)
+        
         # Sorting
         sort_by = self.request.GET.get('sort', 'name')
-        valid_sorts = [
-            'name', '-name', 'selling_price', '-selling_price', 
-            'stock_quantity', '-stock_quantity', '-created_at', 'created_at'
-        ]
-        if sort_by in valid_sorts:
+        if sort_by in self.VALID_SORTS:
             queryset = queryset.order_by(sort_by)
         
         return queryset
@@ -116,7 +178,10 @@ class ProductListView(LoginRequiredMixin, ListView):
         context['current_category'] = self.request.GET.get('category', '')
         context['current_stock'] = self.request.GET.get('stock', '')
         context['current_price_range'] = self.request.GET.get('price_range', '')
+        context['current_margin'] = self.request.GET.get('margin', '')
         context['current_sort'] = self.request.GET.get('sort', 'name')
+        # Part of the cached card key, so roles never see each other's markup
+        context['can_manage_products'] = has_role(self.request, INVENTORY_ROLES)
         
         return context
 
@@ -136,7 +201,7 @@ class ProductDetailView(LoginRequiredMixin, DetailView):
         obj = get_object_or_404(Product, pk=pk)
         
         # Add logging for audit trail
-        logger.info(f"User {self.request.user.username} viewed product {obj.id}")
+        logger.info(f"User {self.request.user.username} viewed product {obj.id}", extra={'event': 'product.viewed', 'product_id': obj.id})
         
         return obj
     
@@ -146,7 +211,8 @@ class ProductDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class ProductCreateView(LoginRequiredMixin, CreateView):
+class ProductCreateView(LoginRequiredMixin, RoleRequiredMixin, CreateView):
+    allowed_roles = INVENTORY_ROLES
     model = Product
     fields = ['name', 'image', 'selling_price', 'stock_quantity', 'category']
     template_name = 'inventory/product_form.html'
@@ -166,7 +232,8 @@ class ProductCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class ProductUpdateView(LoginRequiredMixin, UpdateView):
+class ProductUpdateView(LoginRequiredMixin, RoleRequiredMixin, UpdateView):
+    allowed_roles = INVENTORY_ROLES
     model = Product
     fields = ['name', 'image', 'selling_price', 'stock_quantity', 'category']
     template_name = 'inventory/product_form.html'
@@ -182,7 +249,7 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
         obj = get_object_or_404(Product, pk=pk)
         
         # Add logging for audit trail
-        logger.info(f"User {self.request.user.username} accessed product {obj.id} for editing")
+        logger.info(f"User {self.request.user.username} accessed product {obj.id} for editing", extra={'event': 'product.edit_opened', 'product_id': obj.id})
         
         return obj
     
@@ -197,13 +264,25 @@ class ProductUpdateView(LoginRequiredMixin, UpdateView):
             form.instance.cost_price = form.instance.selling_price
             
         # Log the update
-        logger.info(f"User {self.request.user.username} updated product {form.instance.id}")
+        logger.info(f"User {self.request.user.username} updated product {form.instance.id}", extra={'event': 'product.updated', 'product_id': form.instance.id})
+        
+        # Stock is held per location, so a new total is posted as an adjustment
+        new_quantity = None
+        if 'stock_quantity' in form.changed_data:
+            new_quantity = form.instance.stock_quantity
+            form.instance.stock_quantity = form.initial['stock_quantity']
         
         messages.success(self.request, 'Product updated successfully!')
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        if 'selling_price' in form.changed_data:
+            record_price_change(self.object, form.initial.get('selling_price'), user=self.request.user)
+        if new_quantity is not None:
+            set_total_stock(self.object, new_quantity, self.request.user, reason='Product edit')
+        return response
 
 
-class ProductDeleteView(LoginRequiredMixin, DeleteView):
+class ProductDeleteView(LoginRequiredMixin, RoleRequiredMixin, DeleteView):
+    allowed_roles = INVENTORY_ROLES
     model = Product
     template_name = 'inventory/product_confirm_delete.html'
     success_url = reverse_lazy('inventory:product_list')
@@ -218,7 +297,7 @@ class ProductDeleteView(LoginRequiredMixin, DeleteView):
         obj = get_object_or_404(Product.all_objects, pk=pk)
         
         # Add logging for audit trail
-        logger.info(f"User {self.request.user.username} accessed product {obj.id} for deletion")
+        logger.info(f"User {self.request.user.username} accessed product {obj.id} for deletion", extra={'event': 'product.delete_opened', 'product_id': obj.id})
         
         return obj
     
@@ -236,20 +315,20 @@ class ProductDeleteView(LoginRequiredMixin, DeleteView):
             # Permanent deletion
             product_id = self.object.id
             product_name = self.object.name
-            logger.warning(f"User {request.user.username} permanently deleted product {product_id}")
-            self.object.hard_delete()
+            logger.warning(f"User {request.user.username} permanently deleted product {product_id}", extra={'event': 'product.deleted', 'product_id': product_id})
+            self.object.hard_delete(user=request.user)
             messages.success(request, f'Product "{product_name}" permanently deleted!')
         else:
             # Soft delete (archive)
             if self.object.is_deleted:
                 # Restore if already deleted
-                self.object.restore()
-                logger.info(f"User {request.user.username} restored product {self.object.id}")
+                self.object.restore(user=request.user)
+                logger.info(f"User {request.user.username} restored product {self.object.id}", extra={'event': 'product.restored', 'product_id': self.object.id})
                 messages.success(request, f'Product "{self.object.name}" restored successfully!')
             else:
                 # Soft delete
                 self.object.soft_delete(user=request.user)
-                logger.info(f"User {request.user.username} archived product {self.object.id}")
+                logger.info(f"User {request.user.username} archived product {self.object.id}", extra={'event': 'product.archived', 'product_id': self.object.id})
                 messages.success(request, f'Product "{self.object.name}" archived successfully!')
         
         return redirect(self.success_url)
@@ -259,6 +338,180 @@ class ProductDeleteView(LoginRequiredMixin, DeleteView):
         return self.delete(request, *args, **kwargs)
 
 
+class StockReceiptImportView(LoginRequiredMixin, RoleRequiredMixin, FormView):
+    """Receive a delivery by uploading a CSV of SKU/barcode and quantity"""
+    allowed_roles = INVENTORY_ROLES
+    template_name = 'inventory/stock_receipt_import.html'
+    form_class = StockReceiptImportForm
+    
+    def form_valid(self, form):
+        stream = open_text_stream(form.cleaned_data['file'].file)
+        try:
+            report = import_stock_receipts(
+                stream,
+                user=self.request.user,
+                reference=form.cleaned_data['reference'],
+                location=form.cleaned_data['location'],
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            form.add_error('file', f'Could not read CSV file: {e}')
+            return self.form_invalid(form)
+        
+        logger.info(
+            f"User {self.request.user.username} imported stock receipts: "
+            f"{report.succeeded} received, {report.failed} failed"
+        )
+        if report.succeeded:
+            messages.success(self.request, f'Received stock for {report.succeeded} line(s).')
+        if report.failed:
+            messages.error(self.request, f'{report.failed} line(s) could not be imported. See the report below.')
+        
+        return self.render_to_response(self.get_context_data(form=form, report=report))
+
+
+class BulkRepriceView(LoginRequiredMixin, RoleRequiredMixin, FormView):
+    """Reprice many products at once by rule or from a supplier price list"""
+    allowed_roles = INVENTORY_ROLES
+    template_name = 'inventory/bulk_reprice.html'
+    form_class = BulkRepriceForm
+    success_url = reverse_lazy('inventory:product_list')
+    
+    def form_valid(self, form):
+        data = form.cleaned_data
+        reason = data['reason']
+        
+        if data['price_list']:
+            try:
+                prices = read_price_list(open_text_stream(data['price_list'].file))
+            except (UnicodeDecodeError, csv.Error, ValueError, ValidationError) as e:
+                form.add_error('price_list', f'Could not read price list: {"; ".join(getattr(e, "messages", [str(e)]))}')
+                return self.form_invalid(form)
+            try:
+                changed, unknown = reprice_from_list(
+                    prices, user=self.request.user, reason=reason, allow_below_cost=data['allow_below_cost']
+                )
+            except BelowCostError as e:
+                return self.below_cost(form, e)
+            if unknown:
+                messages.warning(
+                    self.request,
+                    f'{len(unknown)} SKU(s) not found: {", ".join(unknown[:10])}{"..." if len(unknown) > 10 else ""}'
+                )
+        else:
+            queryset = Product.objects.all()
+            if data['category']:
+                queryset = queryset.filter(category=data['category'])
+            if data['search']:
+                queryset = queryset.filter(
+                    Q(name__icontains=data['search']) |
+                    Q(sku__icontains=data['search']) |
+                    Q(barcode__icontains=data['search'])
+                )
+            try:
+                changed = reprice(
+                    queryset, data['mode'], data['value'], user=self.request.user, reason=reason,
+                    allow_below_cost=data['allow_below_cost'],
+                )
+            except BelowCostError as e:
+                return self.below_cost(form, e)
+        
+        logger.info(f"User {self.request.user.username} bulk repriced {changed} product(s)")
+        messages.success(self.request, f'Updated prices for {changed} product(s).')
+        return super().form_valid(form)
+    
+    def below_cost(self, form, error):
+        form.add_error(None, f'{error}. Nothing was changed; tick "Allow prices below cost" to apply anyway.')
+        return self.form_invalid(form)
+
+
+class StockTransferView(LoginRequiredMixin, RoleRequiredMixin, FormView):
+    """Move stock between locations"""
+    allowed_roles = INVENTORY_ROLES
+    template_name = 'inventory/stock_transfer.html'
+    form_class = StockTransferForm
+    success_url = reverse_lazy('inventory:stock_transfer')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['recent_transfers'] = StockMovement.objects.filter(
+            movement_type='TRANSFER_IN'
+        ).select_related('product', 'location', 'user')[:20]
+        return context
+    
+    def form_valid(self, form):
+        data = form.cleaned_data
+        product = data['product']
+        try:
+            transfer_stock(
+                product, data['from_location'], data['to_location'], data['quantity'],
+                user=self.request.user, reference=data['reference'],
+            )
+        except InsufficientStockError:
+            form.add_error('quantity', f'Not enough stock of {product.name} at {data["from_location"].name}.')
+            return self.form_invalid(form)
+        
+        logger.info(
+            f"User {self.request.user.username} transferred {data['quantity']} of product {product.id} "
+            f"from {data['from_location'].code} to {data['to_location'].code}",
+            extra={'event': 'stock.transferred', 'product_id': product.id}
+        )
+        messages.success(
+            self.request,
+            f'Moved {data["quantity"]} x {product.name} from {data["from_location"].name} to {data["to_location"].name}.'
+        )
+        return super().form_valid(form)
+
+
+# Stock Count Views
+class StockCountListView(LoginRequiredMixin, RoleRequiredMixin, ListView):
+    """Cycle-count sessions, with a form to open a new one"""
+    allowed_roles = INVENTORY_ROLES
+    model = StockCount
+    template_name = 'inventory/stock_count_list.html'
+    context_object_name = 'counts'
+    paginate_by = 20
+    
+    def get_queryset(self):
+        return StockCount.objects.select_related('location', 'category', 'created_by').annotate(
+            scan_count=Count('scans')
+        ).order_by('-created_at')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.setdefault('form', StockCountForm())
+        return context
+    
+    def post(self, request, *args, **kwargs):
+        form = StockCountForm(request.POST)
+        if form.is_valid():
+            form.instance.created_by = request.user
+            count = form.save()
+            logger.info(f"User {request.user.username} opened stock count {count.id}", extra={'event': 'count.opened', 'count_id': count.id})
+            return redirect('inventory:stock_count_detail', pk=count.pk)
+        self.object_list = self.get_queryset()
+        return self.render_to_response(self.get_context_data(form=form))
+
+
+class StockCountDetailView(LoginRequiredMixin, RoleRequiredMixin, DetailView):
+    """Scan entry and variance review for one count"""
+    allowed_roles = INVENTORY_ROLES
+    model = StockCount
+    template_name = 'inventory/stock_count_detail.html'
+    context_object_name = 'count'
+    variance_limit = 200
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        rows = variances(self.object).exclude(variance=0).select_related('category')
+        totals = rows.aggregate(products=Count('pk'), units=Sum('variance'))
+        context['variances'] = rows[:self.variance_limit]
+        context['variance_products'] = totals['products']
+        context['variance_units'] = totals['units'] or 0
+        context['recent_scans'] = self.object.scans.select_related('product', 'user')[:20]
+        context['scan_total'] = self.object.scans.count()
+        return context
+
+
 # Category Views
 class CategoryListView(LoginRequiredMixin, ListView):
     model = Category
@@ -266,7 +519,8 @@ class CategoryListView(LoginRequiredMixin, ListView):
     context_object_name = 'categories'
 
 
-class CategoryCreateView(LoginRequiredMixin, CreateView):
+class CategoryCreateView(LoginRequiredMixin, RoleRequiredMixin, CreateView):
+    allowed_roles = INVENTORY_ROLES
     model = Category
     fields = ['name', 'description']
     template_name = 'inventory/category_form.html'
@@ -277,7 +531,8 @@ class CategoryCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
-class CategoryUpdateView(LoginRequiredMixin, UpdateView):
+class CategoryUpdateView(LoginRequiredMixin, RoleRequiredMixin, UpdateView):
+    allowed_roles = INVENTORY_ROLES
     model = Category
     fields = ['name', 'description']
     template_name = 'inventory/category_form.html'
@@ -293,17 +548,18 @@ class CategoryUpdateView(LoginRequiredMixin, UpdateView):
         obj = get_object_or_404(Category, pk=pk)
         
         # Add logging for audit trail
-        logger.info(f"User {self.request.user.username} accessed category {obj.id} for editing")
+        logger.info(f"User {self.request.user.username} accessed category {obj.id} for editing", extra={'event': 'category.edit_opened', 'category_id': obj.id})
         
         return obj
     
     def form_valid(self, form):
-        logger.info(f"User {self.request.user.username} updated category {form.instance.id}")
+        logger.info(f"User {self.request.user.username} updated category {form.instance.id}", extra={'event': 'category.updated', 'category_id': form.instance.id})
         messages.success(self.request, 'Category updated successfully!')
         return super().form_valid(form)
 
 
-class CategoryDeleteView(LoginRequiredMixin, DeleteView):
+class CategoryDeleteView(LoginRequiredMixin, RoleRequiredMixin, DeleteView):
+    allowed_roles = INVENTORY_ROLES
     model = Category
     template_name = 'inventory/category_confirm_delete.html'
     success_url = reverse_lazy('inventory:category_list')
@@ -318,18 +574,19 @@ class CategoryDeleteView(LoginRequiredMixin, DeleteView):
         obj = get_object_or_404(Category, pk=pk)
         
         # Add logging for audit trail
-        logger.info(f"User {self.request.user.username} accessed category {obj.id} for deletion")
+        logger.info(f"User {self.request.user.username} accessed category {obj.id} for deletion", extra={'event': 'category.delete_opened', 'category_id': obj.id})
         
         return obj
     
     def delete(self, request, *args, **kwargs):
         category_id = self.get_object().id
-        logger.warning(f"User {request.user.username} deleted category {category_id}")
+        logger.warning(f"User {request.user.username} deleted category {category_id}", extra={'event': 'category.deleted', 'category_id': category_id})
         messages.success(request, 'Category deleted successfully!')
         return super().delete(request, *args, **kwargs)
 
 
-class ArchivedProductsView(LoginRequiredMixin, ListView):
+class ArchivedProductsView(LoginRequiredMixin, RoleRequiredMixin, ListView):
+    allowed_roles = INVENTORY_ROLES
     model = Product
     template_name = 'inventory/archived_products.html'
     context_object_name = 'products'
@@ -375,6 +632,7 @@ from datetime import datetime
 
 
 @login_required
+@role_required(*INVENTORY_ROLES)
 @require_POST
 @csrf_protect
 def bulk_archive_products(request):
@@ -387,14 +645,9 @@ def bulk_archive_products(request):
         return redirect('inventory:product_list')
     
     try:
-        # Get products and perform soft delete
-        products = Product.objects.filter(id__in=product_ids, is_deleted=False)
-        archived_count = 0
-        
-        for product in products:
-            product.soft_delete(user=request.user)
-            archived_count += 1
-            logger.info(f"User {request.user.username} bulk archived product {product.id} ({product.name})")
+        # Archive with one UPDATE; audit rows are written in bulk
+        archived_count = Product.objects.filter(id__in=product_ids).soft_delete(user=request.user)
+        logger.info(f"User {request.user.username} bulk archived {archived_count} product(s)")
         
         messages.success(request, f'Successfully archived {archived_count} product(s).')
         
@@ -406,6 +659,7 @@ def bulk_archive_products(request):
 
 
 @login_required
+@role_required(*INVENTORY_ROLES)
 @require_POST
 @csrf_protect
 def bulk_delete_products(request):
@@ -422,14 +676,10 @@ def bulk_delete_products(request):
         return redirect('inventory:product_list')
     
     try:
-        # Get products and perform hard delete
-        products = Product.all_objects.filter(id__in=product_ids)
-        deleted_count = products.count()
+        # Delete in chunks; audit rows are written in bulk per chunk
+        deleted_count = Product.all_objects.filter(id__in=product_ids).hard_delete(user=request.user)
+        logger.warning(f"User {request.user.username} permanently deleted {deleted_count} product(s)")
         
-        for product in products:
-            logger.warning(f"User {request.user.username} permanently deleted product {product.id} ({product.name})")
-        
-        products.delete()
         messages.success(request, f'Successfully deleted {deleted_count} product(s) permanently.')
         
     except Exception as e:
@@ -440,6 +690,65 @@ def bulk_delete_products(request):
 
 
 @login_required
+@role_required(*INVENTORY_ROLES)
+@require_POST
+def stock_count_scan(request, pk):
+    """
+    Append scans to an open count. Accepts form data (code, quantity) or a
+    JSON body {"scans": [{"code": ..., "quantity": ...}, ...]} so a handheld
+    can send a batch in one request.
+    """
+    count = get_object_or_404(StockCount, pk=pk)
+    try:
+        if request.content_type == 'application/json':
+            payload = json.loads(request.body)
+            items = [(scan.get('code', ''), scan.get('quantity', 1)) for scan in payload.get('scans', [])]
+        else:
+            items = [(request.POST.get('code', ''), request.POST.get('quantity') or 1)]
+        accepted, unknown = record_scans(count, items, user=request.user)
+    except CountClosedError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid scan data'}, status=400)
+    
+    return JsonResponse({'success': True, 'accepted': accepted, 'unknown': unknown})
+
+
+@login_required
+@role_required(*INVENTORY_ROLES)
+@require_POST
+@csrf_protect
+def stock_count_post(request, pk):
+    """Post all variances of a count as stock adjustments"""
+    count = get_object_or_404(StockCount, pk=pk)
+    try:
+        adjusted = post_count(count, user=request.user)
+    except CountClosedError as e:
+        messages.error(request, str(e))
+        return redirect('inventory:stock_count_detail', pk=pk)
+    
+    logger.warning(f"User {request.user.username} posted stock count {count.id} adjusting {adjusted} product(s)", extra={'event': 'count.posted', 'count_id': count.id})
+    messages.success(request, f'Count posted. Adjusted stock for {adjusted} product(s).')
+    return redirect('inventory:stock_count_detail', pk=pk)
+
+
+@login_required
+@role_required(*INVENTORY_ROLES)
+@require_POST
+@csrf_protect
+def stock_count_cancel(request, pk):
+    """Cancel an open count without changing stock"""
+    updated = StockCount.objects.filter(pk=pk, status='OPEN').update(status='CANCELLED')
+    if updated:
+        logger.info(f"User {request.user.username} cancelled stock count {pk}", extra={'event': 'count.cancelled', 'count_id': pk})
+        messages.success(request, 'Count cancelled.')
+    else:
+        messages.error(request, 'Only open counts can be cancelled.')
+    return redirect('inventory:stock_count_list')
+
+
+@login_required
+@use_replica
 def export_products(request):
     """Export products to CSV or PDF"""
     if request.method != 'POST':
@@ -453,9 +762,9 @@ def export_products(request):
     # Get products to export
     if selected_products:
         product_ids = [pid.strip() for pid in selected_products.split(',') if pid.strip()]
-        products = Product.objects.filter(id__in=product_ids).select_related('category').order_by('name')
+        products = Product.objects.filter(id__in=product_ids).with_valuation().select_related('category').order_by('name')
     else:
-        products = Product.objects.select_related('category').order_by('name')
+        products = Product.objects.with_valuation().select_related('category').order_by('name')
     
     if export_format == 'csv':
         return export_products_csv(products, include_stock_value)
@@ -472,6 +781,7 @@ def export_products_csv(products, include_stock_value=True):
     response['Content-Disposition'] = f'attachment; filename="products_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
     
     writer = csv.writer(response)
+    currency = CompanySettings.get_cached().currency_symbol
     
     # CSV Headers
     headers = ['Name', 'SKU', 'Barcode', 'Category', 'Selling Price', 'Cost Price', 'Stock Quantity', 'Minimum Stock', 'Status']
@@ -488,17 +798,15 @@ def export_products_csv(products, include_stock_value=True):
             product.sku,
             product.barcode or '',
             product.category.name if product.category else 'No Category',
-            f"₱{product.selling_price:.2f}",
-            f"₱{product.cost_price:.2f}",
+            f"{currency}{product.selling_price:.2f}",
+            f"{currency}{product.cost_price:.2f}",
             product.stock_quantity,
             product.minimum_stock,
             'Active' if product.is_active else 'Inactive'
         ]
         
         if include_stock_value:
-            stock_value = product.stock_quantity * product.cost_price
-            potential_revenue = product.stock_quantity * product.selling_price
-            row.extend([f"₱{stock_value:.2f}", f"₱{potential_revenue:.2f}"])
+            row.extend([f"{currency}{product.stock_value:.2f}", f"{currency}{product.potential_revenue:.2f}"])
         
         row.extend([
             product.created_at.strftime('%Y-%m-%d %H:%M:%S'),
@@ -541,6 +849,7 @@ def export_products_pdf(products, include_images=False, include_stock_value=True
     elements.append(Spacer(1, 20))
     
     # Table data
+    currency = CompanySettings.get_cached().currency_symbol
     if include_stock_value:
         table_data = [['Name', 'Category', 'SKU', 'Price', 'Stock', 'Stock Value']]
     else:
@@ -548,21 +857,20 @@ def export_products_pdf(products, include_images=False, include_stock_value=True
     
     for product in products:
         if include_stock_value:
-            stock_value = product.stock_quantity * product.cost_price
             row = [
                 product.name[:30],  # Truncate long names
                 product.category.name if product.category else 'No Category',
                 product.sku,
-                f"₱{product.selling_price:.2f}",
+                f"{currency}{product.selling_price:.2f}",
                 str(product.stock_quantity),
-                f"₱{stock_value:.2f}"
+                f"{currency}{product.stock_value:.2f}"
             ]
         else:
             row = [
                 product.name[:30],
                 product.category.name if product.category else 'No Category',
                 product.sku,
-                f"₱{product.selling_price:.2f}",
+                f"{currency}{product.selling_price:.2f}",
                 str(product.stock_quantity),
                 'Active' if product.is_active else 'Inactive'
             ]
@@ -596,6 +904,7 @@ def export_products_pdf(products, include_images=False, include_stock_value=True
 
 
 @login_required
+@role_required(*INVENTORY_ROLES)
 def product_quick_edit(request, pk):
     """Quick edit product via AJAX"""
     if request.method != 'POST':
@@ -604,15 +913,23 @@ def product_quick_edit(request, pk):
     try:
         product = get_object_or_404(Product, pk=pk)
         
-        # Update fields
-        if 'selling_price' in request.POST:
-            product.selling_price = float(request.POST['selling_price'])
-        if 'stock_quantity' in request.POST:
-            product.stock_quantity = int(request.POST['stock_quantity'])
-        if 'minimum_stock' in request.POST:
-            product.minimum_stock = int(request.POST['minimum_stock'])
-        
-        product.save()
+        with transaction.atomic():
+            if 'minimum_stock' in request.POST:
+                product.minimum_stock = int(request.POST['minimum_stock'])
+                product.save(update_fields=['minimum_stock', 'updated_at'])
+            
+            # Price changes are recorded in the price history
+            if 'selling_price' in request.POST:
+                change_price(
+                    product, Decimal(request.POST['selling_price']), user=request.user,
+                    source='QUICK_EDIT'
+                )
+            
+            # Stock changes are recorded as an adjustment through the stock service
+            if 'stock_quantity' in request.POST:
+                new_quantity = int(request.POST['stock_quantity'])
+                if new_quantity != product.stock_quantity:
+                    set_total_stock(product, new_quantity, request.user, reason='Quick edit')
         
         logger.info(f"User {request.user.username} quick-edited product {product.id}")
         
@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_pos.settings')
+# Under ASGI the POS JSON endpoints run as async views (pos/async_views.py)
+os.environ.setdefault('POS_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Build every breadcrumb trail once, before the first request
+from inventory.templatetags.breadcrumbs import precompile  # noqa: E402
+
+precompile()
@@ -0,0 +1,380 @@
+"""
+Cache backends.
+
+TieredCache puts a small in-process LRU in front of a shared cache, so hot
+keys are served from worker memory while every worker still sees the same
+data. Keys are hashed into BUCKETS buckets, each with a version number in
+the shared tier. A write bumps its key's bucket, and workers compare the
+bucket versions at most once per CHECK_INTERVAL seconds (one get_many), so
+another worker's set or delete shows up within that interval and only
+evicts local entries from the same bucket. LOCAL_TIMEOUT caps how long any
+value lives in worker memory. The LRU is shared by every thread in the
+process that uses the same cache configuration.
+
+SQLiteCache is a shared tier that needs no server: a single SQLite file in
+WAL mode that every worker on the machine can read and write.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'inventory_pos.cache.TieredCache',
+            'OPTIONS': {'SHARED': 'shared', 'MAX_ENTRIES': 1000},
+        },
+        'shared': {
+            'BACKEND': 'inventory_pos.cache.SQLiteCache',
+            'LOCATION': BASE_DIR / 'cache' / 'shared.sqlite3',
+        },
+    }
+
+Django's FileBasedCache or RedisCache work as the shared tier as well.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    """Cache stored in a standalone SQLite file, shared by all local processes"""
+
+    # Rows are culled once every CULL_EVERY writes per connection
+    CULL_EVERY = 100
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = os.fspath(location)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        # Connections can't be shared across threads or forked processes
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.writes = 0
+        return conn
+
+    def _live(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _write(self, sql, params):
+        conn = self._connection()
+        cursor = conn.execute(sql, params)
+        self._local.writes += 1
+        if self._local.writes % self.CULL_EVERY == 0:
+            self._cull(conn)
+        return cursor.rowcount
+
+    def _cull(self, conn):
+        conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+        (count,) = conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            excess = count - self._max_entries + self._max_entries // self._cull_frequency
+            conn.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (excess,),
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, time.time()))
+        return self._write(
+            'INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout)),
+        ) == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._live(key)
+        return default if value is None else pickle.loads(value)
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN ({', '.join('?' * len(keys))}) "
+            'AND (expires IS NULL OR expires > ?)',
+            (*keys, time.time()),
+        ).fetchall()
+        return {keys[key]: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(
+            'INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout)),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._live(key) is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        # Read-modify-write under SQLite's write lock so concurrent workers can't lose updates
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            value = self._live(key)
+            if value is None:
+                raise ValueError(f"Key '{key}' not found")
+            new_value = pickle.loads(value) + delta
+            conn.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(new_value, pickle.HIGHEST_PROTOCOL), key),
+            )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return new_value
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are reused for the life of the thread
+        pass
+
+
+class _LocalStore:
+    """The in-process LRU and bucket versions behind TieredCaches with one configuration"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.versions = {}
+        self.checked_at = 0.0
+        self.hits = {'local': 0, 'shared': 0}
+        self.misses = {'local': 0, 'shared': 0}
+
+    def count(self, counter, tier):
+        with self.lock:
+            counter[tier] += 1
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def _local_store(params, shared_params):
+    # caches[alias] is per thread, so the store is looked up by configuration
+    # to keep one LRU per process rather than one per thread
+    key = json.dumps([params, shared_params], sort_keys=True, default=str)
+    with _stores_lock:
+        return _stores.setdefault(key, _LocalStore())
+
+
+class TieredCache(BaseCache):
+    """Bounded in-process LRU with per-key TTL, layered over a shared cache alias"""
+
+    VERSION_KEY = 'tiered-cache:bucket:{}'
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._check_interval = options.get('CHECK_INTERVAL', 1.0)
+        self._buckets = options.get('BUCKETS', 64)
+        self._version_keys = [
+            self.VERSION_KEY.format(f'{self.key_prefix}:{bucket}') for bucket in range(self._buckets)
+        ]
+        self._store = _local_store(params, caches.settings.get(self._shared_alias))
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def stats(self):
+        """Hit/miss counters per tier for this process"""
+        with self._store.lock:
+            return {
+                tier: {'hits': self._store.hits[tier], 'misses': self._store.misses[tier]}
+                for tier in ('local', 'shared')
+            }
+
+    # Bucket versions
+
+    def _bucket(self, local_key):
+        return zlib.crc32(local_key.encode()) % self._buckets
+
+    def _sync(self):
+        """Fetch every bucket's version if the last check is older than CHECK_INTERVAL"""
+        store = self._store
+        now = time.monotonic()
+        if now - store.checked_at < self._check_interval:
+            return
+        found = self.shared.get_many(self._version_keys)
+        with store.lock:
+            store.versions = {
+                bucket: found.get(key) for bucket, key in enumerate(self._version_keys)
+            }
+            store.checked_at = now
+
+    def _bump(self, local_key):
+        """Tell other workers their copies of keys in local_key's bucket may be stale"""
+        bucket = self._bucket(local_key)
+        key = self._version_keys[bucket]
+        try:
+            version = self.shared.incr(key)
+        except ValueError:
+            # Seeded from the clock, so a lost version can't come back as one still held
+            version = time.time_ns() // 1000
+            if not self.shared.add(key, version, timeout=None):
+                version = self.shared.get(key)
+        with self._store.lock:
+            # Other workers may have written to the bucket too, so our own
+            # entries from it are dropped along with theirs
+            self._store.versions[bucket] = version
+
+    # Local tier
+
+    def _local_timeout_for(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        local_expiry = time.time() + self._local_timeout
+        return local_expiry if timeout is None else min(timeout, local_expiry)
+
+    def _local_get(self, key):
+        store = self._store
+        with store.lock:
+            entry = store.entries.get(key)
+            if entry is None:
+                return None
+            value, expires, version = entry
+            if expires <= time.time() or version != store.versions.get(self._bucket(key)):
+                del store.entries[key]
+                return None
+            store.entries.move_to_end(key)
+            return value
+
+    def _local_set(self, key, pickled, expires, version):
+        store = self._store
+        with store.lock:
+            store.entries[key] = (pickled, expires, version)
+            store.entries.move_to_end(key)
+            while len(store.entries) > self._max_entries:
+                store.entries.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._store.lock:
+            self._store.entries.pop(key, None)
+
+    def _version_of(self, key):
+        with self._store.lock:
+            return self._store.versions.get(self._bucket(key))
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._sync()
+        pickled = self._local_get(local_key)
+        if pickled is not None:
+            self._store.count(self._store.hits, 'local')
+            return pickle.loads(pickled)
+        self._store.count(self._store.misses, 'local')
+
+        # Read the version first: a bump that lands after it makes the entry stale, not the reverse
+        bucket_version = self._version_of(local_key)
+        missing = object()
+        value = self.shared.get(key, missing, version=version)
+        if value is missing:
+            self._store.count(self._store.misses, 'shared')
+            return default
+        self._store.count(self._store.hits, 'shared')
+        self._local_set(
+            local_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self._local_timeout_for(None), bucket_version
+        )
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self.shared.set(key, value, timeout=timeout, version=version)
+        self._bump(local_key)
+        if timeout is None or timeout > 0:
+            self._local_set(
+                local_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                self._local_timeout_for(timeout), self._version_of(local_key),
+            )
+        else:
+            self._local_delete(local_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        added = self.shared.add(key, value, timeout=timeout, version=version)
+        if added:
+            self._local_delete(local_key)
+            self._bump(local_key)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._local_delete(local_key)
+        deleted = self.shared.delete(key, version=version)
+        self._bump(local_key)
+        return deleted
+
+    def has_key(self, key, version=None):
+        self._sync()
+        if self._local_get(self.make_and_validate_key(key, version=version)) is not None:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._local_delete(local_key)
+        value = self.shared.incr(key, delta, version=version)
+        self._bump(local_key)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        # Fresh versions for every bucket, so other workers drop all their entries
+        versions = {key: time.time_ns() // 1000 for key in self._version_keys}
+        self.shared.set_many(versions, timeout=None)
+        with self._store.lock:
+            self._store.entries.clear()
+            self._store.versions = {bucket: versions[key] for bucket, key in enumerate(self._version_keys)}
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
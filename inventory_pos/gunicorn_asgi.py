@@ -0,0 +1,28 @@
+"""
+Gunicorn settings for serving inventory_pos.asgi with uvicorn workers:
+
+    gunicorn inventory_pos.asgi:application -c inventory_pos/gunicorn_asgi.py
+
+Each worker runs one event loop, so a few workers handle as many waiting
+POS requests as a much larger pool of sync workers. Gunicorn still manages
+the processes: restarts, graceful reloads and worker timeouts.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# One event loop per core is enough; the blocking checkout transaction
+# runs in each worker's sync thread
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so slow leaks can't build up
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = '-'
@@ -0,0 +1,265 @@
+"""
+Non-blocking structured logging.
+
+Views only put records on an in-memory queue; a background listener
+thread formats them as JSON lines and writes them in batches to a
+rotating file (and optionally the console). Every record carries the id
+of the request that produced it, and high-volume events such as product
+views can be sampled before they are queued.
+"""
+import asyncio
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject, empty
+
+
+_traceback_formatter = logging.Formatter()
+
+_current_request = contextvars.ContextVar('current_request', default=None)
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id', 'user'}
+
+
+class RequestIdMiddleware:
+    """Tag each request with an id (from X-Request-ID or a new uuid) for log records"""
+
+    header = 'HTTP_X_REQUEST_ID'
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.request_id = request.META.get(self.header, '')[:64] or uuid.uuid4().hex
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        request.request_id = request.META.get(self.header, '')[:64] or uuid.uuid4().hex
+        token = _current_request.set(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        response['X-Request-ID'] = request.request_id
+        return response
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request id and username to the record"""
+
+    def filter(self, record):
+        request = _current_request.get()
+        record.request_id = getattr(request, 'request_id', None)
+        user = getattr(request, 'user', None)
+        # Loading the user is a query, which Django refuses inside the event loop
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty and _in_event_loop():
+            user = None
+        record.user = user.get_username() if user is not None and user.is_authenticated else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records for the given events.
+
+    rates maps an event name (passed as extra={'event': ...}) to the share
+    of records to keep, from 0.0 (drop all) to 1.0 (keep all). Warnings and
+    errors are never sampled.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, 'event', None))
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'user': getattr(record, 'user', None),
+            'process': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that buffers formatted lines and writes them with a
+    single write() once batch_size lines are pending or flush() is called.
+    """
+
+    def __init__(self, filename, batch_size=50, **kwargs):
+        kwargs.setdefault('encoding', 'utf-8')
+        kwargs['delay'] = True
+        super().__init__(filename, **kwargs)
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def emit(self, record):
+        try:
+            self.buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.acquire()
+        try:
+            if not self.buffer:
+                return
+            data = ''.join(self.buffer)
+            self.buffer = []
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(data)
+            self.stream.flush()
+        except Exception:
+            self.handleError(None)
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that flushes its handlers whenever the queue goes idle"""
+
+    def __init__(self, log_queue, *handlers, flush_interval=1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+        for handler in self.handlers:
+            handler.close()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller"""
+
+    def prepare(self, record):
+        # Resolve the message and traceback now; extra= attributes are kept
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Dropping a log line is better than stalling a request
+            pass
+
+
+def queue_handler(filename=None, max_bytes=10 * 1024 * 1024, backup_count=5,
+                  batch_size=50, flush_interval=1.0, console=False, queue_size=10000):
+    """
+    Build a QueueHandler whose records are written by a background listener.
+
+    Meant to be used from LOGGING with '()', e.g.
+
+        'audit': {
+            '()': 'inventory_pos.logging_pipeline.queue_handler',
+            'filename': BASE_DIR / 'logs' / 'security.log',
+        }
+
+    When the queue is full new records are dropped rather than blocking the
+    request.
+    """
+    formatter = JsonFormatter()
+    handlers = []
+    if filename:
+        os.makedirs(os.path.dirname(os.fspath(filename)), exist_ok=True)
+        file_handler = BatchedRotatingFileHandler(
+            filename, batch_size=batch_size, maxBytes=max_bytes, backupCount=backup_count,
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = BatchingQueueListener(log_queue, *handlers, flush_interval=flush_interval)
+    listener.start()
+    atexit.register(listener.stop)
+
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.listener = listener
+    return handler
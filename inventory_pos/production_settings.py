@@ -46,6 +46,14 @@ else:
     }
     print("Using SQLite database for production (temporary)")
 
+    # Read replica for reports, refreshed by the refresh_replica command
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('REPLICA_DATABASE_PATH', default=os.path.join(BASE_DIR, 'cache', 'replica.sqlite3')),
+        'SQLITE_PRAGMAS': {'query_only': 1, 'temp_store': 'MEMORY'},
+        'SQLITE_TRANSACTION_MODE': None,
+    }
+
 # Static files settings for production
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -56,6 +64,16 @@ MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 # Static files compression
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Templates are compiled once per process and kept in memory.
+# (loaders and APP_DIRS can't be set together)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
 # Media files - for production, you'd want to use cloud storage
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -75,9 +93,19 @@ if not DEBUG:
     CSRF_COOKIE_SECURE = True
 
 # Logging
+# Render's disk is ephemeral, so the queued JSON records go to the console only
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {
+            '()': 'inventory_pos.logging_pipeline.RequestContextFilter',
+        },
+        'sampling': {
+            '()': 'inventory_pos.logging_pipeline.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
     'formatters': {
         'verbose': {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
@@ -90,6 +118,12 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'audit': {
+            '()': 'inventory_pos.logging_pipeline.queue_handler',
+            'level': 'INFO',
+            'filters': ['request_context', 'sampling'],
+            'console': True,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -102,14 +136,19 @@ LOGGING = {
             'propagate': False,
         },
         'inventory': {
-            'handlers': ['console'],
+            'handlers': ['audit'],
             'level': 'INFO',
             'propagate': False,
         },
         'pos': {
-            'handlers': ['console'],
+            'handlers': ['audit'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'accounts': {
+            'handlers': ['audit'],
             'level': 'INFO',
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
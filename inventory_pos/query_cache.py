@@ -0,0 +1,168 @@
+"""
+Query-result cache with generation counters.
+
+Every cached model has a generation number in the cache that goes up on any
+write to it: model saves and deletes via signals, and queryset update(),
+bulk_create(), bulk_update() and delete() via GenerationQuerySet. Cache keys
+include the current generations, so one increment orphans every cached
+result for the model at once; nothing has to find and delete old keys, they
+simply expire.
+
+Generations are bumped after commit, so a result cached from data the
+writer is about to change is filed under the old generation. With
+TieredCache other workers see a bump within CHECK_INTERVAL.
+
+Only primary keys are cached. Views load the rows for a page with a single
+pk__in query, so cached entries stay small and rows are never stale.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.paginator import Page
+from django.db import models, transaction
+
+
+KEY_PREFIX = 'query-cache'
+
+
+def _generation_key(model):
+    return f'{KEY_PREFIX}:generation:{model._meta.label_lower}'
+
+
+def _initial_generation():
+    # Counters start from the clock rather than 0, so a counter that gets
+    # evicted can't restart at a number that older cached results used
+    return time.time_ns() // 1000
+
+
+def generations(*models):
+    """Current generation of each model"""
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), timeout=None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def bump_generation(model):
+    """Invalidate every cached query over model once the transaction commits"""
+    key = _generation_key(model)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def bump_on_write(sender, raw=False, origin=None, **kwargs):
+    """post_save/post_delete receiver for cached models"""
+    # Queryset deletes bump once in GenerationQuerySet.delete, not per row
+    if not raw and not isinstance(origin, GenerationQuerySet):
+        bump_generation(sender)
+
+
+class GenerationQuerySet(models.QuerySet):
+    """QuerySet whose bulk writes bump the model's generation"""
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        if rows:
+            bump_generation(self.model)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        if created:
+            bump_generation(self.model)
+        return created
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        rows = super().bulk_update(objs, fields, batch_size=batch_size)
+        if rows:
+            bump_generation(self.model)
+        return rows
+
+    def delete(self):
+        deleted = super().delete()
+        if deleted[0]:
+            bump_generation(self.model)
+        return deleted
+
+    def update_untracked(self, **kwargs):
+        """
+        update() without the generation bump, for columns whose cached
+        queries are keyed on another model's generation instead
+        """
+        return super().update(**kwargs)
+
+
+def is_enabled(name):
+    return settings.QUERY_CACHE_VIEWS.get(name, False)
+
+
+class QueryCacheMixin:
+    """
+    Cache the ids on each page of a ListView.
+
+    Subclasses set query_cache_name (the key in settings.QUERY_CACHE_VIEWS),
+    query_cache_models (whose writes invalidate the cache, or override
+    get_query_cache_models() when that depends on the request), and implement
+    get_query_cache_params() returning the normalized filters and sort for
+    the request, and get_base_queryset() used to load the page's rows.
+    """
+
+    query_cache_name = None
+    query_cache_models = ()
+    query_cache_timeout = DEFAULT_TIMEOUT
+
+    def get_query_cache_params(self):
+        raise NotImplementedError
+
+    def get_base_queryset(self):
+        raise NotImplementedError
+
+    def get_query_cache_models(self):
+        return self.query_cache_models
+
+    def get_query_cache_key(self, page_number):
+        params = dict(self.get_query_cache_params(), page=str(page_number), per_page=self.paginate_by)
+        digest = hashlib.md5(
+            json.dumps(params, sort_keys=True, default=str).encode(), usedforsecurity=False
+        ).hexdigest()
+        versions = '.'.join(str(generation) for generation in generations(*self.get_query_cache_models()))
+        return f'{KEY_PREFIX}:{self.query_cache_name}:{versions}:{digest}'
+
+    def paginate_queryset(self, queryset, page_size):
+        if not is_enabled(self.query_cache_name):
+            return super().paginate_queryset(queryset, page_size)
+
+        page_kwarg = self.page_kwarg
+        page_number = self.kwargs.get(page_kwarg) or self.request.GET.get(page_kwarg) or 1
+        key = self.get_query_cache_key(page_number)
+        cached = cache.get(key)
+        if cached is None:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+            ids = [obj.pk for obj in object_list]
+            cache.set(key, (paginator.count, page.number, ids), self.query_cache_timeout)
+            return paginator, page, object_list, is_paginated
+
+        count, number, ids = cached
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty(),
+        )
+        # Seed the count so the paginator doesn't run its COUNT query
+        paginator.__dict__['count'] = count
+        rows = self.get_base_queryset().in_bulk(ids)
+        object_list = [rows[pk] for pk in ids if pk in rows]
+        page = Page(object_list, number, paginator)
+        return paginator, page, object_list, page.has_other_pages()
@@ -0,0 +1,182 @@
+"""
+Read replica for reports and exports.
+
+Views opt in with ReplicaReadMixin or @use_replica. While such a view runs,
+ReplicaRouter sends reads of the apps in settings.REPLICA_APPS to the
+'replica' database, so long aggregates don't hold locks on the database
+checkout writes to. Writes always go to 'default'. Every other view, and
+auth and session lookups, keep reading 'default'.
+
+The replica is used only when it is configured, reachable and no older
+than settings.REPLICA_MAX_LAG seconds; otherwise reads quietly stay on
+'default'. Health is checked at most once per REPLICA_CHECK_INTERVAL.
+
+On a single box the replica is a SQLite file refreshed with the online
+backup API (refresh_replica below, run by the refresh_replica command).
+Each refresh copies one read snapshot of the database in a single backup
+step, writes it next to the replica and renames it over the old one, so
+readers never see a half-written file. The copy records when the snapshot
+was taken, which is how lag is measured. Replicas on other
+databases are assumed current, since their lag can't be read portably.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+REPLICA_ALIAS = 'replica'
+
+META_TABLE = 'replica_meta'
+
+_reading_replica = ContextVar('reading_replica', default=False)
+
+_health = {'checked_at': 0.0, 'ok': False}
+_health_lock = threading.Lock()
+
+
+def replica_lag(alias=REPLICA_ALIAS):
+    """Seconds since the replica was refreshed; 0 for non-SQLite replicas, None if unusable"""
+    if alias not in settings.DATABASES:
+        return None
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        return 0
+    # Connecting would create an empty database in its place
+    if not os.path.exists(connection.settings_dict['NAME']):
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT refreshed_at FROM {META_TABLE}')
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return time.time() - row[0] if row else None
+
+
+def replica_available():
+    """Whether reads may go to the replica right now"""
+    now = time.monotonic()
+    if now - _health['checked_at'] < settings.REPLICA_CHECK_INTERVAL:
+        return _health['ok']
+    with _health_lock:
+        if now - _health['checked_at'] >= settings.REPLICA_CHECK_INTERVAL:
+            lag = replica_lag()
+            _health['ok'] = lag is not None and lag <= settings.REPLICA_MAX_LAG
+            _health['checked_at'] = now
+    return _health['ok']
+
+
+class ReplicaRouter:
+    """Route reads inside use_replica() to the replica; everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _reading_replica.get()
+            and model._meta.app_label in settings.REPLICA_APPS
+            and replica_available()
+        ):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Never fall back to instance._state.db, which is 'replica' for rows read there
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of default, never migrated on its own
+        return db != REPLICA_ALIAS
+
+
+@contextmanager
+def _replica_reads():
+    token = _reading_replica.set(True)
+    try:
+        yield
+    finally:
+        _reading_replica.reset(token)
+
+
+def use_replica(view_func=None):
+    """
+    Send the reporting reads of a function view to the replica:
+
+        @login_required
+        @use_replica
+        def export(request): ...
+
+    Called without a function it is a context manager: with use_replica(): ...
+    """
+    if view_func is None:
+        return _replica_reads()
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with _replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """Class-based view counterpart of use_replica; list it after the auth and role mixins"""
+
+    def dispatch(self, request, *args, **kwargs):
+        with _replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            # Querysets in the context are evaluated while rendering, so render here
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+
+
+def refresh_replica(alias=REPLICA_ALIAS, source_alias=DEFAULT_DB_ALIAS):
+    """Copy the source SQLite database over the replica; returns (path, seconds taken)"""
+    source = connections[source_alias].settings_dict['NAME']
+    target = str(connections[alias].settings_dict['NAME'])
+    started = time.time()
+
+    directory = os.path.dirname(target) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.replica-', suffix='.sqlite3', dir=directory)
+    os.close(fd)
+    try:
+        src = sqlite3.connect(source, timeout=30, isolation_level=None)
+        dst = sqlite3.connect(temp_path)
+        try:
+            # Copy every page in one step from a single read snapshot. A
+            # stepped backup restarts whenever a checkout writes, so on a busy
+            # till it might never finish; under WAL writers carry on meanwhile.
+            src.execute('BEGIN')
+            src.execute('SELECT COUNT(*) FROM sqlite_master')
+            snapshot_at = time.time()
+            src.backup(dst, pages=-1)
+            src.execute('COMMIT')
+            # A copy of a WAL database is in WAL mode too; a stale -wal file
+            # next to the replica must never be applied to the new copy
+            dst.execute('PRAGMA journal_mode = DELETE')
+            dst.execute(f'CREATE TABLE IF NOT EXISTS {META_TABLE} (refreshed_at REAL NOT NULL)')
+            dst.execute(f'DELETE FROM {META_TABLE}')
+            dst.execute(f'INSERT INTO {META_TABLE} (refreshed_at) VALUES (?)', (snapshot_at,))
+            dst.commit()
+        finally:
+            dst.close()
+            src.close()
+        connections[alias].close()
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    # Let this process see the new copy immediately
+    _health['checked_at'] = 0.0
+    return target, time.time() - started
@@ -138,16 +138,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory_pos.logging_pipeline.RequestIdMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.roles.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'django_browser_reload.middleware.BrowserReloadMiddleware',
 ]
 
+# Loads the profile with the user; ModelBackend still serves older sessions
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 ROOT_URLCONF = 'inventory_pos.urls'
 
 TEMPLATES = [
@@ -160,6 +168,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.company',
             ],
         },
     },
@@ -197,21 +206,94 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
             'OPTIONS': {
                 'timeout': 20,
-            }
+            },
+            # A file rather than shared memory, so the stock concurrency
+            # tests get real concurrent connections
+            'TEST': {
+                'NAME': BASE_DIR / 'test_db.sqlite3',
+            },
         }
     }
 
+# SQLite tuning applied to every new connection (see inventory_pos.sqlite).
+# Set SQLITE_PERFORMANCE_PROFILE=False to run with SQLite's defaults.
+SQLITE_PERFORMANCE_PROFILE = config('SQLITE_PERFORMANCE_PROFILE', default=True, cast=bool)
+SQLITE_TRANSACTION_MODE = 'IMMEDIATE' if SQLITE_PERFORMANCE_PROFILE else None
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=20000, cast=int),
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative means KiB, so 64 MB
+    'temp_store': 'MEMORY',
+} if SQLITE_PERFORMANCE_PROFILE else {}
+
+# Read replica for reports and exports (see inventory_pos.replica). With
+# SQLite it is a copy of the database kept current by the refresh_replica
+# command; until the first refresh, reads simply stay on 'default'.
+if 'sqlite' in DATABASES['default']['ENGINE']:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('REPLICA_DATABASE_PATH', default=str(BASE_DIR / 'cache' / 'replica.sqlite3')),
+        # Read-only copy: no WAL (refreshes swap the file), no write transactions
+        'SQLITE_PRAGMAS': {
+            'query_only': 1,
+            'mmap_size': SQLITE_PRAGMAS.get('mmap_size', 0),
+            'cache_size': SQLITE_PRAGMAS.get('cache_size', -2000),
+            'temp_store': 'MEMORY',
+        },
+        'SQLITE_TRANSACTION_MODE': None,
+        'TEST': {'MIRROR': 'default'},
+    }
+elif config('REPLICA_DATABASE_URL', default=''):
+    DATABASES['replica'] = dj_database_url.parse(config('REPLICA_DATABASE_URL'))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['inventory_pos.replica.ReplicaRouter']
+
+# Apps whose reads may go to the replica; auth and sessions stay on default
+REPLICA_APPS = ('inventory', 'pos')
+# Older replicas are ignored, in seconds
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=300, cast=int)
+REPLICA_CHECK_INTERVAL = 5
+
 # Caching Configuration
+# Tests run against a throwaway copy of the caches below
+TEST_RUNNER = 'inventory_pos.test_runner.TestRunner'
+
+# A per-process LRU in front of a cache shared by all workers on the host.
+# The shared tier is a SQLite file by default, so no cache server is needed.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'inventory_pos.cache.TieredCache',
         'TIMEOUT': 300,  # 5 minutes
         'OPTIONS': {
+            'SHARED': 'shared',
             'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,    # longest a value lives in worker memory
+            'CHECK_INTERVAL': 1.0,  # how often workers look for other workers' writes
+        }
+    },
+    # Used by {% cache %}; fragment keys include updated_at, so local
+    # copies may live longer
+    'template_fragments': {
+        'BACKEND': 'inventory_pos.cache.TieredCache',
+        'TIMEOUT': 3600,
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 5000,
+            'LOCAL_TIMEOUT': 600,
+        }
+    },
+    'shared': {
+        'BACKEND': 'inventory_pos.cache.SQLiteCache',
+        'LOCATION': config('SHARED_CACHE_PATH', default=str(BASE_DIR / 'cache' / 'shared.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
             'CULL_FREQUENCY': 3,
         }
-    }
+    },
 }
 
 # For production with Redis (install redis-py):
@@ -237,6 +319,72 @@ CACHE_TIMEOUT = {
     'DASHBOARD': 60,   # 1 minute
 }
 
+# List views that cache the ids of each page of results (see
+# inventory_pos.query_cache); entries are dropped on any write to their models
+QUERY_CACHE_VIEWS = {
+    'product_list': config('QUERY_CACHE_PRODUCT_LIST', default=True, cast=bool),
+}
+
+
+# Logging
+# Views only enqueue records; a background listener writes JSON lines to a
+# rotating file in batches, so disk I/O stays out of the request.
+LOG_DIR = BASE_DIR / 'logs'
+
+# Share of high-volume events to keep (0.0 - 1.0)
+LOG_SAMPLE_RATES = {
+    'product.viewed': config('LOG_VIEW_SAMPLE_RATE', default=0.1, cast=float),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {
+            '()': 'inventory_pos.logging_pipeline.RequestContextFilter',
+        },
+        'sampling': {
+            '()': 'inventory_pos.logging_pipeline.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
+    },
+    'handlers': {
+        'audit': {
+            '()': 'inventory_pos.logging_pipeline.queue_handler',
+            'level': 'INFO',
+            'filters': ['request_context', 'sampling'],
+            'filename': LOG_DIR / 'security.log',
+            'max_bytes': config('LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int),
+            'backup_count': config('LOG_BACKUP_COUNT', default=5, cast=int),
+            'batch_size': 50,
+            'flush_interval': 1.0,
+            'console': DEBUG,
+        },
+    },
+    'loggers': {
+        'inventory': {
+            'handlers': ['audit'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'pos': {
+            'handlers': ['audit'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'accounts': {
+            'handlers': ['audit'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'django.security': {
+            'handlers': ['audit'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -281,6 +429,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Serve uploads from Django outside DEBUG (when no front server handles /media/)
+SERVE_MEDIA = config('SERVE_MEDIA', default=False, cast=bool)
+
+# Product image renditions, generated off-request by inventory.images
+IMAGE_RENDITION_SIZES = (64, 150, 300)
+IMAGE_RENDITION_WORKERS = config('IMAGE_RENDITION_WORKERS', default=2, cast=int)
+IMAGE_RENDITIONS_ASYNC = config('IMAGE_RENDITIONS_ASYNC', default=True, cast=bool)
 
 # Tailwind CSS
 TAILWIND_APP_NAME = 'theme'
@@ -301,6 +456,10 @@ COMPANY_LOGO = config('COMPANY_LOGO', default='')
 PRIMARY_COLOR = config('PRIMARY_COLOR', default='blue')
 SECONDARY_COLOR = config('SECONDARY_COLOR', default='gray')
 
+# Serve the POS search, cart and checkout endpoints from the async views in
+# pos/async_views.py; asgi.py turns this on unless the environment says otherwise
+POS_ASYNC_VIEWS = config('POS_ASYNC_VIEWS', default=False, cast=bool)
+
 # Production settings override for Render
 import os
 if os.environ.get('RENDER'):
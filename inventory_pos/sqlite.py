@@ -0,0 +1,71 @@
+"""
+SQLite connection tuning.
+
+apply_pragmas runs on every new SQLite connection (connection_created) and
+sets the PRAGMAs in settings.SQLITE_PRAGMAS (or the SQLITE_PRAGMAS key of the
+database's own settings), in order:
+
+- journal_mode=WAL lets readers carry on while a checkout writes, instead
+  of every request queueing behind the write lock.
+- synchronous=NORMAL is safe under WAL and skips an fsync per commit.
+- busy_timeout makes a blocked writer wait for the lock rather than fail
+  straight away with "database is locked".
+- mmap_size, cache_size and temp_store=MEMORY keep hot pages and
+  temporary sort/GROUP BY tables in memory.
+
+Transactions also start with BEGIN IMMEDIATE (settings.SQLITE_TRANSACTION_MODE)
+unless the database's OPTIONS choose a transaction_mode. A deferred
+transaction that reads and then writes can't wait for the write lock: SQLite
+fails it at once with "database is locked" whatever busy_timeout says.
+Taking the lock at BEGIN lets busy_timeout queue writers instead.
+
+journal_mode is stored in the database file; the others only affect the
+connection. PRAGMA optimize and WAL checkpoints are not run per connection;
+schedule the sqlite_maintenance command for them.
+"""
+import re
+
+from django.conf import settings
+
+
+# Values come from settings but are still checked before going into SQL
+_NAME = re.compile(r'^[a-z_]+$')
+_VALUE = re.compile(r'^(-?\d+|[A-Za-z_]+)$')
+
+
+def pragma_statements(pragmas):
+    statements = []
+    for name, value in pragmas.items():
+        if not _NAME.match(name) or not _VALUE.match(str(value)):
+            raise ValueError(f"Invalid SQLite PRAGMA {name}={value!r}")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if connection.vendor != 'sqlite':
+        return
+    # A database entry can override the profile, e.g. for a read-only replica
+    settings_dict = connection.settings_dict
+    transaction_mode = settings_dict.get('SQLITE_TRANSACTION_MODE', getattr(settings, 'SQLITE_TRANSACTION_MODE', None))
+    if transaction_mode and not settings_dict['OPTIONS'].get('transaction_mode'):
+        connection.transaction_mode = transaction_mode
+    pragmas = settings_dict.get('SQLITE_PRAGMAS', getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def current_pragmas(connection, names):
+    """Values the connection is actually using, for reporting"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            if _NAME.match(name):
+                cursor.execute(f'PRAGMA {name}')
+                row = cursor.fetchone()
+                values[name] = row[0] if row else None
+    return values
@@ -0,0 +1,131 @@
+"""
+Content-addressed media storage.
+
+Uploaded files are named after the SHA-256 of their content, so the same
+supplier photo uploaded for ten products is stored (and rendered) once.
+Because a name always means the same bytes, files can be served with
+far-future immutable cache headers.
+
+Files are shared, so nothing is deleted inline. release() marks files that
+may have lost their last reference, and sweep() deletes marked files that
+are still unreferenced and untouched for ORPHAN_GRACE seconds. Saving
+content that is already stored touches the file, so an upload of the same
+bytes in a transaction that hasn't committed yet keeps it alive.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import time
+
+from django.apps import apps
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.views.static import serve
+
+
+HASH_LENGTH = 32
+
+# products/<hash>.jpg, products/renditions/<hash>.webp, ...
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{%d}\.[a-z0-9]+$' % HASH_LENGTH)
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Released files are kept at least this long after they were last saved
+ORPHAN_GRACE = 24 * 60 * 60
+
+# One marker per released file, holding its name
+RELEASED_DIR = '.released'
+
+
+def content_hash(content):
+    """Hex digest used for names; content is bytes or a (Django) File"""
+    digest = hashlib.sha256()
+    if isinstance(content, bytes):
+        digest.update(content)
+    else:
+        if content.seekable():
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if content.seekable():
+            content.seek(0)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores <upload_to>/<content hash><ext>"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if isinstance(content, bytes):
+            content = ContentFile(content)
+        elif not hasattr(content, 'chunks'):
+            content = File(content, name)
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(posixpath.dirname(name), content_hash(content) + extension)
+        # Identical content is already stored under this name; touching it
+        # restarts the grace period in case it was released
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    def references(self, name):
+        """Number of rows, across every model, whose file fields point at name"""
+        total = 0
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if isinstance(field, models.FileField) and field.storage is self:
+                    total += model._base_manager.filter(**{field.name: name}).count()
+        return total
+
+    def release(self, *names):
+        """Mark files that may no longer be referenced, for sweep() to check"""
+        directory = self.path(RELEASED_DIR)
+        os.makedirs(directory, exist_ok=True)
+        for name in filter(None, set(names)):
+            marker = os.path.join(directory, content_hash(name.encode()))
+            with open(marker, 'w', encoding='utf-8') as handle:
+                handle.write(name)
+
+    def sweep(self, grace=ORPHAN_GRACE, in_use=None):
+        """
+        Delete released files that no row references and that haven't been
+        saved for grace seconds. in_use(name) can report references that
+        aren't file fields, such as rendition URLs. Returns the deleted names.
+        """
+        directory = self.path(RELEASED_DIR)
+        if not os.path.isdir(directory):
+            return []
+        cutoff = time.time() - grace
+        deleted = []
+        for entry in os.scandir(directory):
+            with open(entry.path, encoding='utf-8') as handle:
+                name = handle.read()
+            if self.exists(name):
+                if os.path.getmtime(self.path(name)) > cutoff:
+                    # Saved again recently; look at it on a later sweep
+                    continue
+                if self.references(name) == 0 and not (in_use and in_use(name)):
+                    self.delete(name)
+                    deleted.append(name)
+            os.remove(entry.path)
+        return deleted
+
+
+content_storage = ContentAddressedStorage()
+
+
+def get_content_storage():
+    return content_storage
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve, marking content-addressed files immutable"""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,33 @@
+"""
+Test runner that keeps the suite off the development cache.
+
+Test databases are created fresh for every run, but cache/shared.sqlite3
+outlives it, so cached query results, role versions and fragments from an
+earlier run would leak into the next. Each run gets SQLite cache files in
+a temporary directory instead.
+"""
+import copy
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp(prefix='inventory-pos-cache-')
+        caches = copy.deepcopy(settings.CACHES)
+        for alias, config in caches.items():
+            if config['BACKEND'] == 'inventory_pos.cache.SQLiteCache':
+                config['LOCATION'] = os.path.join(self._cache_dir, f'{alias}.sqlite3')
+        self._cache_settings = override_settings(CACHES=caches)
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
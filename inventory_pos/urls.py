@@ -14,11 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.shortcuts import redirect
+from inventory_pos.storage import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,8 +31,16 @@ urlpatterns = [
     path('pos/', include('pos.urls')),
 ]
 
+if settings.DEBUG or settings.SERVE_MEDIA:
+    # Content-addressed uploads are served with immutable cache headers
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            serve_media, {'document_root': settings.MEDIA_ROOT},
+        ),
+    ]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
     
     # Add django-browser-reload for development
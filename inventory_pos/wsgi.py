@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventory_pos.settings')
 
 application = get_wsgi_application()
+
+# Build every breadcrumb trail once, before the first request
+from inventory.templatetags.breadcrumbs import precompile  # noqa: E402
+
+precompile()
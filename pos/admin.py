@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Sale, SaleItem, Cart, PaymentRecord, Refund
+from .models import Terminal, Sale, SaleItem, Cart, PaymentRecord, Refund
 
 
 class SaleItemInline(admin.TabularInline):
@@ -13,10 +13,17 @@ class PaymentRecordInline(admin.TabularInline):
     extra = 0
 
 
+@admin.register(Terminal)
+class TerminalAdmin(admin.ModelAdmin):
+    list_display = ['name', 'code', 'location', 'is_active', 'created_at']
+    list_filter = ['location', 'is_active']
+    search_fields = ['name', 'code']
+
+
 @admin.register(Sale)
 class SaleAdmin(admin.ModelAdmin):
-    list_display = ['sale_number', 'cashier', 'total_amount', 'payment_method', 'status', 'created_at']
-    list_filter = ['status', 'payment_method', 'created_at', 'cashier']
+    list_display = ['sale_number', 'cashier', 'terminal', 'total_amount', 'payment_method', 'status', 'created_at']
+    list_filter = ['status', 'payment_method', 'terminal', 'created_at', 'cashier']
     search_fields = ['sale_number', 'cashier__username']
     readonly_fields = ['sale_number', 'change_amount', 'created_at', 'updated_at']
     inlines = [SaleItemInline, PaymentRecordInline]
@@ -24,7 +31,7 @@ class SaleAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Sale Information', {
-            'fields': ('sale_number', 'cashier', 'status', 'notes')
+            'fields': ('sale_number', 'cashier', 'terminal', 'status', 'notes')
         }),
         ('Amounts', {
             'fields': ('subtotal', 'tax_amount', 'discount_amount', 'total_amount')
@@ -41,7 +48,7 @@ class SaleAdmin(admin.ModelAdmin):
 
 @admin.register(SaleItem)
 class SaleItemAdmin(admin.ModelAdmin):
-    list_display = ['sale', 'product', 'quantity', 'unit_price', 'discount', 'line_total']
+    list_display = ['sale', 'product', 'quantity', 'unit_price', 'unit_cost', 'discount', 'line_total']
     list_filter = ['sale__created_at']
     search_fields = ['sale__sale_number', 'product__name']
     readonly_fields = ['line_total']
@@ -0,0 +1,198 @@
+"""
+Async versions of the POS JSON endpoints (search, cart and checkout).
+
+pos/urls.py serves these instead of the sync views when POS_ASYNC_VIEWS is
+on, which asgi.py turns on by default. They take the same requests and
+return the same JSON, parsed, validated and built by the helpers in
+pos/services.py. Every query uses the async ORM, so a worker doesn't
+tie up a thread per waiting cashier. The only code run through
+sync_to_async is the checkout transaction, because transaction.atomic
+doesn't work in async code, and CompanySettings.get_cached(), which is
+nearly always served from memory.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from accounts.models import SALES_ROLES, CompanySettings
+from accounts.roles import ahas_role, permission_denied
+from inventory.models import Location, Product, StockLevel
+from inventory.services import InsufficientStockError
+
+from .models import Cart, Terminal
+from .services import (
+    CartError, cart_summary, check_stock, parse_add_to_cart, parse_checkout, parse_remove_from_cart,
+    parse_update_cart, price_checkout, record_sale, sale_response, search_products, search_result,
+    stock_error,
+)
+from .views import TERMINAL_SESSION_KEY
+
+
+async def aget_terminal(request):
+    """get_terminal for async views"""
+    terminal_id = await request.session.aget(TERMINAL_SESSION_KEY)
+    if terminal_id:
+        return await Terminal.objects.select_related('location').filter(pk=terminal_id, is_active=True).afirst()
+    return None
+
+
+async def aget_sale_location(request):
+    """get_sale_location for async views"""
+    terminal = await aget_terminal(request)
+    return terminal.location if terminal else await Location.aget_default()
+
+
+async def aavailable_stock(product, location):
+    return await StockLevel.objects.filter(
+        product=product, location=location
+    ).values_list('quantity', flat=True).afirst() or 0
+
+
+async def acart_items(user):
+    return [item async for item in Cart.objects.filter(user=user).select_related('product')]
+
+
+class AsyncSalesView(View):
+    """Async counterpart of LoginRequiredMixin + RoleRequiredMixin for the POS endpoints"""
+
+    allowed_roles = SALES_ROLES
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # Resolved once here so handlers can use request.user without a sync query
+        request.user = user
+        if not await ahas_role(request, self.allowed_roles):
+            return permission_denied(request)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AddToCartView(AsyncSalesView):
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            product_id, quantity = parse_add_to_cart(request.body)
+            product = await Product.objects.filter(id=product_id, is_active=True).afirst()
+            if product is None:
+                raise CartError('Product not found')
+            available = await aavailable_stock(product, await aget_sale_location(request))
+            check_stock(available, quantity)
+
+            cart_item, created = await Cart.objects.aget_or_create(
+                user=request.user,
+                product=product,
+                defaults={'quantity': quantity}
+            )
+
+            if not created:
+                check_stock(available, cart_item.quantity + quantity)
+                cart_item.quantity += quantity
+                await cart_item.asave()
+        except CartError as e:
+            return JsonResponse(e.payload)
+
+        return JsonResponse({
+            'status': 'success',
+            'message': f'{product.name} added to cart',
+            **cart_summary(await acart_items(request.user))
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class UpdateCartView(AsyncSalesView):
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            cart_id, quantity = parse_update_cart(request.body)
+            cart_item = await Cart.objects.select_related('product').filter(id=cart_id, user=request.user).afirst()
+            if cart_item is None:
+                raise CartError('Cart item not found')
+
+            if quantity <= 0:
+                await cart_item.adelete()
+            else:
+                check_stock(await aavailable_stock(cart_item.product, await aget_sale_location(request)), quantity)
+                await Cart.objects.filter(pk=cart_item.pk).aupdate(quantity=quantity)
+        except CartError as e:
+            return JsonResponse(e.payload)
+
+        return JsonResponse({
+            'status': 'success',
+            **cart_summary(await acart_items(request.user))
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RemoveFromCartView(AsyncSalesView):
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            cart_id = parse_remove_from_cart(request.body)
+            cart_item = await Cart.objects.select_related('product').filter(id=cart_id, user=request.user).afirst()
+            if cart_item is None:
+                raise CartError('Cart item not found')
+        except CartError as e:
+            return JsonResponse(e.payload)
+
+        await cart_item.adelete()
+        return JsonResponse({
+            'status': 'success',
+            'message': f'{cart_item.product.name} removed from cart',
+            **cart_summary(await acart_items(request.user))
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ClearCartView(AsyncSalesView):
+
+    async def post(self, request, *args, **kwargs):
+        await Cart.objects.filter(user=request.user).adelete()
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Cart cleared',
+            **cart_summary([])
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CheckoutView(AsyncSalesView):
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            payment_method, amount_paid = parse_checkout(request.body)
+
+            cart_items = await acart_items(request.user)
+            if not cart_items:
+                raise CartError('Cart is empty')
+
+            company = await sync_to_async(CompanySettings.get_cached)()
+            amounts = price_checkout(cart_items, payment_method, amount_paid, company.currency_symbol)
+
+            # Stock comes off this lane's location only
+            terminal = await aget_terminal(request)
+            location = terminal.location if terminal else await Location.aget_default()
+
+            try:
+                # The transaction runs in the shared sync thread; see the module docstring
+                sale = await sync_to_async(record_sale)(
+                    request.user, terminal, location, cart_items, payment_method, amounts
+                )
+            except InsufficientStockError as e:
+                raise stock_error(cart_items, e)
+        except CartError as e:
+            return JsonResponse(e.payload)
+
+        return JsonResponse(sale_response(sale))
+
+
+class ProductSearchAPIView(AsyncSalesView):
+
+    async def get(self, request, *args, **kwargs):
+        products = Product.objects.with_stock_at(await aget_sale_location(request))
+        data = [search_result(p) async for p in search_products(products, request.GET.get('q', ''))]
+        return JsonResponse({'products': data})
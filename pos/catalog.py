@@ -0,0 +1,87 @@
+"""
+Product catalog snapshots for POS terminals.
+
+Terminals download the whole sellable catalog once, keep it in the
+browser, and then ask only for what changed since their version. The
+version is the newest CatalogSequence id: every product write stamps a new
+one on Product.catalog_version, every stock movement on the StockLevel rows
+it changes, and deletes and category changes insert one too, so it only
+ever grows.
+
+Versions are handed out when a write starts but seen when it commits, so a
+delta re-reads the last DELTA_OVERLAP versions before since. Terminals may
+get a few rows they already hold; they never miss a slow transaction.
+"""
+from django.db.models import Count, Q
+
+from inventory.models import CatalogSequence, Category, Product, StockLevel
+
+
+# Rows in "products" are lists in this order, to keep payloads small
+FIELDS = ['id', 'name', 'sku', 'barcode', 'price', 'stock', 'category', 'thumbnail']
+
+THUMBNAIL_SIZE = '64'
+
+# Versions re-read before since, to catch writes that committed late
+DELTA_OVERLAP = 200
+
+
+def catalog_state():
+    """(version, product_count) - cheap enough to compute for every ETag check"""
+    return CatalogSequence.current(), Product.all_objects.aggregate(count=Count('pk'))['count']
+
+
+def parse_since(value):
+    """Version from ?since=, or None for a full snapshot"""
+    try:
+        since = int(value)
+    except (TypeError, ValueError):
+        return None
+    return since if since > 0 else None
+
+
+def _row(values):
+    pk, name, sku, barcode, price, stock, category_id, renditions = values
+    thumbnail = (renditions or {}).get(THUMBNAIL_SIZE, {}).get('jpg')
+    return [pk, name, sku, barcode, str(price), stock, category_id, thumbnail]
+
+
+def build_catalog(location, since=None):
+    """
+    Catalog payload for a sales location.
+
+    With since, only products changed, or whose stock at location moved,
+    after that version (less DELTA_OVERLAP) are returned, and products
+    archived, deactivated or deleted meanwhile are listed in "removed".
+    "count" is the number of sellable products, so a client whose local
+    copy disagrees after applying a delta knows to reload in full. A since
+    ahead of the current version, e.g. a timestamp cached by an older
+    client, gets a full snapshot.
+    """
+    version, _ = catalog_state()
+    if since is not None and since > version:
+        since = None
+    columns = ('pk', 'name', 'sku', 'barcode', 'selling_price', 'location_stock', 'category_id', 'image_renditions')
+    sellable = Product.objects.filter(is_active=True)
+
+    if since is None:
+        rows = sellable.with_stock_at(location).order_by('pk').values_list(*columns)
+        removed = []
+    else:
+        floor = since - DELTA_OVERLAP
+        restocked = StockLevel.objects.filter(location=location, catalog_version__gt=floor).values('product_id')
+        changed = Product.all_objects.filter(Q(catalog_version__gt=floor) | Q(pk__in=restocked))
+        rows = changed.filter(is_active=True, is_deleted=False).with_stock_at(location).order_by('pk').values_list(*columns)
+        removed = list(changed.exclude(is_active=True, is_deleted=False).values_list('pk', flat=True))
+
+    return {
+        'version': version,
+        'since': since,
+        'full': since is None,
+        'location': location.pk,
+        'count': sellable.count(),
+        'fields': FIELDS,
+        'categories': dict(Category.objects.values_list('pk', 'name')),
+        'products': [_row(values) for values in rows],
+        'removed': removed,
+    }
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_product_deleted_at_product_deleted_by_and_more'),
+        ('pos', '0002_remove_sale_customer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleitem',
+            name='sale_date',
+            field=models.DateField(blank=True, help_text='Copy of the sale date so reports can aggregate without joining Sale', null=True),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Product cost price at the time of sale', max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale_date', 'product', 'quantity', 'unit_price', 'unit_cost', 'discount'], name='pos_saleitem_report_idx'),
+        ),
+    ]
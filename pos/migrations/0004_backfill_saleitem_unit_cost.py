@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:12
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import TruncDate
+
+
+def backfill_cost_and_date(apps, schema_editor):
+    """
+    Fill unit_cost and sale_date on historical sale items.
+
+    The cost at the time of sale was never recorded, so the product's current
+    cost price is the best available approximation for old rows.
+    """
+    SaleItem = apps.get_model('pos', 'SaleItem')
+    Sale = apps.get_model('pos', 'Sale')
+    Product = apps.get_model('inventory', 'Product')
+
+    SaleItem.objects.filter(unit_cost__isnull=True).update(
+        unit_cost=Subquery(
+            Product.objects.filter(pk=OuterRef('product_id')).values('cost_price')[:1]
+        )
+    )
+    SaleItem.objects.filter(sale_date__isnull=True).update(
+        sale_date=Subquery(
+            Sale.objects.filter(pk=OuterRef('sale_id'))
+            .annotate(day=TruncDate('created_at'))
+            .values('day')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0003_saleitem_unit_cost_sale_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_cost_and_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_location_stocklevel'),
+        ('pos', '0004_backfill_saleitem_unit_cost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Terminal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='terminals', to='inventory.location')),
+            ],
+            options={
+                'ordering': ['location__name', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='terminal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='pos.terminal'),
+        ),
+    ]
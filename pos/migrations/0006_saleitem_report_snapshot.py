@@ -0,0 +1,58 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_report_snapshot(apps, schema_editor):
+    """Copy status, cashier and category onto existing sale items"""
+    SaleItem = apps.get_model('pos', 'SaleItem')
+    Sale = apps.get_model('pos', 'Sale')
+    Product = apps.get_model('inventory', 'Product')
+
+    sale = Sale.objects.filter(pk=OuterRef('sale_id'))
+    SaleItem.objects.update(
+        sale_status=Subquery(sale.values('status')[:1]),
+        cashier_id=Subquery(sale.values('cashier_id')[:1]),
+        category_id=Subquery(
+            Product.objects.filter(pk=OuterRef('product_id')).values('category_id')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_content_addressed_images'),
+        ('pos', '0005_terminal'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='saleitem',
+            name='pos_saleitem_report_idx',
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='cashier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.category'),
+        ),
+        migrations.AddField(
+            model_name='saleitem',
+            name='sale_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('REFUNDED', 'Refunded')], default='PENDING', help_text='Copy of the sale status; kept in step by Sale.save()', max_length=20),
+        ),
+        migrations.RunPython(backfill_report_snapshot, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale_status', 'sale_date', 'category', 'cashier', 'quantity', 'unit_price', 'unit_cost', 'discount'], name='pos_saleitem_report_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pos', '0006_saleitem_report_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='saleitem',
+            name='sale_status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled'), ('REFUNDED', 'Refunded')], default='PENDING', help_text='Copy of the sale status; kept in step by Sale.save() and Sale.objects.update()', max_length=20),
+        ),
+    ]
@@ -1,10 +1,47 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from inventory.models import Product
+from inventory.models import Category, Product, Location
+from django.utils import timezone
 from decimal import Decimal
 
 
+class Terminal(models.Model):
+    """A checkout lane; sales rung up on it take stock from its location"""
+    name = models.CharField(max_length=50)
+    code = models.CharField(max_length=20, unique=True)
+    location = models.ForeignKey(Location, on_delete=models.PROTECT, related_name='terminals')
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['location__name', 'name']
+
+    def __str__(self):
+        return f"{self.name} ({self.location.name})"
+
+
+def copy_sale_status(sale_ids):
+    """Copy each sale's status onto its items' sale_status"""
+    status = models.Subquery(Sale.objects.filter(pk=models.OuterRef('sale_id')).values('status')[:1])
+    SaleItem.objects.filter(sale_id__in=sale_ids).exclude(
+        sale_status=models.F('sale__status')
+    ).update(sale_status=status)
+
+
+class SaleQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """update() that copies a status change onto the sales' items in the same transaction"""
+        if 'status' not in kwargs:
+            return super().update(**kwargs)
+        with transaction.atomic():
+            # Captured first, since the filter may not match once the status changes
+            sale_ids = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            copy_sale_status(sale_ids)
+        return rows
+
+
 class Sale(models.Model):
     PAYMENT_METHODS = [
         ('CASH', 'Cash'),
@@ -22,6 +59,7 @@ class Sale(models.Model):
 
     sale_number = models.CharField(max_length=20, unique=True)
     cashier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sales')
+    terminal = models.ForeignKey(Terminal, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
     
     # Amounts
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -40,6 +78,8 @@ class Sale(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SaleQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
 
@@ -63,7 +103,13 @@ class Sale(models.Model):
         # Calculate change
         self.change_amount = self.amount_paid - self.total_amount
         
-        super().save(*args, **kwargs)
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Keep the status copied onto the items in step for the reports
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            copy_sale_status([self.pk])
 
 
 class SaleItem(models.Model):
@@ -71,10 +117,45 @@ class SaleItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    unit_cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Product cost price at the time of sale"
+    )
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    sale_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Copy of the sale date so reports can aggregate without joining Sale"
+    )
+    # Copies of the sale's status and cashier and the product's category at
+    # the time of sale, so gross-profit reports read this table alone.
+    # sale_status must always equal sale.status: change a status only with
+    # Sale.save() or Sale.objects...update(), which both copy it here.
+    # Raw SQL or _base_manager updates would leave the reports stale.
+    sale_status = models.CharField(
+        max_length=20,
+        choices=Sale.STATUS_CHOICES,
+        default='PENDING',
+        help_text="Copy of the sale status; kept in step by Sale.save() and Sale.objects.update()"
+    )
+    cashier = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     
     class Meta:
         unique_together = ['sale', 'product']
+        indexes = [
+            # Covering index for gross-profit reports by day, category or cashier
+            models.Index(
+                fields=[
+                    'sale_status', 'sale_date', 'category', 'cashier',
+                    'quantity', 'unit_price', 'unit_cost', 'discount',
+                ],
+                name='pos_saleitem_report_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
@@ -83,10 +164,27 @@ class SaleItem(models.Model):
     def line_total(self):
         return (self.unit_price * self.quantity) - self.discount
 
+    @property
+    def line_cost(self):
+        return (self.unit_cost or 0) * self.quantity
+
+    @property
+    def gross_profit(self):
+        return self.line_total - self.line_cost
+
     def save(self, *args, **kwargs):
         # Set unit price from product if not provided
         if not self.unit_price:
             self.unit_price = self.product.selling_price
+        # Snapshot the cost so later cost changes don't rewrite history
+        if self.unit_cost is None:
+            self.unit_cost = self.product.cost_price
+        if self.sale_date is None:
+            self.sale_date = timezone.localdate(self.sale.created_at)
+        if self._state.adding:
+            self.sale_status = self.sale.status
+            self.cashier_id = self.sale.cashier_id
+            self.category_id = self.product.category_id
         super().save(*args, **kwargs)
 
 
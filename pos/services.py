@@ -0,0 +1,237 @@
+"""
+Cart, search and checkout logic shared by the sync views and their async
+versions. The views only look rows up; parsing, validation and the JSON
+they send back live here.
+"""
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import CompanySettings
+from inventory.models import StockMovement
+from inventory.services import apply_movements
+
+from .models import Cart, Sale, SaleItem
+
+
+TAX_RATE = Decimal('0.1')
+
+
+class CartError(Exception):
+    """The request can't be carried out; payload is the JSON error response"""
+
+    def __init__(self, message, **extra):
+        super().__init__(message)
+        self.payload = {'status': 'error', 'message': message, **extra}
+
+
+class PaymentError(CartError):
+    """Payment can't be accepted"""
+
+
+def read_request(body):
+    """The JSON object a POS endpoint was posted; raises CartError"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        raise CartError('Invalid request format', error_type='request_error')
+    return data
+
+
+def _whole_number(value, message):
+    # bool is an int, but never a quantity or an id
+    if isinstance(value, bool):
+        raise CartError(message)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CartError(message)
+
+
+def parse_add_to_cart(body):
+    """(product_id, quantity) from an add-to-cart request; raises CartError"""
+    data = read_request(body)
+    product_id = _whole_number(data.get('product_id'), 'Invalid product')
+    quantity = _whole_number(data.get('quantity', 1), 'Invalid quantity')
+    if quantity < 1:
+        raise CartError('Quantity must be at least 1')
+    return product_id, quantity
+
+
+def parse_update_cart(body):
+    """(cart_id, quantity) from an update-cart request; 0 or less removes the item"""
+    data = read_request(body)
+    return (
+        _whole_number(data.get('cart_id'), 'Invalid cart item'),
+        _whole_number(data.get('quantity'), 'Invalid quantity'),
+    )
+
+
+def parse_remove_from_cart(body):
+    """cart_id from a remove-from-cart request; raises CartError"""
+    return _whole_number(read_request(body).get('cart_id'), 'Invalid cart item')
+
+
+def check_stock(available, quantity):
+    """Raises CartError if quantity is more than the location has"""
+    if available < quantity:
+        raise CartError(f'Insufficient stock. Only {available} available.')
+
+
+def parse_checkout(body):
+    """(payment_method, amount_paid) from a checkout request; raises CartError"""
+    data = read_request(body)
+    payment_method = data.get('payment_method')
+    if not isinstance(payment_method, str) or payment_method.upper() not in dict(Sale.PAYMENT_METHODS):
+        raise CartError('Choose a payment method', error_type='validation_error')
+    try:
+        amount_paid = Decimal(str(data.get('amount_paid', 0)))
+    except InvalidOperation:
+        amount_paid = None
+    if amount_paid is None or not amount_paid.is_finite():
+        raise CartError('Invalid payment amount or data format', error_type='validation_error')
+    return payment_method, amount_paid
+
+
+def cart_summary(cart_items):
+    """Cart totals in the shape the POS JavaScript expects"""
+    cart_total = sum(item.quantity * item.product.selling_price for item in cart_items)
+    cart_tax = cart_total * TAX_RATE
+    return {
+        'cart_count': sum(item.quantity for item in cart_items),
+        'cart_total': float(cart_total),
+        'cart_tax': float(cart_tax),
+        'cart_final_total': float(cart_total + cart_tax),
+    }
+
+
+def price_checkout(cart_items, payment_method, amount_paid, currency_symbol=None):
+    """
+    (subtotal, tax_amount, total_amount, amount_paid, change_amount); raises
+    PaymentError. Async callers pass currency_symbol, since looking it up
+    may query the database.
+    """
+    subtotal = sum(item.quantity * item.product.selling_price for item in cart_items)
+    tax_amount = subtotal * TAX_RATE
+    total_amount = subtotal + tax_amount
+
+    if payment_method.lower() == 'cash':
+        if amount_paid <= 0:
+            raise PaymentError('Please enter a valid cash amount', error_type='invalid_amount')
+        if amount_paid < total_amount:
+            shortage = total_amount - amount_paid
+            currency = currency_symbol or CompanySettings.get_cached().currency_symbol
+            raise PaymentError(
+                f'Insufficient cash payment. Short by {currency}{shortage:.2f}',
+                error_type='insufficient_cash',
+                details={
+                    'total_required': float(total_amount),
+                    'amount_given': float(amount_paid),
+                    'shortage': float(shortage)
+                }
+            )
+    elif payment_method.lower() in ['card', 'mobile', 'check']:
+        # For non-cash payments, amount should equal total
+        amount_paid = total_amount
+
+    change_amount = amount_paid - total_amount if payment_method.lower() == 'cash' else Decimal('0')
+    return subtotal, tax_amount, total_amount, amount_paid, change_amount
+
+
+def record_sale(user, terminal, location, cart_items, payment_method, amounts):
+    """
+    Create the sale with its items, take the stock off location and empty
+    the cart, all in one transaction. Raises InsufficientStockError.
+    """
+    subtotal, tax_amount, total_amount, amount_paid, change_amount = amounts
+    with transaction.atomic():
+        sale = Sale.objects.create(
+            cashier=user,
+            terminal=terminal,
+            subtotal=subtotal,
+            tax_amount=tax_amount,
+            total_amount=total_amount,
+            payment_method=payment_method.upper(),  # Convert to uppercase to match model choices
+            amount_paid=amount_paid,
+            change_amount=change_amount,
+            status='COMPLETED'  # Use uppercase to match model choices
+        )
+
+        # Create sale items and record stock movements in bulk;
+        # the stock service locks and decrements the local stock level
+        sale_items = []
+        movements = []
+        for cart_item in cart_items:
+            sale_items.append(SaleItem(
+                sale=sale,
+                product=cart_item.product,
+                quantity=cart_item.quantity,
+                unit_price=cart_item.product.selling_price,
+                unit_cost=cart_item.product.cost_price,
+                sale_date=timezone.localdate(sale.created_at),
+                sale_status=sale.status,
+                cashier=user,
+                category_id=cart_item.product.category_id
+            ))
+            movements.append(StockMovement(
+                product=cart_item.product,
+                location=location,
+                movement_type='SALE',  # Use SALE for sales transactions
+                quantity=cart_item.quantity,
+                reason='sale',
+                reference=sale.sale_number,
+                user=user
+            ))
+
+        apply_movements(movements)
+        SaleItem.objects.bulk_create(sale_items)
+
+        # Clear cart
+        Cart.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+    return sale
+
+
+def stock_error(cart_items, error):
+    """CartError naming the product an InsufficientStockError from record_sale is about"""
+    product = next(item.product for item in cart_items if item.product_id == error.product_id)
+    return CartError(f'Insufficient stock for {product.name}', error_type='insufficient_stock')
+
+
+def sale_response(sale):
+    """What a successful checkout returns"""
+    return {
+        'status': 'success',
+        'message': 'Sale completed successfully',
+        'sale_id': sale.id,
+        'sale_number': sale.sale_number,
+        'total_amount': float(sale.total_amount),
+        'change_amount': float(sale.change_amount)
+    }
+
+
+def search_products(products, query):
+    """The first ten in-stock matches for query; products is annotated with_stock_at()"""
+    return products.filter(
+        Q(name__icontains=query) | Q(sku__icontains=query) | Q(barcode__icontains=query),
+        is_active=True,
+        location_stock__gt=0
+    ).select_related('category')[:10]
+
+
+def search_result(product):
+    """One product in the search API response"""
+    return {
+        'id': product.id,
+        'name': product.name,
+        'sku': product.sku,
+        'barcode': product.barcode,
+        'price': str(product.selling_price),
+        'stock': product.location_stock,
+        'category': product.category.name if product.category else 'Uncategorized',
+        'image': product.rendition_url(64) if product.image else None
+    }
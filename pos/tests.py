@@ -1,3 +1,296 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from inventory.models import Category, Location, Product, StockLevel
+from inventory.services import apply_movement
+from inventory.tests import RenderBudgetMixin
+from . import async_views, catalog
+from .catalog import FIELDS, build_catalog, catalog_state
+from .models import Cart, Sale, SaleItem
+
+
+# The async endpoints, routed whatever POS_ASYNC_VIEWS says (see AsyncEndpointTests)
+urlpatterns = [
+    path('pos/add-to-cart/', async_views.AddToCartView.as_view()),
+    path('pos/update-cart/', async_views.UpdateCartView.as_view()),
+    path('pos/checkout/', async_views.CheckoutView.as_view()),
+    path('pos/api/search/', async_views.ProductSearchAPIView.as_view()),
+]
+
+
+class GrossProfitReportTests(TestCase):
+    # The report reads through the replica router, which checks the mirror's health
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.drinks = Category.objects.create(name='Drinks')
+        cls.snacks = Category.objects.create(name='Snacks')
+        cls.cola = Product.objects.create(
+            name='Cola', category=cls.drinks, cost_price=Decimal('1.00'), selling_price=Decimal('2.50')
+        )
+        cls.chips = Product.objects.create(
+            name='Chips', category=cls.snacks, cost_price=Decimal('0.50'), selling_price=Decimal('1.00')
+        )
+        cls.sale = cls.make_sale('COMPLETED', [(cls.cola, 4), (cls.chips, 2)])
+        cls.cancelled = cls.make_sale('CANCELLED', [(cls.cola, 10)])
+
+    @classmethod
+    def make_sale(cls, status, lines):
+        sale = Sale.objects.create(
+            cashier=cls.admin, total_amount=Decimal('0'), amount_paid=Decimal('0'), status=status
+        )
+        for product, quantity in lines:
+            SaleItem.objects.create(sale=sale, product=product, quantity=quantity)
+        return sale
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def report(self, group_by):
+        start = timezone.localdate().isoformat()
+        response = self.client.get(reverse('pos:gross_profit_report'), {'group_by': group_by, 'start': start})
+        self.assertEqual(response.status_code, 200)
+        return response.context['report']
+
+    def test_items_copy_sale_status_cashier_and_category(self):
+        item = SaleItem.objects.get(sale=self.sale, product=self.cola)
+        self.assertEqual(item.sale_status, 'COMPLETED')
+        self.assertEqual(item.cashier_id, self.admin.pk)
+        self.assertEqual(item.category_id, self.drinks.pk)
+
+        self.sale.status = 'REFUNDED'
+        self.sale.save()
+        self.assertEqual(set(self.sale.items.values_list('sale_status', flat=True)), {'REFUNDED'})
+
+    def test_queryset_status_updates_reach_the_items(self):
+        self.assertEqual(Sale.objects.filter(status='COMPLETED').update(status='REFUNDED'), 1)
+        self.assertEqual(set(self.sale.items.values_list('sale_status', flat=True)), {'REFUNDED'})
+        self.assertEqual(set(self.cancelled.items.values_list('sale_status', flat=True)), {'CANCELLED'})
+        self.assertEqual(self.report('category'), [])
+
+    def test_groupings_exclude_incomplete_sales(self):
+        by_category = {row['label']: row for row in self.report('category')}
+        self.assertEqual(by_category['Drinks']['items_sold'], 4)
+        self.assertEqual(by_category['Drinks']['gross_profit'], Decimal('6.00'))
+        self.assertEqual(by_category['Snacks']['revenue'], Decimal('2.00'))
+
+        by_cashier = self.report('cashier')
+        self.assertEqual([row['label'] for row in by_cashier], ['admin'])
+        self.assertEqual(by_cashier[0]['items_sold'], 6)
+
+        by_day = self.report('day')
+        self.assertEqual(len(by_day), 1)
+        self.assertEqual(by_day[0]['cost'], Decimal('5.00'))
+
+    def test_aggregate_reads_only_the_sale_item_table(self):
+        for group_by in ('day', 'category', 'cashier'):
+            with CaptureQueriesContext(connection) as queries:
+                self.report(group_by)
+            aggregate = next(q['sql'] for q in queries.captured_queries if 'SUM(' in q['sql'])
+            self.assertNotIn('JOIN', aggregate, group_by)
+
+
+class CatalogVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.location = Location.get_default()
+        cls.drinks = Category.objects.create(name='Drinks')
+        cls.cola, cls.water = [
+            Product.objects.create(
+                name=name, category=cls.drinks, cost_price=Decimal('1.00'), selling_price=Decimal('2.00')
+            )
+            for name in ('Cola', 'Water')
+        ]
+
+    def test_version_never_goes_backwards(self):
+        versions = [catalog_state()[0]]
+        newest = Product.objects.create(
+            name='Juice', category=self.drinks, cost_price=Decimal('1.00'), selling_price=Decimal('2.00')
+        )
+        versions.append(catalog_state()[0])
+        newest.hard_delete()
+        versions.append(catalog_state()[0])
+        self.drinks.delete()
+        versions.append(catalog_state()[0])
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_delta_has_only_rows_written_after_since(self):
+        since = catalog_state()[0]
+        with mock.patch.object(catalog, 'DELTA_OVERLAP', 0):
+            self.assertEqual(build_catalog(self.location, since)['products'], [])
+
+            Product.objects.filter(pk=self.cola.pk).update(selling_price=Decimal('2.50'))
+            self.water.soft_delete()
+            delta = build_catalog(self.location, since)
+        self.assertFalse(delta['full'])
+        self.assertEqual([row[0] for row in delta['products']], [self.cola.pk])
+        self.assertEqual(delta['removed'], [self.water.pk])
+        self.assertGreater(delta['version'], since)
+
+    def test_delta_includes_writes_that_committed_after_since(self):
+        since = catalog_state()[0]
+        # A version taken before since, by a transaction still open at the time
+        Product.objects.filter(pk=self.cola.pk).update(selling_price=Decimal('2.50'), catalog_version=since - 1)
+        delta = build_catalog(self.location, since)
+        self.assertIn(self.cola.pk, [row[0] for row in delta['products']])
+
+    def test_delta_includes_stock_moved_at_the_location(self):
+        since = catalog_state()[0]
+        user = User.objects.create_user('cashier')
+        with mock.patch.object(catalog, 'DELTA_OVERLAP', 0):
+            self.assertEqual(build_catalog(self.location, since)['products'], [])
+            apply_movement(self.water, 'IN', 5, user)
+            delta = build_catalog(self.location, since)
+        self.assertEqual([row[0] for row in delta['products']], [self.water.pk])
+        self.assertEqual(delta['products'][0][FIELDS.index('stock')], 5)
+
+    def test_since_ahead_of_the_version_gets_a_full_snapshot(self):
+        catalog = build_catalog(self.location, since=1_700_000_000_000)
+        self.assertTrue(catalog['full'])
+        self.assertEqual(len(catalog['products']), 2)
+
+
+class PageBudgetTests(RenderBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        drinks = Category.objects.create(name='Drinks')
+        products = [
+            Product.objects.create(
+                name=f'Product {number:02}', category=drinks, stock_quantity=10,
+                cost_price=Decimal('1.00'), selling_price=Decimal('2.00'),
+            )
+            for number in range(30)
+        ]
+        cls.sale = Sale.objects.create(
+            cashier=cls.admin, total_amount=Decimal('0'), amount_paid=Decimal('0'), status='COMPLETED'
+        )
+        for product in products[:10]:
+            SaleItem.objects.create(sale=cls.sale, product=product, quantity=2)
+            Cart.objects.create(user=cls.admin, product=product, quantity=1)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_pos_screen(self):
+        response = self.assertRenders(reverse('pos:pos'), 7)
+        self.assertEqual(len(response.context['products']), 20)
+
+    def test_receipt(self):
+        self.assertRenders(reverse('pos:receipt', args=[self.sale.pk]), 4)
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncEndpointTests(TestCase):
+    """The views asgi.py serves; the test settings leave POS_ASYNC_VIEWS off"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cashier = User.objects.create_superuser('cashier', 'cashier@example.com', 'x')
+        cls.location = Location.get_default()
+        drinks = Category.objects.create(name='Drinks')
+        cls.cola, cls.water = [
+            Product.objects.create(
+                name=name, category=drinks, cost_price=Decimal('1.00'), selling_price=Decimal('2.00')
+            )
+            for name in ('Cola', 'Water')
+        ]
+        apply_movement(cls.cola, 'IN', 5, cls.cashier)
+
+    def setUp(self):
+        self.async_client.force_login(self.cashier)
+
+    async def post(self, url, data):
+        response = await self.async_client.post(url, data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def stock(self, product):
+        return await StockLevel.objects.filter(
+            product=product, location=self.location
+        ).values_list('quantity', flat=True).aget()
+
+    async def test_add_to_cart(self):
+        result = await self.post('/pos/add-to-cart/', {'product_id': self.cola.pk, 'quantity': 2})
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['cart_count'], 2)
+        self.assertEqual(result['cart_final_total'], 4.4)
+
+        result = await self.post('/pos/add-to-cart/', {'product_id': self.cola.pk, 'quantity': 4})
+        self.assertEqual(result, {'status': 'error', 'message': 'Insufficient stock. Only 5 available.'})
+        self.assertEqual(await Cart.objects.filter(user=self.cashier).values_list('quantity', flat=True).aget(), 2)
+
+    async def test_add_to_cart_rejects_bad_requests(self):
+        for data, message in [
+            ('{', 'Invalid request format'),
+            ({'product_id': self.cola.pk, 'quantity': 'two'}, 'Invalid quantity'),
+            ({'product_id': self.cola.pk, 'quantity': 0}, 'Quantity must be at least 1'),
+            ({'product_id': self.water.pk + 100}, 'Product not found'),
+        ]:
+            result = await self.post('/pos/add-to-cart/', data)
+            self.assertEqual((result['status'], result['message']), ('error', message))
+        self.assertFalse(await Cart.objects.aexists())
+
+    async def test_update_cart(self):
+        item = await Cart.objects.acreate(user=self.cashier, product=self.cola, quantity=1)
+
+        result = await self.post('/pos/update-cart/', {'cart_id': item.pk, 'quantity': 3})
+        self.assertEqual((result['status'], result['cart_count']), ('success', 3))
+
+        result = await self.post('/pos/update-cart/', {'cart_id': item.pk, 'quantity': 6})
+        self.assertEqual(result, {'status': 'error', 'message': 'Insufficient stock. Only 5 available.'})
+
+        result = await self.post('/pos/update-cart/', {'cart_id': item.pk, 'quantity': 0})
+        self.assertEqual((result['status'], result['cart_count']), ('success', 0))
+        self.assertFalse(await Cart.objects.aexists())
+
+    async def test_search_lists_only_products_in_stock_here(self):
+        response = await self.async_client.get('/pos/api/search/', {'q': ''})
+        products = response.json()['products']
+        self.assertEqual([(p['id'], p['stock'], p['category']) for p in products], [(self.cola.pk, 5, 'Drinks')])
+
+        response = await self.async_client.get('/pos/api/search/', {'q': 'wat'})
+        self.assertEqual(response.json()['products'], [])
+
+    async def test_checkout(self):
+        await Cart.objects.acreate(user=self.cashier, product=self.cola, quantity=2)
+
+        result = await self.post('/pos/checkout/', {'payment_method': 'cash', 'amount_paid': '10'})
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual((result['total_amount'], result['change_amount']), (4.4, 5.6))
+        sale = await Sale.objects.aget(pk=result['sale_id'])
+        self.assertEqual((sale.payment_method, sale.status), ('CASH', 'COMPLETED'))
+        self.assertEqual(await self.stock(self.cola), 3)
+        self.assertFalse(await Cart.objects.aexists())
+
+    async def test_checkout_with_insufficient_stock_keeps_the_cart(self):
+        # Added while the stock was there; another lane sold it since
+        await Cart.objects.acreate(user=self.cashier, product=self.cola, quantity=6)
+
+        result = await self.post('/pos/checkout/', {'payment_method': 'card'})
+        self.assertEqual(result, {
+            'status': 'error', 'message': 'Insufficient stock for Cola', 'error_type': 'insufficient_stock'
+        })
+        self.assertFalse(await Sale.objects.aexists())
+        self.assertEqual(await self.stock(self.cola), 5)
+        self.assertEqual(await Cart.objects.acount(), 1)
+
+    async def test_checkout_rejects_bad_payments(self):
+        await Cart.objects.acreate(user=self.cashier, product=self.cola, quantity=2)
+        for data, error_type in [
+            ({'amount_paid': '10'}, 'validation_error'),
+            ({'payment_method': 'cash', 'amount_paid': 'ten'}, 'validation_error'),
+            ({'payment_method': 'cash', 'amount_paid': '4'}, 'insufficient_cash'),
+        ]:
+            result = await self.post('/pos/checkout/', data)
+            self.assertEqual((result['status'], result['error_type']), ('error', error_type))
+        self.assertFalse(await Sale.objects.aexists())
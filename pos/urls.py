@@ -1,22 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# JSON endpoints with an async version served under ASGI
+api = async_views if settings.POS_ASYNC_VIEWS else views
 
 app_name = 'pos'
 
 urlpatterns = [
     # Point of Sale
     path('', views.POSView.as_view(), name='pos'),
-    path('add-to-cart/', views.AddToCartView.as_view(), name='add_to_cart'),
-    path('update-cart/', views.UpdateCartView.as_view(), name='update_cart'),
-    path('remove-from-cart/', views.RemoveFromCartView.as_view(), name='remove_from_cart'),
-    path('clear-cart/', views.ClearCartView.as_view(), name='clear_cart'),
-    path('checkout/', views.CheckoutView.as_view(), name='checkout'),
+    path('terminal/', views.select_terminal, name='select_terminal'),
+    path('add-to-cart/', api.AddToCartView.as_view(), name='add_to_cart'),
+    path('update-cart/', api.UpdateCartView.as_view(), name='update_cart'),
+    path('remove-from-cart/', api.RemoveFromCartView.as_view(), name='remove_from_cart'),
+    path('clear-cart/', api.ClearCartView.as_view(), name='clear_cart'),
+    path('checkout/', api.CheckoutView.as_view(), name='checkout'),
     
     # Sales Management
     path('sales/', views.SaleListView.as_view(), name='sale_list'),
     path('sales/<int:pk>/', views.SaleDetailView.as_view(), name='sale_detail'),
     path('receipt/<int:pk>/', views.ReceiptView.as_view(), name='receipt'),
     
+    # Reports
+    path('reports/gross-profit/', views.GrossProfitReportView.as_view(), name='gross_profit_report'),
+    
     # API endpoints for AJAX
-    path('api/search/', views.ProductSearchAPIView.as_view(), name='product_search_api'),
+    path('api/search/', api.ProductSearchAPIView.as_view(), name='product_search_api'),
+    path('api/catalog/', views.CatalogAPIView.as_view(), name='catalog_api'),
 ]
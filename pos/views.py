@@ -2,31 +2,73 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.views.generic import TemplateView, ListView, DetailView
+from django.contrib.auth.models import User
+from django.views.generic import TemplateView, ListView, DetailView, View
 from django.http import JsonResponse
-from django.db.models import Q, Sum, Count, F
-from django.views.decorators.http import require_POST
+from django.db.models import Q, Sum, Count, F, DecimalField, ExpressionWrapper, Prefetch
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.db import transaction
+from django.utils import timezone
 from decimal import Decimal
-import json
-from datetime import datetime, date
-from inventory.models import Product, StockMovement, Category
-from .models import Sale, SaleItem, Cart
+from datetime import datetime, date, timedelta
+from inventory.models import Product, StockLevel, Category, Location
+from inventory.services import InsufficientStockError
+from accounts.models import ADMIN_ROLES, SALES_ROLES
+from accounts.roles import RoleRequiredMixin, role_required
+from inventory_pos.replica import ReplicaReadMixin, use_replica
+from .catalog import build_catalog, catalog_state, parse_since
+from .models import Terminal, Sale, SaleItem, Cart
+from .services import (
+    CartError, cart_summary, check_stock, parse_add_to_cart, parse_checkout, parse_remove_from_cart,
+    parse_update_cart, price_checkout, record_sale, sale_response, search_products, search_result,
+    stock_error,
+)
 
 
-class POSView(LoginRequiredMixin, TemplateView):
+TERMINAL_SESSION_KEY = 'pos_terminal_id'
+
+
+def get_terminal(request):
+    """The terminal chosen for this browser session, if any"""
+    terminal_id = request.session.get(TERMINAL_SESSION_KEY)
+    if terminal_id:
+        return Terminal.objects.select_related('location').filter(pk=terminal_id, is_active=True).first()
+    return None
+
+
+def get_sale_location(request):
+    """Where sales from this session take stock from"""
+    terminal = get_terminal(request)
+    return terminal.location if terminal else Location.get_default()
+
+
+def available_stock(product, location):
+    return StockLevel.objects.filter(
+        product=product, location=location
+    ).values_list('quantity', flat=True).first() or 0
+
+
+class POSView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
     template_name = 'pos/pos.html'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
+        # Products in stock at this terminal's location
+        terminal = get_terminal(self.request)
+        location = terminal.location if terminal else Location.get_default()
+        context['terminal'] = terminal
+        context['location'] = location
+        context['terminals'] = Terminal.objects.filter(is_active=True).select_related('location')
+        
         # Optimized queries with select_related and prefetch_related
         context['cart_items'] = Cart.objects.filter(user=self.request.user).select_related('product__category')
-        context['products'] = Product.objects.filter(
+        context['products'] = Product.objects.with_stock_at(location).filter(
             is_active=True, 
-            stock_quantity__gt=0
+            location_stock__gt=0
         ).select_related('category').order_by('name')[:20]
         context['categories'] = Category.objects.all().order_by('name')
         
@@ -43,21 +85,33 @@ class POSView(LoginRequiredMixin, TemplateView):
         return context
 
 
+@login_required
+@role_required(*SALES_ROLES)
+@require_POST
+def select_terminal(request):
+    """Choose which terminal (and so which location) this session sells from"""
+    terminal_id = request.POST.get('terminal_id')
+    if terminal_id:
+        terminal = get_object_or_404(Terminal, pk=terminal_id, is_active=True)
+        request.session[TERMINAL_SESSION_KEY] = terminal.pk
+        messages.success(request, f'Now selling from {terminal}.')
+    else:
+        request.session.pop(TERMINAL_SESSION_KEY, None)
+    return redirect('pos:pos')
+
+
 @method_decorator(csrf_exempt, name='dispatch')
-class AddToCartView(LoginRequiredMixin, TemplateView):
+class AddToCartView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
+
     def post(self, request, *args, **kwargs):
         try:
-            data = json.loads(request.body)
-            product_id = data.get('product_id')
-            quantity = int(data.get('quantity', 1))
-            
-            product = get_object_or_404(Product, id=product_id, is_active=True)
-            
-            if product.stock_quantity < quantity:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': f'Insufficient stock. Only {product.stock_quantity} available.'
-                })
+            product_id, quantity = parse_add_to_cart(request.body)
+            product = Product.objects.filter(id=product_id, is_active=True).first()
+            if product is None:
+                raise CartError('Product not found')
+            available = available_stock(product, get_sale_location(request))
+            check_stock(available, quantity)
             
             # Get or create cart item
             cart_item, created = Cart.objects.get_or_create(
@@ -67,273 +121,109 @@ class AddToCartView(LoginRequiredMixin, TemplateView):
             )
             
             if not created:
-                new_quantity = cart_item.quantity + quantity
-                if product.stock_quantity < new_quantity:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': f'Insufficient stock. Only {product.stock_quantity} available.'
-                    })
-                cart_item.quantity = new_quantity
+                check_stock(available, cart_item.quantity + quantity)
+                cart_item.quantity += quantity
                 cart_item.save()
-            
-            # Calculate new cart totals
-            cart_items = Cart.objects.filter(user=request.user).select_related('product')
-            cart_total = sum(item.quantity * item.product.selling_price for item in cart_items)
-            cart_count = sum(item.quantity for item in cart_items)
-            cart_tax = cart_total * Decimal('0.1')
-            cart_final_total = cart_total + cart_tax
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': f'{product.name} added to cart',
-                'cart_count': cart_count,
-                'cart_total': float(cart_total),
-                'cart_tax': float(cart_tax),
-                'cart_final_total': float(cart_final_total)
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e)
-            })
+        except CartError as e:
+            return JsonResponse(e.payload)
+        
+        return JsonResponse({
+            'status': 'success',
+            'message': f'{product.name} added to cart',
+            **cart_summary(Cart.objects.filter(user=request.user).select_related('product'))
+        })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class UpdateCartView(LoginRequiredMixin, TemplateView):
+class UpdateCartView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
+
     def post(self, request, *args, **kwargs):
         try:
-            data = json.loads(request.body)
-            cart_id = data.get('cart_id')
-            quantity = int(data.get('quantity'))
-            
-            print(f"UpdateCartView: cart_id={cart_id}, quantity={quantity}")  # Debug log
-            
-            cart_item = get_object_or_404(Cart, id=cart_id, user=request.user)
+            cart_id, quantity = parse_update_cart(request.body)
+            cart_item = Cart.objects.select_related('product').filter(id=cart_id, user=request.user).first()
+            if cart_item is None:
+                raise CartError('Cart item not found')
             
             if quantity <= 0:
-                print(f"Deleting cart item {cart_id} (quantity={quantity})")
                 cart_item.delete()
             else:
-                if cart_item.product.stock_quantity < quantity:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': f'Insufficient stock. Only {cart_item.product.stock_quantity} available.'
-                    })
-                print(f"Updating cart item {cart_id} quantity to {quantity}")
+                check_stock(available_stock(cart_item.product, get_sale_location(request)), quantity)
                 cart_item.quantity = quantity
                 cart_item.save()
-            
-            # Calculate new cart totals
-            cart_items = Cart.objects.filter(user=request.user).select_related('product')
-            cart_total = sum(item.quantity * item.product.selling_price for item in cart_items)
-            cart_count = sum(item.quantity for item in cart_items)
-            cart_tax = cart_total * Decimal('0.1')
-            cart_final_total = cart_total + cart_tax
-            
-            print(f"Cart updated - total: {cart_total}, count: {cart_count}")  # Debug log
-            
-            return JsonResponse({
-                'status': 'success',
-                'cart_count': cart_count,
-                'cart_total': float(cart_total),
-                'cart_tax': float(cart_tax),
-                'cart_final_total': float(cart_final_total)
-            })
-            
-        except Exception as e:
-            print(f"Error in UpdateCartView: {str(e)}")  # Debug log
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e)
-            })
+        except CartError as e:
+            return JsonResponse(e.payload)
+        
+        return JsonResponse({
+            'status': 'success',
+            **cart_summary(Cart.objects.filter(user=request.user).select_related('product'))
+        })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class RemoveFromCartView(LoginRequiredMixin, TemplateView):
+class RemoveFromCartView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
+
     def post(self, request, *args, **kwargs):
         try:
-            data = json.loads(request.body)
-            cart_id = data.get('cart_id')
-            
-            cart_item = get_object_or_404(Cart, id=cart_id, user=request.user)
-            product_name = cart_item.product.name
-            cart_item.delete()
-            
-            # Calculate new cart totals
-            cart_items = Cart.objects.filter(user=request.user).select_related('product')
-            cart_total = sum(item.quantity * item.product.selling_price for item in cart_items)
-            cart_count = sum(item.quantity for item in cart_items)
-            cart_tax = cart_total * Decimal('0.1')
-            cart_final_total = cart_total + cart_tax
-            
-            return JsonResponse({
-                'status': 'success',
-                'message': f'{product_name} removed from cart',
-                'cart_count': cart_count,
-                'cart_total': float(cart_total),
-                'cart_tax': float(cart_tax),
-                'cart_final_total': float(cart_final_total)
-            })
-            
-        except Exception as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e)
-            })
+            cart_id = parse_remove_from_cart(request.body)
+            cart_item = Cart.objects.select_related('product').filter(id=cart_id, user=request.user).first()
+            if cart_item is None:
+                raise CartError('Cart item not found')
+        except CartError as e:
+            return JsonResponse(e.payload)
+        
+        cart_item.delete()
+        return JsonResponse({
+            'status': 'success',
+            'message': f'{cart_item.product.name} removed from cart',
+            **cart_summary(Cart.objects.filter(user=request.user).select_related('product'))
+        })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ClearCartView(LoginRequiredMixin, TemplateView):
+class ClearCartView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
+
     def post(self, request, *args, **kwargs):
-        try:
-            Cart.objects.filter(user=request.user).delete()
-            return JsonResponse({
-                'status': 'success',
-                'message': 'Cart cleared',
-                'cart_count': 0,
-                'cart_total': 0,
-                'cart_tax': 0,
-                'cart_final_total': 0
-            })
-        except Exception as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': str(e)
-            })
+        Cart.objects.filter(user=request.user).delete()
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Cart cleared',
+            **cart_summary([])
+        })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CheckoutView(LoginRequiredMixin, TemplateView):
+class CheckoutView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
+
     def post(self, request, *args, **kwargs):
         try:
-            data = json.loads(request.body)
-            payment_method = data.get('payment_method')
-            amount_paid = Decimal(str(data.get('amount_paid', 0)))
-            
-            # Optimized cart query
-            cart_items = Cart.objects.filter(user=request.user).select_related('product')
+            payment_method, amount_paid = parse_checkout(request.body)
             
-            if not cart_items.exists():
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Cart is empty'
-                })
+            cart_items = list(Cart.objects.filter(user=request.user).select_related('product'))
+            if not cart_items:
+                raise CartError('Cart is empty')
             
-            # Calculate totals
-            subtotal = sum(item.quantity * item.product.selling_price for item in cart_items)
-            tax_amount = subtotal * Decimal('0.1')
-            total_amount = subtotal + tax_amount
+            amounts = price_checkout(cart_items, payment_method, amount_paid)
             
-            # Validate payment amount for cash transactions
-            if payment_method.lower() == 'cash':
-                if amount_paid <= 0:
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': 'Please enter a valid cash amount',
-                        'error_type': 'invalid_amount'
-                    })
-                
-                if amount_paid < total_amount:
-                    shortage = total_amount - amount_paid
-                    return JsonResponse({
-                        'status': 'error',
-                        'message': f'Insufficient cash payment. Short by ₱{shortage:.2f}',
-                        'error_type': 'insufficient_cash',
-                        'details': {
-                            'total_required': float(total_amount),
-                            'amount_given': float(amount_paid),
-                            'shortage': float(shortage)
-                        }
-                    })
+            # Stock comes off this lane's location only
+            terminal = get_terminal(request)
+            location = terminal.location if terminal else Location.get_default()
             
-            # Validate payment amount for other methods
-            elif payment_method.lower() in ['card', 'mobile', 'check']:
-                if amount_paid != total_amount:
-                    # For non-cash payments, amount should equal total
-                    amount_paid = total_amount
-            
-            change_amount = amount_paid - total_amount if payment_method.lower() == 'cash' else Decimal('0')
-            
-            with transaction.atomic():
-                # Create sale
-                sale = Sale.objects.create(
-                    cashier=request.user,
-                    subtotal=subtotal,
-                    tax_amount=tax_amount,
-                    total_amount=total_amount,
-                    payment_method=payment_method.upper(),  # Convert to uppercase to match model choices
-                    amount_paid=amount_paid,
-                    change_amount=change_amount,
-                    status='COMPLETED'  # Use uppercase to match model choices
-                )
-                
-                # Create sale items and update stock
-                for cart_item in cart_items:
-                    # Check stock availability again
-                    if cart_item.product.stock_quantity < cart_item.quantity:
-                        raise Exception(f'Insufficient stock for {cart_item.product.name}')
-                    
-                    # Create sale item
-                    SaleItem.objects.create(
-                        sale=sale,
-                        product=cart_item.product,
-                        quantity=cart_item.quantity,
-                        unit_price=cart_item.product.selling_price
-                    )
-                    
-                    # Update stock
-                    cart_item.product.stock_quantity -= cart_item.quantity
-                    cart_item.product.save()
-                    
-                    # Create stock movement record (stock already updated manually above)
-                    StockMovement.objects.create(
-                        product=cart_item.product,
-                        movement_type='SALE',  # Use SALE for sales transactions
-                        quantity=cart_item.quantity,
-                        reason='sale',
-                        reference=sale.sale_number,
-                        user=request.user
-                    )
-                
-                # Clear cart
-                cart_items.delete()
-                
-                return JsonResponse({
-                    'status': 'success',
-                    'message': 'Sale completed successfully',
-                    'sale_id': sale.id,
-                    'sale_number': sale.sale_number,
-                    'total_amount': float(total_amount),
-                    'change_amount': float(change_amount)
-                })
-                
-        except ValueError as e:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Invalid payment amount or data format',
-                'error_type': 'validation_error'
-            })
-        except json.JSONDecodeError:
-            return JsonResponse({
-                'status': 'error',
-                'message': 'Invalid request format',
-                'error_type': 'request_error'
-            })
-        except Exception as e:
-            # Log the error for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Checkout error: {str(e)}")
-            
-            return JsonResponse({
-                'status': 'error',
-                'message': f'Transaction failed: {str(e)}',
-                'error_type': 'general_error'
-            })
+            try:
+                sale = record_sale(request.user, terminal, location, cart_items, payment_method, amounts)
+            except InsufficientStockError as e:
+                raise stock_error(cart_items, e)
+        except CartError as e:
+            return JsonResponse(e.payload)
+        
+        return JsonResponse(sale_response(sale))
 
 
-class SaleListView(LoginRequiredMixin, ListView):
+class SaleListView(LoginRequiredMixin, RoleRequiredMixin, ListView):
+    allowed_roles = SALES_ROLES
     model = Sale
     template_name = 'pos/sale_list.html'
     context_object_name = 'sales'
@@ -361,23 +251,24 @@ class SaleListView(LoginRequiredMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from django.utils import timezone
-        from django.db.models import Sum
-        
-        # Calculate summary statistics
-        all_sales = Sale.objects.filter(status='COMPLETED')
-        context['total_revenue'] = all_sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
         
-        # Today's statistics
-        today = timezone.now().date()
-        today_sales = all_sales.filter(created_at__date=today)
-        context['today_sales_count'] = today_sales.count()
-        context['today_revenue'] = today_sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        # Summary statistics scan every sale, so they are read from the
+        # replica; the list itself stays on default so new sales show up
+        with use_replica():
+            all_sales = Sale.objects.filter(status='COMPLETED')
+            context['total_revenue'] = all_sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+            
+            # Today's statistics
+            today = timezone.now().date()
+            today_sales = all_sales.filter(created_at__date=today)
+            context['today_sales_count'] = today_sales.count()
+            context['today_revenue'] = today_sales.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
         
         return context
 
 
-class SaleDetailView(LoginRequiredMixin, DetailView):
+class SaleDetailView(LoginRequiredMixin, RoleRequiredMixin, DetailView):
+    allowed_roles = SALES_ROLES
     model = Sale
     template_name = 'pos/sale_detail.html'
     context_object_name = 'sale'
@@ -404,11 +295,18 @@ class SaleDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class ReceiptView(LoginRequiredMixin, DetailView):
+class ReceiptView(LoginRequiredMixin, RoleRequiredMixin, DetailView):
+    allowed_roles = SALES_ROLES
     model = Sale
     template_name = 'pos/receipt.html'
     context_object_name = 'sale'
     
+    def get_queryset(self):
+        # One query for all lines instead of two per line
+        return Sale.objects.select_related('cashier').prefetch_related(
+            Prefetch('items', queryset=SaleItem.objects.select_related('product__category'))
+        )
+    
     def get_object(self, queryset=None):
         """Ensure users can only access receipts for sales they created"""
         obj = super().get_object(queryset)
@@ -425,7 +323,8 @@ class ReceiptView(LoginRequiredMixin, DetailView):
         return obj
 
 
-class SalesReportsView(LoginRequiredMixin, TemplateView):
+class SalesReportsView(LoginRequiredMixin, RoleRequiredMixin, ReplicaReadMixin, TemplateView):
+    allowed_roles = ADMIN_ROLES
     template_name = 'pos/sales_reports.html'
     
     def get_context_data(self, **kwargs):
@@ -449,24 +348,122 @@ class SalesReportsView(LoginRequiredMixin, TemplateView):
         return context
 
 
-class ProductSearchAPIView(LoginRequiredMixin, TemplateView):
-    def get(self, request, *args, **kwargs):
-        query = request.GET.get('q', '')
-        products = Product.objects.filter(
-            Q(name__icontains=query) | Q(sku__icontains=query) | Q(barcode__icontains=query),
-            is_active=True,
-            stock_quantity__gt=0
-        ).select_related('category')[:10]
+class GrossProfitReportView(LoginRequiredMixin, RoleRequiredMixin, ReplicaReadMixin, TemplateView):
+    """Gross profit by day, category or cashier, aggregated from SaleItem snapshots"""
+    allowed_roles = ADMIN_ROLES
+    template_name = 'pos/gross_profit_report.html'
+    
+    GROUPINGS = {
+        'day': 'sale_date',
+        'category': 'category_id',
+        'cashier': 'cashier_id',
+    }
+    
+    def get_labels(self, group_by, keys):
+        """Display names for the grouped ids, fetched after the aggregate"""
+        if group_by == 'category':
+            names = dict(Category.objects.filter(pk__in=keys).values_list('pk', 'name'))
+            return {key: names.get(key, 'Uncategorized') for key in keys}
+        if group_by == 'cashier':
+            names = dict(User.objects.filter(pk__in=keys).values_list('pk', 'username'))
+            return {key: names.get(key) for key in keys}
+        return {key: key for key in keys}
+    
+    def get_date_range(self):
+        today = timezone.localdate()
+        try:
+            end = date.fromisoformat(self.request.GET.get('end', ''))
+        except ValueError:
+            end = today
+        try:
+            start = date.fromisoformat(self.request.GET.get('start', ''))
+        except ValueError:
+            start = end - timedelta(days=29)
+        return start, end
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        
+        group_by = self.request.GET.get('group_by', 'day')
+        if group_by not in self.GROUPINGS:
+            group_by = 'day'
+        start, end = self.get_date_range()
+        
+        money = DecimalField(max_digits=14, decimal_places=2)
+        revenue = ExpressionWrapper(F('unit_price') * F('quantity') - F('discount'), output_field=money)
+        cost = ExpressionWrapper(F('unit_cost') * F('quantity'), output_field=money)
         
-        data = [{
-            'id': p.id,
-            'name': p.name,
-            'sku': p.sku,
-            'barcode': p.barcode,
-            'price': str(p.selling_price),
-            'stock': p.stock_quantity,
-            'category': p.category.name if p.category else 'Uncategorized',
-            'image': p.image.url if p.image else None
-        } for p in products]
+        # Status, date, cashier and category are copied onto SaleItem, so every
+        # grouping is answered from its covering index without joining Sale,
+        # Product or Category; only the labels are looked up afterwards
+        items = SaleItem.objects.filter(
+            sale_status='COMPLETED',
+            sale_date__range=(start, end),
+        )
+        key = self.GROUPINGS[group_by]
+        rows = list(items.values(key).annotate(
+            items_sold=Sum('quantity'),
+            revenue=Sum(revenue),
+            cost=Sum(cost),
+        ).order_by(key))
+        labels = self.get_labels(group_by, [row[key] for row in rows])
         
+        report = []
+        for row in rows:
+            row_revenue = row['revenue'] or 0
+            row_cost = row['cost'] or 0
+            report.append({
+                'label': labels[row[key]],
+                'items_sold': row['items_sold'],
+                'revenue': row_revenue,
+                'cost': row_cost,
+                'gross_profit': row_revenue - row_cost,
+                'margin': ((row_revenue - row_cost) / row_revenue * 100) if row_revenue else 0,
+            })
+        if group_by != 'day':
+            report.sort(key=lambda row: row['label'] or '')
+        
+        context['report'] = report
+        context['group_by'] = group_by
+        context['start'] = start
+        context['end'] = end
+        context['total_revenue'] = sum(row['revenue'] for row in report)
+        context['total_cost'] = sum(row['cost'] for row in report)
+        context['total_gross_profit'] = context['total_revenue'] - context['total_cost']
+        
+        return context
+
+
+class ProductSearchAPIView(LoginRequiredMixin, RoleRequiredMixin, TemplateView):
+    allowed_roles = SALES_ROLES
+
+    def get(self, request, *args, **kwargs):
+        products = Product.objects.with_stock_at(get_sale_location(request))
+        data = [search_result(p) for p in search_products(products, request.GET.get('q', ''))]
         return JsonResponse({'products': data})
+
+
+def catalog_etag(request, *args, **kwargs):
+    """Changes whenever a product, category or the terminal's location does"""
+    version, count = catalog_state()
+    since = parse_since(request.GET.get('since'))
+    return f'{get_sale_location(request).pk}-{since or "full"}-{version}-{count}'
+
+
+@method_decorator(gzip_page, name='dispatch')
+class CatalogAPIView(LoginRequiredMixin, RoleRequiredMixin, View):
+    """
+    Compact catalog snapshot for offline search and price lookup.
+
+    ?since=<version> returns only what changed after that version; a
+    matching If-None-Match gets 304 Not Modified.
+    """
+    allowed_roles = SALES_ROLES
+
+    @method_decorator(condition(etag_func=catalog_etag))
+    def get(self, request, *args, **kwargs):
+        payload = build_catalog(get_sale_location(request), since=parse_since(request.GET.get('since')))
+        response = JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
+        # Always revalidate; the ETag makes that a 304 when nothing changed
+        response['Cache-Control'] = 'private, no-cache'
+        return response
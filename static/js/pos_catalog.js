@@ -0,0 +1,100 @@
+// Local product catalog for the POS terminal.
+// Synced from /pos/api/catalog/ (full snapshot once, then ?since= deltas) and
+// kept in localStorage, so search and price lookup don't hit the server.
+const PosCatalog = (function() {
+    const url = window.POS_CATALOG_URL || '/pos/api/catalog/';
+    let state = {version: null, location: null, etag: null, categories: {}, products: {}};
+
+    function storageKey(location) {
+        return `pos-catalog:${location}`;
+    }
+
+    function load(location) {
+        try {
+            const saved = JSON.parse(localStorage.getItem(storageKey(location)) || 'null');
+            if (saved) state = saved;
+        } catch (e) {
+            console.warn('Could not read cached catalog', e);
+        }
+    }
+
+    function save() {
+        try {
+            localStorage.setItem(storageKey(state.location), JSON.stringify(state));
+        } catch (e) {
+            // Quota exceeded: the in-memory copy still works for this page
+            console.warn('Could not cache catalog', e);
+        }
+    }
+
+    function apply(data) {
+        const products = data.full ? {} : state.products;
+        data.products.forEach(row => {
+            const product = {};
+            data.fields.forEach((field, i) => product[field] = row[i]);
+            products[product.id] = product;
+        });
+        data.removed.forEach(id => delete products[id]);
+        state = {
+            version: data.version,
+            location: data.location,
+            etag: state.etag,
+            categories: data.categories,
+            products: products,
+        };
+    }
+
+    async function fetchCatalog(since) {
+        const headers = {};
+        if (since && state.etag) headers['If-None-Match'] = state.etag;
+        const response = await fetch(since ? `${url}?since=${since}` : url, {headers: headers});
+        if (response.status === 304) return null;
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        const data = await response.json();
+        state.etag = response.headers.get('ETag');
+        return data;
+    }
+
+    async function sync(location) {
+        if (state.location !== location) load(location);
+        try {
+            let data = await fetchCatalog(state.location === location ? state.version : null);
+            if (!data) return;
+            apply(data);
+            // Hard deletes don't show up in deltas; the count catches them
+            if (!data.full && Object.keys(state.products).length !== data.count) {
+                apply(await fetchCatalog(null));
+            }
+            save();
+        } catch (e) {
+            console.error('Catalog sync failed', e);
+        }
+    }
+
+    function search(query, limit = 10) {
+        query = query.trim().toLowerCase();
+        if (!query) return [];
+        const matches = [];
+        for (const product of Object.values(state.products)) {
+            if (product.stock > 0 && (
+                product.name.toLowerCase().includes(query) ||
+                (product.sku || '').toLowerCase().includes(query) ||
+                (product.barcode || '').toLowerCase() === query
+            )) {
+                matches.push(product);
+                if (matches.length >= limit) break;
+            }
+        }
+        return matches;
+    }
+
+    function lookup(code) {
+        return Object.values(state.products).find(p => p.barcode === code || p.sku === code) || null;
+    }
+
+    function categoryName(product) {
+        return state.categories[product.category] || 'Uncategorized';
+    }
+
+    return {sync, search, lookup, categoryName};
+})();
@@ -1,4 +1,6 @@
 // Simple, Fast POS JavaScript - No Flickering
+const CURRENCY = window.CURRENCY_SYMBOL || '₱';
+
 document.addEventListener('DOMContentLoaded', function() {
     console.log('POS JavaScript loaded successfully!');
     
@@ -74,9 +76,9 @@ document.addEventListener('DOMContentLoaded', function() {
     function updateCartNumbers(data) {
         const elements = {
             'cart-count': data.cart_count || 0,
-            'cart-subtotal': `₱${(data.cart_total || 0).toFixed(2)}`,
-            'cart-tax': `₱${(data.cart_tax || 0).toFixed(2)}`,
-            'cart-total': `₱${(data.cart_final_total || 0).toFixed(2)}`
+            'cart-subtotal': `${CURRENCY}${(data.cart_total || 0).toFixed(2)}`,
+            'cart-tax': `${CURRENCY}${(data.cart_tax || 0).toFixed(2)}`,
+            'cart-total': `${CURRENCY}${(data.cart_final_total || 0).toFixed(2)}`
         };
 
         Object.keys(elements).forEach(id => {
@@ -396,13 +398,50 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Search functionality
     const searchInput = document.getElementById('product-search');
+    const searchResults = document.getElementById('search-results');
+    if (typeof PosCatalog !== 'undefined') {
+        PosCatalog.sync(window.POS_LOCATION_ID);
+    }
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text ?? '';
+        return div.innerHTML;
+    }
+
+    // Matches from the whole local catalog, not just the cards on the page;
+    // clicking one goes through the same .product-card add-to-cart handler
+    function showCatalogMatches(query) {
+        const matches = PosCatalog.search(query);
+        if (!query.trim() || matches.length === 0) {
+            searchResults.classList.add('hidden');
+            searchResults.innerHTML = '';
+            return;
+        }
+        searchResults.innerHTML = matches.map(p => `
+            <div class="product-card flex justify-between items-center px-4 py-2 hover:bg-gray-100 cursor-pointer" data-product-id="${p.id}">
+                <div>
+                    <div class="font-medium text-gray-900">${escapeHtml(p.name)}</div>
+                    <div class="text-xs text-gray-500">${escapeHtml(p.sku)} &middot; ${escapeHtml(PosCatalog.categoryName(p))}</div>
+                </div>
+                <div class="text-right">
+                    <div class="font-bold text-purple-600">${CURRENCY}${escapeHtml(p.price)}</div>
+                    <div class="text-xs text-gray-500">Stock: ${p.stock}</div>
+                </div>
+            </div>`).join('');
+        searchResults.classList.remove('hidden');
+    }
+
     if (searchInput) {
         searchInput.addEventListener('input', function(e) {
             const query = e.target.value.toLowerCase();
-            document.querySelectorAll('.product-card').forEach(card => {
+            document.querySelectorAll('#products-container .product-card').forEach(card => {
                 const text = card.textContent.toLowerCase();
                 card.style.display = text.includes(query) ? 'block' : 'none';
             });
+            if (searchResults && typeof PosCatalog !== 'undefined') {
+                showCatalogMatches(query);
+            }
         });
     }
 
@@ -414,7 +453,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const paymentMethod = document.getElementById('payment-method').value;
             const amountReceived = parseFloat(document.getElementById('amount-received').value) || 0;
-            const total = parseFloat(document.getElementById('checkout-total').textContent.replace('₱', ''));
+            const total = parseFloat(document.getElementById('checkout-total').textContent.replace(CURRENCY, ''));
 
             console.log('Payment details:', { paymentMethod, amountReceived, total });
 
@@ -445,11 +484,11 @@ document.addEventListener('DOMContentLoaded', function() {
                 
                 // Update success details
                 document.getElementById('sale-number').textContent = result.sale_number;
-                document.getElementById('sale-total').textContent = `₱${result.total_amount.toFixed(2)}`;
+                document.getElementById('sale-total').textContent = `${CURRENCY}${result.total_amount.toFixed(2)}`;
                 
                 if (result.change_amount > 0) {
                     document.getElementById('sale-change').classList.remove('hidden');
-                    document.getElementById('change-given').textContent = `₱${result.change_amount.toFixed(2)}`;
+                    document.getElementById('change-given').textContent = `${CURRENCY}${result.change_amount.toFixed(2)}`;
                 }
                 
                 // Clear cart display
@@ -468,14 +507,14 @@ document.addEventListener('DOMContentLoaded', function() {
     const amountInput = document.getElementById('amount-received');
     if (amountInput) {
         amountInput.addEventListener('input', function() {
-            const total = parseFloat(document.getElementById('checkout-total').textContent.replace('₱', ''));
+            const total = parseFloat(document.getElementById('checkout-total').textContent.replace(CURRENCY, ''));
             const received = parseFloat(this.value) || 0;
             const change = received - total;
             
             const changeDiv = document.getElementById('change-amount');
             if (change >= 0 && changeDiv) {
                 changeDiv.classList.remove('hidden');
-                changeDiv.querySelector('span').textContent = `₱${change.toFixed(2)}`;
+                changeDiv.querySelector('span').textContent = `${CURRENCY}${change.toFixed(2)}`;
             } else if (changeDiv) {
                 changeDiv.classList.add('hidden');
             }
@@ -524,7 +563,7 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Filter products
             const category = this.dataset.category;
-            const productCards = document.querySelectorAll('.product-card');
+            const productCards = document.querySelectorAll('#products-container .product-card');
             console.log(`Filtering products for category: ${category}, found ${productCards.length} product cards`);
             
             let visibleCount = 0;